@@ -5,3 +5,33 @@ router = APIRouter()
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/health/ocr")
+def health_ocr():
+    from app.core.tools.ocr_router import ocr_router_metrics
+    return ocr_router_metrics()
+
+
+@router.get("/health/ocr/prefilter")
+def health_ocr_prefilter():
+    from app.ocr.ink_filter import prefilter_totals
+    return prefilter_totals()
+
+
+@router.get("/health/regions/cache")
+def health_regions_cache():
+    from app.ocr.region_cache import cache_stats
+    return cache_stats()
+
+
+@router.get("/health/queue")
+def health_queue():
+    from app.core.work_queue import queue_stats
+    return queue_stats()
+
+
+@router.get("/health/events")
+def health_events():
+    from app.core.events import bus
+    return bus.stats()
@@ -24,10 +24,10 @@ async def upload_page_image(job_id: str, page_number: int, file: UploadFile = Fi
     with out_path.open("wb") as f:
         shutil.copyfileobj(file.file, f)
         
-    # Auto-start pipeline
-    if background_tasks:
-        from app.core.pipeline_engine import run_page_pipeline
-        background_tasks.add_task(run_page_pipeline, job_id, page_number)
+    # Auto-start pipeline (fila durável; o worker roda). Upload chega em lote
+    # (capítulo inteiro) => bulk, atrás das edições do editor
+    from app.core.work_queue import dispatch
+    dispatch("run_page", job_id, page_number, background_tasks, priority="bulk")
 
     # compat: retorno padroniza 001.jpg (quando for jpg); senão retorna o nome real
     return UploadResult(job_id=job_id, page_number=page_number, saved_as=f"{page_number:03d}.jpg" if ext==".jpg" else saved_name)
@@ -1,29 +1,42 @@
 from __future__ import annotations
 
+from contextlib import ExitStack
 from pathlib import Path
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Body, BackgroundTasks, Header, Query, Request, Response
 
 from app.core.config import settings
-from app.core.pipeline_engine import run_page_pipeline, approve_checkpoint, load_pipeline_def
+from app.core.pipeline_engine import (
+    approve_checkpoint,
+    load_pipeline_def,
+    rewind_page,
+    run_page_pipeline,
+    step_index,
+)
+from app.core.page_lock import page_lock
 from app.core.storage import read_json, ensure_dir
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
+# Classes da fila (app.core.work_queue.PRIORITIES)
+Priority = Literal["interactive", "normal", "bulk"]
+
 
 def job_dir(job_id: str) -> Path:
     return settings.data_dir() / "jobs" / job_id
 
 
+def _state_exists(job_id: str, page_number: int) -> bool:
+    return (job_dir(job_id) / "pipeline" / f"state_page_{page_number:03d}.json").exists()
+
+
 @router.post("/reset/{job_id}/{page_number}")
 def reset_pipeline_state(job_id: str, page_number: int, step: int = 0):
-    from app.core.pipeline_engine import load_state, save_state
-    state = load_state(job_id, page_number)
-    state["current_step"] = step
-    # Reset checkpoints status if going back? 
-    # For now, simplistic reset of pointer is enough to force re-execution of agents.
-    save_state(job_id, page_number, state)
-    return state
+    from app.core.pipeline_engine import reset_page
+    # O step e os que dependem dele ficam pendentes/"stale" (o resto continua
+    # valendo); a lista sai em state["last_invalidation"]
+    return reset_page(job_id, page_number, step)
 
 
 @router.post("/{job_id}/step/{step_id}/rerun/{page_number}")
@@ -31,33 +44,17 @@ def rerun_step(job_id: str, step_id: str, page_number: int):
     """
     Resets the pipeline state to point to the request step_id, effectively allowing a re-run.
     """
-    from app.core.pipeline_engine import load_state, save_state
-    
-    # 1. Load Definition to find index
-    pipeline_def = load_pipeline_def()
-    steps = pipeline_def.get("steps", [])
-    
-    target_index = -1
-    for i, s in enumerate(steps):
-        if s.get("id") == step_id:
-            target_index = i
-            break
-            
+    steps = load_pipeline_def().get("steps", [])
+    target_index = step_index(steps, step_id)
     if target_index == -1:
         raise HTTPException(status_code=404, detail=f"Step {step_id} not found in pipeline definition")
-        
-    # 2. Update State
-    state = load_state(job_id, page_number)
-    state["current_step"] = target_index
-    
-    # Optional: Clear the status of this step so it doesn't look 'done' immediately if we just view state
-    if step_id in state.get("steps", {}):
-        state["steps"][step_id]["status"] = "pending"
-        
-    save_state(job_id, page_number, state)
-    
-    # 3. Trigger Run
-    return run_page_pipeline(job_id=job_id, page_number=page_number)
+
+    # Rerun explícito do OCR é sempre completo (descarta o modo incremental).
+    # Com a página ocupada, espera o run em andamento antes de voltar o ponteiro.
+    with page_lock(job_id, page_number):
+        state = rewind_page(job_id, page_number, steps, target_index)
+        res = run_page_pipeline(job_id=job_id, page_number=page_number)
+    return {**res, "invalidated": state["last_invalidation"]["steps"]}
 
 
 @router.post("/run/{job_id}/page/{page_number}")
@@ -65,6 +62,139 @@ def run_pipeline(job_id: str, page_number: int):
     return run_page_pipeline(job_id=job_id, page_number=page_number)
 
 
+def _submit_run(
+    kind: str,
+    job_id: str,
+    page_number: Optional[int],
+    payload: Optional[dict],
+    idempotency_key: Optional[str],
+    background_tasks: BackgroundTasks,
+    response: Response,
+    join_running: bool = False,
+    priority: str = "normal",
+) -> dict:
+    from app.core.work_queue import IdempotencyConflict, dispatch, run_view
+    if not (job_dir(job_id) / "pages").exists():
+        raise HTTPException(status_code=404, detail="job_id not found")
+    try:
+        task, created = dispatch(
+            kind, job_id, page_number, background_tasks, payload,
+            idempotency_key=idempotency_key, join_running=join_running, priority=priority,
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key already used for a different request")
+    view = run_view(task)
+    if task.get("coalesced"):
+        # Single-flight: mesmo pedido já na fila (ou rodando) => mesma run
+        view["coalesced"] = True
+    elif not created:
+        # Repetição do cliente: mesma run, sem enfileirar outra
+        response.status_code = 200
+        response.headers["Idempotent-Replayed"] = "true"
+    response.headers["Location"] = f"/pipeline/runs/{task['id']}"
+    return view
+
+
+@router.post("/run/{job_id}/page/{page_number}/async", status_code=202)
+def run_pipeline_async(
+    job_id: str,
+    page_number: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    priority: Priority = "normal",
+):
+    """
+    Mesmo que /run/{job_id}/page/{page_number}, sem segurar a conexão: enfileira
+    e devolve o run_id (status em GET /pipeline/runs/{run_id}).
+    """
+    return _submit_run(
+        "run_page", job_id, page_number, None, idempotency_key, background_tasks, response,
+        join_running=True, priority=priority,
+    )
+
+
+@router.post("/run/{job_id}/page/{page_number}/preview", status_code=202)
+def run_pipeline_preview(
+    job_id: str,
+    page_number: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    priority: Priority = "interactive",
+):
+    """
+    Run em modo prévia (OCR/LLM baratos, inpaint rápido): resultado aproximado
+    em segundos; o passe de qualidade cheia (full_pass) entra na fila ao fim e
+    substitui os artefatos. O modo fica em state["mode"] e em cada step.
+    """
+    return _submit_run(
+        "run_page", job_id, page_number, {"mode": "preview"}, idempotency_key, background_tasks, response,
+        join_running=True, priority=priority,
+    )
+
+
+@router.post("/{job_id}/step/{step_id}/rerun/{page_number}/async", status_code=202)
+def rerun_step_async(
+    job_id: str,
+    step_id: str,
+    page_number: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    priority: Priority = "interactive",
+):
+    # Rerun de um step vem do editor (alguém esperando) => interactive por padrão
+    if step_index(load_pipeline_def().get("steps", []), step_id) == -1:
+        raise HTTPException(status_code=404, detail=f"Step {step_id} not found in pipeline definition")
+    return _submit_run(
+        "rerun_step", job_id, page_number, {"step_id": step_id}, idempotency_key, background_tasks, response,
+        priority=priority,
+    )
+
+
+@router.get("/runs/{run_id}")
+def get_run(run_id: int):
+    from app.core.work_queue import get_task, run_view
+    task = get_task(run_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="run_id not found")
+    return run_view(task)
+
+
+@router.get("/{job_id}/page/{page_number}/runs")
+def get_page_runs(job_id: str, page_number: int, limit: int = 20):
+    from app.core.work_queue import list_tasks, run_view
+    return [run_view(t) for t in list_tasks(job_id, page_number, limit)]
+
+
+@router.post("/{job_id}/page/{page_number}/prefetch", status_code=202)
+def prefetch_pages(job_id: str, page_number: int, k: Optional[int] = Query(None, ge=0, le=20)):
+    """O editor chama ao abrir a página: aquece as próximas k (padrão PREFETCH_PAGES)."""
+    from app.core.prefetch import prefetch_after
+    if not (job_dir(job_id) / "pages").exists():
+        raise HTTPException(status_code=404, detail="job_id not found")
+    return {"job_id": job_id, "page_number": page_number, "pages": prefetch_after(job_id, page_number, k)}
+
+
+@router.get("/{job_id}/page/{page_number}/speculation")
+def get_speculation(job_id: str, page_number: int):
+    """O que já foi adiantado enquanto a página espera o checkpoint (e se ainda vale para as regiões atuais)."""
+    from app.core.regions_diff import page_regions
+    from app.core.speculation import load_speculation, regions_fingerprint
+    meta = load_speculation(job_id, page_number)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="no speculation for this page")
+    p = job_dir(job_id) / "regions" / f"regions_page_{page_number:03d}.json"
+    current = regions_fingerprint(page_regions(read_json(p), page_number)) if p.exists() else None
+    return {
+        "fingerprint": meta["fingerprint"],
+        "created_on": meta.get("created_on"),
+        "artifacts": sorted(meta.get("artifacts", {})),
+        "matches_current_regions": current == meta["fingerprint"],
+    }
+
+
 @router.post("/{job_id}/checkpoints/{checkpoint_id}/approve")
 def approve(job_id: str, checkpoint_id: str):
     try:
@@ -73,6 +203,84 @@ def approve(job_id: str, checkpoint_id: str):
         raise HTTPException(status_code=404, detail="checkpoint_id not found")
 
 
+def _batch_pages(job_id: str, pages: Optional[List[int]], start: Optional[int], end: Optional[int]) -> List[int]:
+    from app.core.batch_ops import select_pages
+    if not (job_dir(job_id) / "pages").exists():
+        raise HTTPException(status_code=404, detail="job_id not found")
+    return select_pages(job_id, pages, start, end)
+
+
+@router.post("/{job_id}/batch/approve", status_code=202)
+def batch_approve(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    checkpoint_step: Optional[str] = None,
+    run: bool = True,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pages: Optional[List[int]] = Query(None),
+):
+    """
+    Aprova o checkpoint em que cada página está parada (ou só o de checkpoint_step)
+    e enfileira a continuação do pipeline (bulk). Devolve o batch_id na hora;
+    progresso em GET /{job_id}/batch/{batch_id}.
+    """
+    from app.core.batch_ops import submit_approve_all
+    selected = _batch_pages(job_id, pages, start, end)
+    try:
+        return submit_approve_all(
+            job_id, selected, checkpoint_step=checkpoint_step, run=run, background_tasks=background_tasks
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Step {checkpoint_step} not found in pipeline definition")
+
+
+@router.post("/{job_id}/batch/rerun/{step_id}", status_code=202)
+def batch_rerun(
+    job_id: str,
+    step_id: str,
+    background_tasks: BackgroundTasks,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pages: Optional[List[int]] = Query(None),
+):
+    """Rerun a partir de step_id nas páginas [start, end] (ou na lista `pages`): uma tarefa bulk por página."""
+    from app.core.batch_ops import submit_rerun
+    selected = _batch_pages(job_id, pages, start, end)
+    try:
+        return submit_rerun(job_id, step_id, selected, background_tasks=background_tasks)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Step {step_id} not found in pipeline definition")
+
+
+@router.post("/{job_id}/batch/reset", status_code=202)
+def batch_reset(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    step: int = 0,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    pages: Optional[List[int]] = Query(None),
+):
+    from app.core.batch_ops import submit_reset
+    return submit_reset(job_id, _batch_pages(job_id, pages, start, end), step=step, background_tasks=background_tasks)
+
+
+@router.get("/{job_id}/batches")
+def get_batches(job_id: str):
+    from app.core.batch_ops import list_batches
+    return list_batches(job_id)
+
+
+@router.get("/{job_id}/batch/{batch_id}")
+def get_batch_status(job_id: str, batch_id: str):
+    from app.core.batch_ops import get_batch
+    try:
+        return get_batch(job_id, batch_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="batch_id not found")
+
+
 @router.get("/{job_id}/ocr/raw")
 def get_ocr_raw(job_id: str):
     p = job_dir(job_id) / "ocr" / "ocr_raw.json"
@@ -110,8 +318,36 @@ def update_translation(job_id: str, translation: dict = Body(...)):
     p = job_dir(job_id) / "translation" / "translation.json"
     ensure_dir(p.parent)
     from app.core.storage import write_json
-    write_json(p, translation)
-    return {"status": "updated", "file": p.name}
+
+    new_pages = {pg.get("page_number"): pg for pg in translation.get("pages", []) if pg.get("page_number") is not None}
+
+    def changed_pages() -> List[int]:
+        old = read_json(p) if p.exists() else {}
+        old_pages = {pg.get("page_number"): pg for pg in old.get("pages", [])}
+        return sorted(n for n, pg in new_pages.items() if old_pages.get(n) != pg and _state_exists(job_id, n))
+
+    # Escrita e invalidação sob o lock das páginas que mudaram (em ordem; um
+    # run dessas páginas não lê/grava a tradução no meio). Se outro save mudou
+    # o arquivo enquanto esperávamos, trava também as páginas novas do diff.
+    from app.core.pipeline_engine import invalidate_page
+    steps = load_pipeline_def().get("steps", [])
+    invalidated = {}
+    with ExitStack() as locks:
+        held: set = set()
+        while True:
+            todo = [n for n in changed_pages() if n not in held]
+            if not todo:
+                break
+            for n in todo:
+                locks.enter_context(page_lock(job_id, n, timeout_s=settings.page_lock_edit_timeout_s))
+                held.add(n)
+        changed = changed_pages()
+        write_json(p, translation)
+        # Só a composição (typesetting) depende da tradução: invalida nas páginas que mudaram
+        for n in changed:
+            state = invalidate_page(job_id, n, steps, artifacts=("translation",))
+            invalidated[n] = state["last_invalidation"]["steps"]
+    return {"status": "updated", "file": p.name, "invalidated": invalidated}
 
 
 @router.get("/{job_id}/regions/{page_number}")
@@ -122,140 +358,116 @@ def get_regions(job_id: str, page_number: int):
     return read_json(p)
 
 
+@router.post("/{job_id}/regions/detect", status_code=202)
+def detect_regions_batch(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    workers: int = 0,
+    force: bool = False,
+    pages: Optional[List[int]] = Query(None),
+    idempotency_key: Optional[str] = Header(None),
+    priority: Priority = "bulk",
+):
+    """
+    Detecção de regiões de todas as páginas do job de uma vez (pool de processos),
+    como tarefa do job na fila: devolve o run_id; o resumo (páginas, cache,
+    falhas) sai em GET /pipeline/runs/{run_id}. Grava os arquivos de regiões e
+    deixa cada página parada no checkpoint de regiões.
+    """
+    payload = {"workers": workers, "force": force, "pages": sorted(set(pages)) if pages else None}
+    return _submit_run(
+        "detect_regions", job_id, None, payload, idempotency_key, background_tasks, response, priority=priority
+    )
+
+
 @router.put("/{job_id}/regions/{page_number}")
 def update_regions(job_id: str, page_number: int, regions: dict = Body(...), background_tasks: BackgroundTasks = None):
     p = job_dir(job_id) / "regions" / f"regions_page_{page_number:03d}.json"
     ensure_dir(p.parent)
     
-    from app.core.storage import write_json, read_json
-    from app.core.pipeline_engine import load_state, save_state, run_page_pipeline
-    
-    write_json(p, regions)
-    
-    # Logic: If regions changed, we should invalidate OCR downstream and re-run?
-    # User request: "When I enter OCR screen, run on defined coordinates".
-    # This implies auto-run.
+    from app.core.pipeline_engine import update_page_regions
     
-    # 1. Reset OCR step to pending (index 2 usually, or find by id 'ocr')
-    state = load_state(job_id, page_number)
-    steps = state.get("steps", {})
-    
-    # Find override: simply set 'ocr' step to pending if it was done
-    if "ocr" in steps: # Assuming step id is 'ocr'
-         steps["ocr"]["status"] = "pending"
-         state["steps"] = steps
-         # Reset current_step to OCR index?
-         # Pipeline def has 'regions' (0), 'regions_human'(1), 'ocr'(2).
-         # If we are at regions_human and approve/save, we should be ready form OCR.
-         # If we set current_step to 2 (OCR), run_page_pipeline will execute it.
-         
-         # Let's find index of 'ocr'
-         # We can't load pipeline def easily here without import, but let's assume standard flow
-         # Or just let the engine handle it.
-         save_state(job_id, page_number, state)
-
-    # 2. Trigger Pipeline Run in Background
-    if background_tasks:
-        # We assume after saving regions, we want to proceed/update OCR
-        # But wait, we are usually PAUSED at regions_human (checkpoint).
-        # We need to Approve checkpoint? Or just Run?
-        # If paused at checkpoint, 'run_page_pipeline' checks checkpoint status.
-        # It needs 'approved'.
-        # Does "Save Regions" imply "Approve"?
-        # Usually separate button. But if user says "When I enter OCR screen", they clicked "Next" which implies moving on.
-        # But 'Next' in frontend is silent.
-        # Maybe we should AUTO-APPROVE checkpoint here if it matches?
-        
-        # Simpler: just trigger run. If checkpoint allows, it runs. If not, it waits.
-        # But for OCR to run, we must pass the checkpoint. 
-        # If user is stuck at checkpoint, OCR won't run.
-        # User dilemma: "Enter OCR screen -> runs on coordinates".
-        # This implies they bypassed checkpoint or checkpoint is done.
-        
-        # Let's just trigger the run. If the user hasn't approved, it won't run OCR.
-        # BUT if they are AT the OCR screen, they assume it runs.
-        # We will assume saving regions updates data.
-        # We will add a task to rerun from OCR step? That skips checkpoint.
-        # Rerunning from 'ocr' step seems invalid if we enforce checkpoints.
-        # But `rerun_step` exists exactly for this: "Refresh".
-        
-        # Hack/Feature: Auto-Rerun OCR step
-        background_tasks.add_task(rerun_ocr_step_auto, job_id, page_number)
+    # Salva e faz o diff contra as regiões anteriores: só regiões novas/alteradas
+    # voltam para o OCR; as demais reaproveitam o texto (e edições manuais).
+    diff = update_page_regions(job_id, page_number, regions)
+    out = {"status": "updated", "file": p.name, "diff": diff, "invalidated": diff.pop("invalidated", [])}
 
-    return {"status": "updated", "file": p.name}
+    # Checkpoint de regiões ainda pendente: só salva; o OCR roda quando o humano aprovar
+    from app.core.pipeline_engine import pending_regions_checkpoint
+    if pending_regions_checkpoint(job_id, page_number, load_pipeline_def().get("steps", [])) is not None:
+        return {**out, "task_id": None, "coalesced": False}
 
-def rerun_ocr_step_auto(job_id: str, page_number: int):
-    # This function mimics rerun_step('ocr') logic
-    from app.core.pipeline_engine import load_state, save_state, load_pipeline_def, run_page_pipeline
-    
-    # Find OCR step index
-    pipeline_def = load_pipeline_def()
-    steps = pipeline_def.get("steps", [])
-    target_index = -1
-    for i, s in enumerate(steps):
-        if s.get("id") == "ocr":
-            target_index = i
-            break
-            
-    if target_index >= 0:
-        state = load_state(job_id, page_number)
-        state["current_step"] = target_index
-        # Validate we aren't jumping excessively? 
-        # Usually regions is step 0. OCR is step 2. Jumping over human checkpoint (1)?
-        # If user saves regions, they implicitly are done with regions.
-        save_state(job_id, page_number, state)
-        run_page_pipeline(job_id, page_number)
+    # Trigger Pipeline Run in Background (regiões já aprovadas: refaz o OCR das alteradas).
+    # Debounce: uma rajada de saves (ajuste de caixas) vira um único rerun.
+    from app.core.work_queue import dispatch
+    task, created = dispatch(
+        "rerun_ocr", job_id, page_number, background_tasks, debounce_s=settings.edit_debounce_s, priority="interactive"
+    )
+    return {**out, "task_id": task["id"], "coalesced": not created}
 
 
 @router.put("/{job_id}/ocr/{page_number}")
 def update_ocr(job_id: str, page_number: int, blocks: list[dict] = Body(...), background_tasks: BackgroundTasks = None):
     p = job_dir(job_id) / "ocr" / "ocr_final.json"
     ensure_dir(p.parent)
+    from app.core.storage import write_json
+    from app.core.pipeline_engine import invalidate_page, load_state, save_state
 
-    if p.exists():
-        data = read_json(p)
-    else:
-        p_grouped = job_dir(job_id) / "ocr" / "ocr_grouped.json"
-        if p_grouped.exists():
-             data = read_json(p_grouped)
+    # Leitura, escrita do ocr_final e edição do state num só lock: um run da
+    # página não grava o OCR por cima da edição nem a lê pela metade
+    with page_lock(job_id, page_number, timeout_s=settings.page_lock_edit_timeout_s):
+        if p.exists():
+            data = read_json(p)
         else:
-             data = {"job_id": job_id, "pages": []}
-    pages = data.get("pages", [])
-    
-    # Locate the page
-    target_page = None
-    for page in pages:
-        if page.get("page_number") == page_number:
-            target_page = page
-            break
-            
-    if not target_page:
-        target_page = {"page_number": page_number, "blocks": []}
-        pages.append(target_page)
-        
-    target_page["blocks"] = blocks
-    data["pages"] = pages
-    
-    from app.core.storage import write_json
-    write_json(p, data)
-    
-    # --- Auto-Advance Logic ---
-    from app.core.pipeline_engine import load_state, save_state, run_page_pipeline
-    
-    # 1. Approve ocr_human checkpoint
-    state = load_state(job_id, page_number)
-    steps = state.get("steps", {})
-    if "ocr_human" in steps:
-        steps["ocr_human"]["status"] = "approved"
-        state["steps"] = steps
-        save_state(job_id, page_number, state)
-        
-    # 2. Trigger Pipeline Run (Translation Agent)
-    if background_tasks:
-        background_tasks.add_task(run_page_pipeline, job_id, page_number)
+            p_grouped = job_dir(job_id) / "ocr" / "ocr_grouped.json"
+            if p_grouped.exists():
+                 data = read_json(p_grouped)
+            else:
+                 data = {"job_id": job_id, "pages": []}
+        pages = data.get("pages", [])
+
+        # Locate the page
+        target_page = None
+        for page in pages:
+            if page.get("page_number") == page_number:
+                target_page = page
+                break
+
+        if not target_page:
+            target_page = {"page_number": page_number, "blocks": []}
+            pages.append(target_page)
+
+        target_page["blocks"] = blocks
+        data["pages"] = pages
+        write_json(p, data)
+
+        # --- Auto-Advance Logic ---
+        # 1. Approve ocr_human checkpoint
+        state = load_state(job_id, page_number)
+        steps = state.get("steps", {})
+        if "ocr_human" in steps:
+            steps["ocr_human"]["status"] = "approved"
+            state["steps"] = steps
+            save_state(job_id, page_number, state)
+
+        # Texto editado: tradução e composição da página ficam "stale"
+        state = invalidate_page(job_id, page_number, load_pipeline_def().get("steps", []), artifacts=("ocr_final",))
+
+    # 2. Trigger Pipeline Run (Translation Agent), com debounce por página
+    from app.core.work_queue import dispatch
+    task, created = dispatch(
+        "run_page", job_id, page_number, background_tasks, debounce_s=settings.edit_debounce_s, priority="interactive"
+    )
     # --------------------------
     
-    return {"status": "updated", "page_number": page_number}
+    return {
+        "status": "updated",
+        "page_number": page_number,
+        "invalidated": state["last_invalidation"]["steps"],
+        "task_id": task["id"],
+        "coalesced": not created,
+    }
 
 @router.get("/{job_id}/cleaned/{page_number}/image")
 def get_cleaned_image(job_id: str, page_number: int):
@@ -309,6 +521,26 @@ def get_final_image(job_id: str, page_number: int):
     return Response(content=target.read_bytes(), media_type=media_type)
 
 
+@router.get("/{job_id}/events")
+async def stream_events(
+    job_id: str,
+    request: Request,
+    page_number: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent events do job (ou só de page_number): run_started, step_started,
+    step_finished (com duration_s), step_failed, checkpoint_waiting, run_completed.
+    """
+    from fastapi.responses import StreamingResponse
+    from app.core.events import sse_stream
+    return StreamingResponse(
+        sse_stream(request, job_id, page_number, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{job_id}/state/{page_number}")
 def get_pipeline_state(job_id: str, page_number: int):
     from app.core.pipeline_engine import load_state
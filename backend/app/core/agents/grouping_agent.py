@@ -1,55 +1,37 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional
 
+from app.core.geometry import boxes_from_items
+from app.vision.reading_order import reading_order
 
-def _bbox(block: Dict[str, Any]) -> Tuple[int, int, int, int]:
-    b = block.get("bbox") or [0, 0, 0, 0]
-    if len(b) != 4:
-        return (0, 0, 0, 0)
-    return (int(b[0]), int(b[1]), int(b[2]), int(b[3]))
 
-
-def _sort_blocks_reading_order_rtl(blocks: List[Dict[str, Any]], line_tol: int = 80) -> List[Dict[str, Any]]:
+def _sort_blocks_reading_order_rtl(
+    blocks: List[Dict[str, Any]],
+    line_tol: int = 80,
+    panels: Optional[List[List[int]]] = None,
+) -> List[Dict[str, Any]]:
     """
-    Ordenação v1 (mangá):
+    Ordenação v1 (mangá), via app.vision.reading_order:
+    - por painel, quando `panels` é dado
     - agrupa por 'linhas' (topo -> base) usando tolerância em y (y1)
     - dentro da linha: direita -> esquerda (x1 desc)
     """
-    if not blocks:
-        return []
-
-    sorted_by_y = sorted(blocks, key=lambda b: _bbox(b)[1])
-
-    lines: List[List[Dict[str, Any]]] = []
-    for b in sorted_by_y:
-        y1 = _bbox(b)[1]
-        placed = False
-        for line in lines:
-            y_avg = sum(_bbox(x)[1] for x in line) / max(1, len(line))
-            if abs(y1 - y_avg) <= line_tol:
-                line.append(b)
-                placed = True
-                break
-        if not placed:
-            lines.append([b])
-
-    for line in lines:
-        line.sort(key=lambda b: _bbox(b)[0], reverse=True)
-
-    ordered: List[Dict[str, Any]] = []
-    for line in lines:
-        ordered.extend(line)
-
-    return ordered
+    # bbox ausente/malformada conta como [0,0,0,0] (vai para o topo, como na v1)
+    order = reading_order(boxes_from_items(blocks).tolist(), panels=panels, line_tol=line_tol)
+    return [blocks[i] for i in order]
 
 
-def grouping_agent(ocr_raw: Dict[str, Any]) -> Dict[str, Any]:
+def grouping_agent(
+    ocr_raw: Dict[str, Any],
+    panels: Optional[Dict[int, List[List[int]]]] = None,
+) -> Dict[str, Any]:
     """
     grouping_agent (v3):
     - schema-less
     - NÃO modifica o `ocr_raw` original (faz deep copy estrutural de pages/blocks)
-    - ordena blocos em RTL e define group_id/reading_order
+    - ordena blocos em RTL (por painel, se `panels[page_number]` existir) e
+      define group_id/reading_order
     """
     if not isinstance(ocr_raw, dict):
         raise TypeError("ocr_raw deve ser dict")
@@ -73,7 +55,8 @@ def grouping_agent(ocr_raw: Dict[str, Any]) -> Dict[str, Any]:
 
         blocks_copy = [dict(b) for b in blocks_in if isinstance(b, dict)]
 
-        ordered = _sort_blocks_reading_order_rtl(blocks_copy, line_tol=80)
+        page_panels = (panels or {}).get(page.get("page_number"))
+        ordered = _sort_blocks_reading_order_rtl(blocks_copy, line_tol=80, panels=page_panels)
 
         for i, b in enumerate(ordered, start=1):
             b["group_id"] = f"g{i}"
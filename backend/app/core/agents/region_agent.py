@@ -1,14 +1,111 @@
 from __future__ import annotations
 
+import logging
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.config import settings
 
 # IMPORTANT:
 # Use the detector that supports padding ("pad") so we can expand regions safely.
-# app.ocr.detect_regions.detect_regions signature: (image_path, min_area, max_area_ratio, pad, ...)
-from app.ocr.detect_regions import detect_regions
+# app.ocr.detect_regions.detect_regions signature: (image_path, min_area, max_area_ratio, pad, ...);
+# detect_regions_gray é a mesma detecção sobre a imagem já decodificada.
+from app.ocr.detect_regions import detect_regions_gray, read_gray
+from app.ocr.region_cache import cached_detect
+from app.vision.masks import region_mask_polygon
+from app.vision.reading_order import page_panels
+
+logger = logging.getLogger(__name__)
+
+
+def _classify(gray, boxes: List[List[int]]) -> Tuple[Optional[List[float]], float]:
+    """Scores do classificador texto/não-texto (None se o modelo não estiver disponível)."""
+    from app.vision.region_classifier import load_model, score_boxes
+
+    model = load_model(settings.regions_classifier_model)
+    if model is None or gray is None:
+        return None, 0.0
+    threshold = float(settings.regions_classifier_threshold or model.threshold)
+    return [float(v) for v in score_boxes(gray, boxes, model)], threshold
+
+
+def region_params() -> Dict[str, Any]:
+    """Parâmetros do detect_regions vindos do settings (também entram na chave do cache)."""
+    # Make it resilient if some settings are not defined yet.
+    return {
+        "min_area": int(getattr(settings, "regions_min_area", 2500)),
+        "max_area_ratio": float(getattr(settings, "regions_max_area_ratio", 0.40)),
+        "pad": int(getattr(settings, "regions_pad", 8)),
+        "scale": float(getattr(settings, "regions_detect_scale", 1.0)),
+        "refine": bool(getattr(settings, "regions_detect_refine", True)),
+        "panel_order": bool(getattr(settings, "reading_order_panels", True)),
+    }
+
+
+def needs_gray() -> bool:
+    """True se o pós-processamento (polígonos / classificador) precisa da página decodificada."""
+    mode = str(getattr(settings, "regions_classifier_mode", "off") or "off").lower()
+    return bool(getattr(settings, "regions_mask_polygons", True)) or mode in ("flag", "drop")
+
+
+def build_regions_doc(
+    gray,
+    boxes: List[List[int]],
+    *,
+    page_number: int,
+    image_filename: str,
+    chapter_id: str = "001",
+) -> dict:
+    """Monta o documento de regiões a partir das caixas detectadas (classificador, polígonos, limite)."""
+    max_regions = getattr(settings, "regions_max_regions", 0)  # 0 => unlimited
+
+    # Classificador opcional: preenche "score" e marca/descarta propostas sem texto
+    mode = str(getattr(settings, "regions_classifier_mode", "off") or "off").lower()
+    with_polygons = bool(getattr(settings, "regions_mask_polygons", True))
+    scores: List[float] = [0.0] * len(boxes)
+    low: List[bool] = [False] * len(boxes)
+    classifier: Optional[Dict[str, Any]] = None
+    if mode in ("flag", "drop") and boxes:
+        clf_scores, threshold = _classify(gray, boxes)
+        if clf_scores is not None:
+            scores = clf_scores
+            low = [v < threshold for v in scores]
+            classifier = {"mode": mode, "threshold": threshold, "low_score": sum(low)}
+            if mode == "drop":
+                kept = [i for i, is_low in enumerate(low) if not is_low]
+                boxes = [boxes[i] for i in kept]
+                scores = [scores[i] for i in kept]
+                low = [False] * len(kept)
+                logger.info(f"Region classifier dropped {classifier['low_score']} proposals on page {page_number}")
+
+    if max_regions and len(boxes) > int(max_regions):
+        boxes = boxes[: int(max_regions)]
+
+    regions: List[Dict[str, Any]] = []
+    for i, box in enumerate(boxes):
+        r = {"region_id": f"r{i+1}", "bbox": box, "type_hint": "unknown", "score": round(scores[i], 4)}
+        if low[i]:
+            r["low_score"] = True
+        if with_polygons and gray is not None:
+            # Máscara mais justa para limpeza/inpaint (interior do balão ou envoltória do texto)
+            shape = region_mask_polygon(gray, box)
+            if shape:
+                r["mask_kind"], r["mask_polygon"] = shape
+        regions.append(r)
+
+    page: Dict[str, Any] = {
+        "page_number": page_number,
+        "image_file": image_filename,
+        "regions": regions,
+        "notes": "detect_regions_v1",
+    }
+    if classifier:
+        page["classifier"] = classifier
+
+    return {
+        "chapter_id": chapter_id,
+        "pages": [page],
+    }
 
 
 def region_agent(
@@ -31,35 +128,28 @@ def region_agent(
       }]
     }
     """
-    # Make it resilient if some settings are not defined yet.
-    min_area = getattr(settings, "regions_min_area", 2500)
-    max_area_ratio = getattr(settings, "regions_max_area_ratio", 0.40)
-    pad = getattr(settings, "regions_pad", 8)
-    max_regions = getattr(settings, "regions_max_regions", 0)  # 0 => unlimited
+    gray = None
 
-    boxes: List[List[int]] = detect_regions(
-        str(image_path),
-        min_area=int(min_area),
-        max_area_ratio=float(max_area_ratio),
-        pad=int(pad),
-    )
+    def detect(path: str, **params) -> List[List[int]]:
+        # decodifica uma vez: a mesma imagem serve à detecção e aos polígonos
+        nonlocal gray
+        gray = read_gray(path)
+        # painéis ficam no cache do processo (o grouping_agent reaproveita)
+        panels = page_panels(Path(path), gray) if params.get("panel_order") else None
+        return detect_regions_gray(gray, panels=panels, **params)
 
-    if max_regions and len(boxes) > int(max_regions):
-        boxes = boxes[: int(max_regions)]
+    # rerun/reset e reenvio da mesma página não refazem a detecção
+    boxes, cache_hit = cached_detect(Path(image_path), region_params(), detect)
+    if cache_hit:
+        logger.info(f"Region detection cache hit for page {page_number} ({image_filename})")
 
-    regions = [
-        {"region_id": f"r{i+1}", "bbox": box, "type_hint": "unknown", "score": 0}
-        for i, box in enumerate(boxes)
-    ]
+    if gray is None and boxes and needs_gray():
+        gray = read_gray(str(image_path))
 
-    return {
-        "chapter_id": chapter_id,
-        "pages": [
-            {
-                "page_number": page_number,
-                "image_file": image_filename,
-                "regions": regions,
-                "notes": "detect_regions_v1",
-            }
-        ],
-    }
+    return build_regions_doc(
+        gray,
+        boxes,
+        page_number=page_number,
+        image_filename=image_filename,
+        chapter_id=chapter_id,
+    )
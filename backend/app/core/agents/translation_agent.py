@@ -1,32 +1,67 @@
+from typing import Optional
+
 from app.core.storage import read_json
 from app.core.llm_client import translate_text
 
-def translation_agent(ocr_final: dict) -> dict:
+
+def _previous_blocks(previous: Optional[dict]) -> dict:
+    out = {}
+    for page in (previous or {}).get("pages", []):
+        for b in page.get("blocks", []):
+            key = b.get("block_id") or b.get("region_id")
+            if key:
+                out[(page.get("page_number"), key)] = b
+    return out
+
+
+def translation_agent(
+    ocr_final: dict,
+    previous: Optional[dict] = None,
+    model: Optional[str] = None,
+    preview: bool = False,
+) -> dict:
     """
     Real translation agent using LLM.
     Takes ocr_final structure and creates a translation structure.
+
+    previous: tradução anterior do job; bloco com o mesmo texto de origem
+    reaproveita a tradução (inclusive edições manuais) sem chamar o LLM.
+    preview: traduz com `model` (mais barato) e marca os blocos; o passe de
+    qualidade cheia não reaproveita blocos marcados como prévia.
     """
+    prev = _previous_blocks(previous)
     translated_pages = []
+    n_translated = n_reused = 0
     
     for page in ocr_final.get("pages", []):
         t_blocks = []
         for block in page.get("blocks", []):
             original = block.get("text") or block.get("original_text") or ""
-            
+            old = prev.get((page.get("page_number"), block.get("block_id") or block.get("region_id")))
+
+            if old is not None and old.get("original") == original and (preview or not old.get("preview")):
+                t_blocks.append({**old, "bbox": block.get("bbox"), "region_id": block.get("region_id")})
+                n_reused += 1
+                continue
+
             # Skip empty or very short noise
             if not original.strip() or len(original) < 2:
                  translation = original
             else:
-                 translation = translate_text(original)
+                 translation = translate_text(original, model=model)
+                 n_translated += 1
 
-            t_blocks.append({
+            t_block = {
                 "block_id": block.get("block_id"),
                 "region_id": block.get("region_id"),
                 "bbox": block.get("bbox"),
                 "original": original,
                 "translation": translation,
                 "notes": "LLM-Translated"
-            })
+            }
+            if preview:
+                t_block["preview"] = True
+            t_blocks.append(t_block)
             
         translated_pages.append({
             "page_number": page.get("page_number"),
@@ -36,5 +71,6 @@ def translation_agent(ocr_final: dict) -> dict:
     return {
         "job_id": ocr_final.get("job_id"),
         "pages": translated_pages,
-        "engine": "llm_v1"
+        "engine": "llm_v1",
+        "incremental": {"translated": n_translated, "reused": n_reused},
     }
@@ -17,6 +17,7 @@ else:
 
 # Local imports
 from app.core.config import settings
+from app.core.geometry import Geometry, rasterize
 from app.core.llm_client import get_llm_client
 
 logger = logging.getLogger(__name__)
@@ -380,17 +381,9 @@ def wrap_text_hyphenated(text: str, font: ImageFont.FreeTypeFont, max_width: int
 
 def create_mask_from_polygon(polygon: List[List[int]], width: int, height: int) -> np.ndarray:
     """Creates a binary mask (0/255) from a list of points [[x,y], ...]."""
-    mask = np.zeros((height, width), dtype=np.uint8)
-    pts = np.array(polygon, np.int32)
-    pts = pts.reshape((-1, 1, 2))
-    cv2.fillPoly(mask, [pts], 255)
-    
     # Erode mask to provide safety margin (prevent text touching edges)
     # INCREASED Erosion to 11x11 (~5px radius)
-    kernel = np.ones((11, 11), np.uint8) 
-    mask = cv2.erode(mask, kernel, iterations=1)
-    
-    return mask
+    return rasterize((width, height), polygons=[polygon], erode=5)
 
 def wrap_text_to_mask(text: str, font: ImageFont.FreeTypeFont, mask: np.ndarray, start_y: int, text_height_px: int, stroke_width: int = 4) -> List[tuple]:
     """
@@ -687,25 +680,12 @@ def typesetting_agent(base_image_path: Path, translation: dict, regions: dict, o
             debug_draw = ImageDraw.Draw(debug_img, "RGBA")
             has_polys = False
             
-            # Collect all polygons
-            all_polys = []
-            
-            # From regions
-            for r in region_list:
-                if isinstance(r, dict):
-                    poly = r.get("polygon")
-                    if poly and len(poly) > 2:
-                        all_polys.append(poly)
-            
-            # From blocks (if regions missing)
-            for b in blocks:
-                if isinstance(b, dict):
-                    poly = b.get("polygon")
-                    if poly and len(poly) > 2:
-                         all_polys.append(poly)
-                     
+            # Collect all polygons (regions + blocks, if regions missing)
+            geo = Geometry.from_items([it for it in list(region_list) + list(blocks) if isinstance(it, dict)])
+            all_polys = [p for p in geo.polygons() if p is not None]
+
             for poly in all_polys:
-                pts = [tuple(p) for p in poly]
+                pts = [tuple(p) for p in poly.tolist()]
                 debug_draw.polygon(pts, fill=(255, 0, 0, 128), outline=(255, 0, 0, 255))
                 has_polys = True
             
@@ -778,25 +758,19 @@ def typesetting_agent(base_image_path: Path, translation: dict, regions: dict, o
             # --- Text Fitting Logic ---
             
             # MODE A: Polygon (Manual)
-            if polygon and len(polygon) > 2:
-                 # Create Mask
-                 pts = np.array(polygon)
-                 
-                 # Apply Box Scaling if requested
+            geo = Geometry.from_items([{"bbox": bbox, "polygon": polygon}])
+            if geo.has_polygon()[0]:
+                 # Apply Box Scaling if requested (relative to the polygon centroid)
                  if manual_style and manual_style.get("box_scale"):
                      scale = float(manual_style["box_scale"])
                      if scale != 1.0:
-                         # Calculate Centroid
-                         centroid = pts.mean(axis=0)
-                         # Scale points relative to centroid
-                         pts = centroid + (pts - centroid) * scale
-                         polygon = pts.astype(int).tolist() # Update polygon for drawing/mask
-                         pts = np.array(polygon) # Update pts for bbox calc below
+                         geo = geo.scale_polygons(scale)
+                 pts = geo.polygon(0).astype(int)
+                 polygon = pts.tolist() # Update polygon for drawing/mask
 
                  mask = create_mask_from_polygon(polygon, width, height)
                  
                  # Find bounding box of polygon for basic stats
-                 pts = np.array(polygon)
                  x_min, y_min = pts.min(axis=0)
                  x_max, y_max = pts.max(axis=0)
                  
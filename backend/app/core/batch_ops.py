@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+
+from app.core.pipeline_engine import (
+    _job_dir,
+    approve_checkpoint,
+    get_checkpoint,
+    load_pipeline_def,
+    load_state,
+    step_index,
+)
+from app.core.storage import ensure_dir, read_json, utc_now_iso
+from app.core import work_queue
+
+logger = logging.getLogger(__name__)
+
+# Operações em lote do job (aprovar todos, rerun de um step, reset): o lote é
+# só um agrupamento de tarefas da fila durável (run_page / rerun_step /
+# reset_page, prioridade bulk). jobs/<job>/batches/<batch_id>.json guarda
+# página -> run_id; o progresso vem das linhas da fila, então um restart não
+# perde o lote (as tarefas continuam na fila) e os workers aplicam prioridade,
+# fairness entre jobs e o lock por página como em qualquer outro run.
+
+BATCH_PRIORITY = "bulk"
+
+# status da run (run_view) -> status da página no lote
+_PAGE_STATUS = {"completed": "done", "failed": "failed", "superseded": "skipped"}
+FINISHED = ("done", "skipped", "failed")
+
+
+def _batches_dir(job_id: str) -> Path:
+    return _job_dir(job_id) / "batches"
+
+
+def _batch_path(job_id: str, batch_id: str) -> Path:
+    return _batches_dir(job_id) / f"{batch_id}.json"
+
+
+def _save(batch: dict) -> None:
+    # Escrita atômica: o GET de progresso nunca lê um JSON pela metade
+    p = _batch_path(batch["job_id"], batch["batch_id"])
+    ensure_dir(p.parent)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps(batch, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp, p)
+
+
+def _final_tasks(run_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """run_id -> tarefa que respondeu por ela (segue superseded_by até a última)."""
+    run_ids = list(run_ids)
+    tasks = work_queue.get_tasks(run_ids)
+    out: Dict[int, Dict[str, Any]] = {}
+    for rid in run_ids:
+        task, seen = tasks.get(rid), {rid}
+        while task is not None and task["status"] == "superseded":
+            nxt = (task["result"] or {}).get("superseded_by")
+            if not nxt or nxt in seen:
+                break
+            seen.add(nxt)
+            if nxt not in tasks:
+                tasks.update(work_queue.get_tasks([nxt]))
+            task = tasks.get(nxt) or task
+        if task is not None:
+            out[rid] = task
+    return out
+
+
+def _page_view(entry: Dict[str, Any], task: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if "run_id" not in entry:
+        return entry
+    if task is None:
+        return {**entry, "status": "failed", "error": "task not found (purged?)"}
+    run = work_queue.run_view(task)
+    out = {**entry, "status": _PAGE_STATUS.get(run["status"], run["status"]), "attempts": run["attempts"]}
+    if task["id"] != entry["run_id"]:
+        out["final_run_id"] = task["id"]
+    if run["status"] in ("completed", "failed", "superseded"):
+        out["finished_on"] = run["updated_on"]
+    res = run["result"] or {}
+    if run["status"] == "completed":
+        for k in ("checkpoint_id", "checkpoint_step_id", "elapsed_s"):
+            if res.get(k):
+                out[k] = res[k]
+        out["pipeline_status"] = res.get("status")
+    elif run["status"] == "superseded":
+        out["reason"] = res.get("reason") or "superseded"
+    if run["error"]:
+        out["error"] = run["error"]
+    return out
+
+
+def _with_progress(batch: dict, pages: bool = True) -> dict:
+    entries = batch.get("pages") or {}
+    tasks = _final_tasks(e["run_id"] for e in entries.values() if "run_id" in e)
+    views = {p: _page_view(e, tasks.get(e.get("run_id"))) for p, e in entries.items()}
+    counts = {s: sum(1 for v in views.values() if v["status"] == s) for s in FINISHED}
+    finished = sum(counts.values())
+    if finished == len(views):
+        status = "completed_with_errors" if counts["failed"] else "completed"
+        ends = [v["finished_on"] for v in views.values() if v.get("finished_on")]
+        batch["finished_on"] = max(ends) if ends else batch.get("created_on")
+    elif finished or any(v["status"] == "running" for v in views.values()):
+        status = "running"
+    else:
+        status = "queued"
+    batch.update(status=status, total=len(views), finished=finished, **counts)
+    if pages:
+        batch["pages"] = views
+    else:
+        batch.pop("pages", None)
+    return batch
+
+
+def get_batch(job_id: str, batch_id: str) -> dict:
+    p = _batch_path(job_id, batch_id)
+    if not p.exists():
+        raise FileNotFoundError("batch_id not found")
+    return _with_progress(read_json(p))
+
+
+def list_batches(job_id: str) -> List[dict]:
+    """Resumo dos lotes do job (sem o detalhe por página), mais recentes primeiro."""
+    d = _batches_dir(job_id)
+    if not d.exists():
+        return []
+    out = [_with_progress(read_json(p), pages=False) for p in d.glob("*.json")]
+    out.sort(key=lambda b: b.get("created_on") or "", reverse=True)
+    return out
+
+
+def select_pages(
+    job_id: str,
+    pages: Optional[Iterable[int]] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> List[int]:
+    """Páginas do job filtradas pela lista explícita e/ou pelo intervalo [start, end]."""
+    from app.core.batch_regions import job_page_numbers
+
+    numbers = job_page_numbers(job_id)
+    if pages:
+        wanted = set(int(p) for p in pages)
+        numbers = [n for n in numbers if n in wanted]
+    if start is not None:
+        numbers = [n for n in numbers if n >= start]
+    if end is not None:
+        numbers = [n for n in numbers if n <= end]
+    return numbers
+
+
+# ---------------------------------------------------------------------------
+# Lote
+# ---------------------------------------------------------------------------
+
+def _enqueue(kind: str, job_id: str, page_number: int, payload: Dict[str, Any], background_tasks=None) -> Dict[str, Any]:
+    task, _ = work_queue.dispatch(kind, job_id, page_number, background_tasks, payload, priority=BATCH_PRIORITY)
+    return {"run_id": task["id"]}
+
+
+def _submit(job_id: str, op: str, params: Dict[str, Any], pages: Dict[int, Dict[str, Any]]) -> dict:
+    batch_id = uuid.uuid4().hex[:12]
+    batch: Dict[str, Any] = {
+        "batch_id": batch_id,
+        "job_id": job_id,
+        "op": op,
+        "params": params,
+        "created_on": utc_now_iso(),
+        "pages": {str(p): e for p, e in pages.items()},
+    }
+    _save(batch)
+    runs = sum(1 for e in pages.values() if "run_id" in e)
+    logger.info(f"Batch {batch_id} ({op}): job={job_id} pages={len(pages)} queued_runs={runs}")
+    view = _with_progress(batch, pages=False)
+    return {k: view[k] for k in ("batch_id", "job_id", "op", "params", "status", "total", "created_on")}
+
+
+def _approve_page(job_id: str, page_number: int, steps: list, checkpoint_step: Optional[str]) -> Dict[str, Any]:
+    """Aprova o checkpoint em que a página está parada; {"status": "skipped"} se não há um."""
+    state = load_state(job_id, page_number)
+    i = int(state.get("current_step", 0))
+    if i >= len(steps) or steps[i].get("type") != "human_checkpoint":
+        return {"status": "skipped", "reason": "not at a checkpoint"}
+    step_id = steps[i].get("id", f"step{i}")
+    if checkpoint_step and step_id != checkpoint_step:
+        return {"status": "skipped", "reason": f"at checkpoint {step_id}"}
+    cid = (state.get("checkpoint_ids") or {}).get(step_id)
+    if not cid:
+        return {"status": "skipped", "reason": "checkpoint not created yet"}
+    if get_checkpoint(job_id, cid).get("status") != "approved":
+        approve_checkpoint(job_id, cid)
+    return {"status": "done", "approved_checkpoint_id": cid}
+
+
+def submit_approve_all(
+    job_id: str,
+    pages: List[int],
+    *,
+    checkpoint_step: Optional[str] = None,
+    run: bool = True,
+    background_tasks=None,
+) -> dict:
+    """
+    Aprova o checkpoint pendente de cada página (opcionalmente só o de
+    checkpoint_step) na hora e, com run, enfileira um run_page por página
+    aprovada para continuar o pipeline.
+    """
+    steps = load_pipeline_def().get("steps", [])
+    if checkpoint_step and step_index(steps, checkpoint_step) == -1:
+        raise KeyError(checkpoint_step)
+    entries: Dict[int, Dict[str, Any]] = {}
+    for p in pages:
+        try:
+            entry = _approve_page(job_id, p, steps, checkpoint_step)
+        except Exception as e:
+            logger.exception(f"Batch approve: page {p} failed")
+            entry = {"status": "failed", "error": str(e)}
+        if run and entry["status"] == "done":
+            entry = {"approved_checkpoint_id": entry["approved_checkpoint_id"], **_enqueue("run_page", job_id, p, {}, background_tasks)}
+        entries[p] = entry
+    return _submit(job_id, "approve_all", {"checkpoint_step": checkpoint_step, "run": run}, entries)
+
+
+def submit_rerun(job_id: str, step_id: str, pages: List[int], *, background_tasks=None) -> dict:
+    """Rerun a partir de step_id (mesmo efeito de /{job}/step/{step}/rerun/{page}) em cada página."""
+    steps = load_pipeline_def().get("steps", [])
+    if step_index(steps, step_id) == -1:
+        raise KeyError(step_id)
+    payload = {"step_id": step_id}
+    entries = {p: _enqueue("rerun_step", job_id, p, payload, background_tasks) for p in pages}
+    return _submit(job_id, "rerun", payload, entries)
+
+
+def submit_reset(job_id: str, pages: List[int], *, step: int = 0, background_tasks=None) -> dict:
+    payload = {"step": step}
+    entries = {p: _enqueue("reset_page", job_id, p, payload, background_tasks) for p in pages}
+    return _submit(job_id, "reset", payload, entries)
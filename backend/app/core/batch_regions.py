@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.agents.region_agent import build_regions_doc, needs_gray, region_params
+from app.core.config import settings
+from app.core.page_lock import page_lock
+from app.core.pipeline_engine import (
+    _job_dir,
+    _page_image_path,
+    _regions_path,
+    load_pipeline_def,
+    load_state,
+    save_state,
+    update_page_regions,
+)
+from app.core.storage import ensure_dir, utc_now_iso, write_json
+from app.ocr.detect_regions import detect_regions_gray, read_gray
+from app.ocr.region_cache import lookup, store
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def job_page_numbers(job_id: str) -> List[int]:
+    pages_dir = _job_dir(job_id) / "pages"
+    if not pages_dir.exists():
+        return []
+    pages = {int(p.stem) for p in pages_dir.iterdir() if p.suffix.lower() in IMAGE_EXTS and p.stem.isdigit()}
+    return sorted(pages)
+
+
+def _region_step(steps: List[dict]) -> Tuple[int, Optional[str]]:
+    for i, s in enumerate(steps):
+        if s.get("type") == "agent" and s.get("name") == "region_agent":
+            return i, s.get("id", f"step{i}")
+    return -1, None
+
+
+# ---------------------------------------------------------------------------
+# Worker (processo separado): lê a página da memória compartilhada
+# ---------------------------------------------------------------------------
+
+def _init_worker(overrides: Dict[str, Any]) -> None:
+    # Um processo por núcleo: evita que o OpenCV abra mais threads por cima
+    cv2.setNumThreads(1)
+    # "spawn" recarrega o settings do .env; replica o do processo pai
+    for k, v in overrides.items():
+        setattr(settings, k, v)
+
+
+def _detect_shared(task: Dict[str, Any]) -> Tuple[int, dict, Optional[List[List[int]]], float]:
+    """Detecta (se não veio do cache) e monta o documento de regiões da página em task["shm"]."""
+    t0 = time.perf_counter()
+    shm = shared_memory.SharedMemory(name=task["shm"])
+    gray = None
+    try:
+        gray = np.ndarray(task["shape"], dtype=np.uint8, buffer=shm.buf)
+        boxes = task["boxes"]
+        detected = boxes is None
+        if detected:
+            boxes = detect_regions_gray(gray, **task["params"])
+        doc = build_regions_doc(
+            gray,
+            boxes,
+            page_number=task["page_number"],
+            image_filename=task["image_filename"],
+        )
+    finally:
+        gray = None  # a view precisa sumir antes do close()
+        shm.close()
+    return task["page_number"], doc, (boxes if detected else None), time.perf_counter() - t0
+
+
+# ---------------------------------------------------------------------------
+# Processo pai: decodifica, publica em memória compartilhada, grava tudo no fim
+# ---------------------------------------------------------------------------
+
+def _stage(page_number: int, img_path: Path, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache + decodificação (threads: imread/sha256 liberam o GIL)."""
+    key, boxes = lookup(img_path, params)
+    staged: Dict[str, Any] = {
+        "page_number": page_number,
+        "image_filename": img_path.name,
+        "params": params,
+        "key": key,
+        "boxes": boxes,
+        "shm": None,
+    }
+    if boxes is not None and (not boxes or not needs_gray()):
+        # acerto no cache sem pós-processamento sobre a imagem: nem decodifica
+        staged["doc"] = build_regions_doc(None, boxes, page_number=page_number, image_filename=img_path.name)
+        return staged
+
+    gray = read_gray(str(img_path))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, gray.nbytes))
+    np.ndarray(gray.shape, dtype=np.uint8, buffer=shm.buf)[:] = gray
+    staged["shm"] = shm
+    staged["shape"] = gray.shape
+    return staged
+
+
+def _release(staged: Dict[str, Any]) -> None:
+    shm = staged.get("shm")
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+        staged["shm"] = None
+
+
+def _write_page(
+    job_id: str, page_number: int, doc: dict, region_idx: int, region_step_id: Optional[str], force: bool
+) -> bool:
+    """Grava as regiões e o state da página sob o lock dela; False se um run já as gerou."""
+    rp = _regions_path(job_id, page_number)
+    # Um run_page na mesma página (region_agent) não intercala com esta escrita
+    with page_lock(job_id, page_number):
+        if rp.exists():
+            if not force:
+                return False  # o region_agent de um run chegou antes
+            # force=True sobre regiões existentes: diff normal (OCR incremental das alteradas)
+            update_page_regions(job_id, page_number, doc)
+        else:
+            ensure_dir(rp.parent)
+            write_json(rp, doc)
+
+        if region_idx < 0:
+            return True
+        state = load_state(job_id, page_number)
+        state.setdefault("steps", {})
+        if int(state.get("current_step", 0)) <= region_idx:
+            # o run_page_pipeline segue direto para o checkpoint de regiões
+            state["steps"][region_step_id] = {"status": "done", "completed_on": utc_now_iso(), "batch": True}
+            state["current_step"] = region_idx + 1
+            save_state(job_id, page_number, state)
+    return True
+
+
+def detect_job_regions(
+    job_id: str,
+    pages: Optional[Iterable[int]] = None,
+    *,
+    workers: int = 0,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Detecção de regiões do job inteiro num pool de processos.
+
+    - threads do processo pai consultam o cache e decodificam as páginas direto
+      em blocos de multiprocessing.shared_memory (o worker só recebe o nome do
+      bloco e o shape; a imagem nunca é serializada)
+    - no máximo 2 x workers páginas ficam em memória compartilhada ao mesmo tempo
+    - os arquivos de regiões e o state (passo region_agent => done) são gravados
+      numa única passada no fim, cada página sob o page_lock dela; páginas que
+      já têm regiões (inclusive as que um run gerou durante o lote) são puladas,
+      a não ser com force=True (aí o diff marca só as regiões alteradas para o OCR)
+
+    workers=0 usa settings.regions_batch_workers (0 => os.cpu_count()).
+    """
+    t_start = time.perf_counter()
+    steps = load_pipeline_def().get("steps", [])
+    region_idx, region_step_id = _region_step(steps)
+
+    todo: List[int] = []
+    skipped: List[int] = []
+    for pn in sorted(set(pages) if pages is not None else job_page_numbers(job_id)):
+        if not force and _regions_path(job_id, pn).exists():
+            skipped.append(pn)
+        else:
+            todo.append(pn)
+
+    workers = int(workers or settings.regions_batch_workers or os.cpu_count() or 1)
+    workers = max(1, min(workers, len(todo) or 1))
+    params = region_params()
+    window = 2 * workers
+
+    docs: Dict[int, dict] = {}
+    failed: List[Dict[str, Any]] = []
+    cache_hits = 0
+    busy_s = 0.0
+
+    pool: Optional[ProcessPoolExecutor] = None
+    if workers > 1 and len(todo) > 1:
+        # "spawn": o servidor roda com threads; fork herdaria locks em estado indefinido
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.model_dump(),),
+        )
+    decoders = ThreadPoolExecutor(max_workers=min(4, workers), thread_name_prefix="regions-decode")
+
+    staging: Dict[Future, int] = {}
+    inflight: Dict[Future, Dict[str, Any]] = {}
+    queue = iter(todo)
+    exhausted = False
+
+    def fail(pn: int, e: BaseException) -> None:
+        logger.error(f"Batch region detection failed for job={job_id} page={pn}: {e}")
+        failed.append({"page_number": pn, "error": str(e)})
+
+    def finish(staged: Dict[str, Any], result: Tuple[int, dict, Optional[List[List[int]]], float]) -> None:
+        nonlocal busy_s
+        pn, doc, detected, elapsed = result
+        busy_s += elapsed
+        docs[pn] = doc
+        if detected is not None and staged["key"] is not None:
+            store(staged["key"], detected, staged["params"])
+
+    try:
+        while True:
+            while not exhausted and len(staging) + len(inflight) < window:
+                pn = next(queue, None)
+                if pn is None:
+                    exhausted = True
+                    break
+                fut = decoders.submit(_stage, pn, _page_image_path(job_id, pn), params)
+                staging[fut] = pn
+            if not staging and not inflight:
+                break
+
+            done, _ = wait(list(staging) + list(inflight), return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in staging:
+                    pn = staging.pop(fut)
+                    try:
+                        staged = fut.result()
+                    except Exception as e:
+                        fail(pn, e)
+                        continue
+                    if staged["boxes"] is not None:
+                        cache_hits += 1
+                    if "doc" in staged:
+                        docs[pn] = staged["doc"]
+                        continue
+                    task = {k: staged[k] for k in ("page_number", "image_filename", "params", "boxes", "shape")}
+                    task["shm"] = staged["shm"].name
+                    if pool is None:
+                        try:
+                            finish(staged, _detect_shared(task))
+                        except Exception as e:
+                            fail(pn, e)
+                        finally:
+                            _release(staged)
+                    else:
+                        try:
+                            inflight[pool.submit(_detect_shared, task)] = staged
+                        except Exception as e:  # pool quebrado (worker morto)
+                            fail(pn, e)
+                            _release(staged)
+                else:
+                    staged = inflight.pop(fut)
+                    try:
+                        finish(staged, fut.result())
+                    except Exception as e:
+                        fail(staged["page_number"], e)
+                    finally:
+                        _release(staged)
+    finally:
+        decoders.shutdown(wait=True)
+        for fut, staged in inflight.items():
+            fut.cancel()
+            _release(staged)
+        for fut in staging:
+            if fut.done() and not fut.exception():
+                _release(fut.result())
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # Uma passada de escrita: regiões + state de todas as páginas
+    for pn in sorted(docs):
+        if not _write_page(job_id, pn, docs[pn], region_idx, region_step_id, force):
+            skipped.append(pn)
+            del docs[pn]
+
+    wall = time.perf_counter() - t_start
+    summary = {
+        "job_id": job_id,
+        "pages": sorted(docs),
+        "skipped": sorted(skipped),
+        "failed": failed,
+        "cache_hits": cache_hits,
+        "workers": workers if pool is not None else 1,
+        "elapsed_s": round(wall, 3),
+        "busy_s": round(busy_s, 3),
+        "pages_per_s": round(len(docs) / wall, 2) if wall > 0 else 0.0,
+    }
+    logger.info(
+        f"Batch regions job={job_id}: {len(docs)} pages ({cache_hits} cached, {len(skipped)} skipped, "
+        f"{len(failed)} failed) in {wall:.2f}s with {summary['workers']} workers"
+    )
+    return summary
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Dict
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -7,14 +8,97 @@ class Settings(BaseSettings):
     app_data_dir: str = "../data"
     pipeline_path: str = "../pipelines/default_page_pipeline.json"
 
-    ocr_engine: str = "mangaocr"  # mangaocr | stub
+    ocr_engine: str = "mangaocr"  # gpt_vision | mangaocr | stub
+    ocr_fallback_engine: str = "mangaocr"  # engine local quando a primária falha / circuito aberto
+    ocr_engine_timeouts: Dict[str, float] = {"gpt_vision": 180.0, "mangaocr": 300.0, "stub": 5.0}
+    # Circuit breaker (janela deslizante por engine)
+    ocr_breaker_window: int = 20
+    ocr_breaker_min_samples: int = 5
+    ocr_breaker_p95_s: float = 60.0
+    ocr_breaker_error_rate: float = 0.5
+    ocr_breaker_cooldown_s: float = 120.0
     ocr_max_blocks: int = 40
 
+    # MangaOCR (modelo carregado uma vez por worker)
+    mangaocr_batch_size: int = 8
+    mangaocr_torch_threads: int = 0  # 0 => padrão do torch
+    mangaocr_quantize: bool = False  # int8 dinâmico (força CPU)
+
+    # Pré-filtro de crops sem tinta (evita chamadas de OCR/LLM em caixas vazias)
+    ocr_prefilter_enabled: bool = True
+    ocr_prefilter_min_ink_ratio: float = 0.004
+    ocr_prefilter_min_std: float = 6.0
+    ocr_prefilter_min_components: int = 2
+
+    # OCR em mosaico: empacota os crops da página em poucas requisições de visão
+    ocr_mosaic_enabled: bool = False
+    ocr_mosaic_max_side: int = 2048
+    ocr_mosaic_max_crops: int = 24
+
+
+    # Fila durável (SQLite) + worker separado (python -m app.worker); false => BackgroundTasks no processo da API
+    work_queue_enabled: bool = True
+    work_queue_path: str = ""  # vazio => <data>/queue/work_queue.db
+    work_queue_lease_s: float = 300.0  # visibility timeout; o worker renova enquanto a tarefa roda
+    work_queue_max_attempts: int = 3
+    work_queue_retry_backoff_s: float = 15.0  # dobra a cada tentativa
+    work_queue_keep_finished_s: float = 7 * 24 * 3600.0  # done/dead apagadas na partida do worker
+    worker_concurrency: int = 2
+    worker_poll_s: float = 1.0
+    worker_stale_s: float = 30.0  # worker sem sinal há mais que isso conta como fora (aviso na partida da API)
+    # Prioridades da fila: interactive (editor) > normal > bulk (upload, prefetch)
+    queue_aging_s: float = 60.0  # atraso equivalente a uma classe abaixo (ou a um run ativo do mesmo job)
+    queue_max_running_interactive: int = 0  # runs ativos por classe em cada processo worker; 0 = sem limite
+    queue_max_running_normal: int = 0
+    queue_max_running_bulk: int = -1  # -1 => concurrency do worker - 1 (com 1 vaga: bulk só sem interactive pronta)
+    edit_debounce_s: float = 2.0  # saves seguidos do editor na mesma página => um run só, depois do último
+    # Especulação: com a página parada no checkpoint de regiões, um worker já roda
+    # OCR/limpeza/redraw (prioridade bulk); a aprovação promove o resultado
+    speculation_enabled: bool = True
+    speculation_wait_s: float = 120.0  # run aprovado espera a especulação em andamento (em vez de refazer)
+    # Prefetch: abrir a página N no editor aquece N+1..N+k até o próximo checkpoint (bulk)
+    prefetch_pages: int = 2  # k; 0 desliga
+    prefetch_max_inflight: int = 4  # tarefas de prefetch/especulação na fila ou rodando (todos os jobs)
+    # Prévia: run em modo "preview" com OCR/LLM mais baratos e inpaint rápido numa
+    # cópia reduzida; depois um "full_pass" (bulk) refaz em qualidade cheia
+    preview_ocr_engine: str = "mangaocr_fast"  # int8 + teto de tokens; vazio ou igual a OCR_ENGINE => sem variante
+    preview_ocr_max_tokens: int = 96  # teto de tokens por crop do mangaocr_fast (o normal é 300)
+    preview_llm_model: str = "gpt-4o-mini"  # tradução da prévia; com LLM_BASE_URL só vale se definido no .env
+    preview_max_side: int = 1024  # lado maior da cópia do inpaint rápido; 0 => resolução cheia
+    preview_full_pass: bool = True
+
+    # Lock por página (um run por página de cada vez, entre processos)
+    page_lock_lease_s: float = 120.0  # renovado enquanto o run segura; vence se o processo morrer
+    page_lock_timeout_s: float = 3600.0  # espera máxima de quem chega com a página ocupada
+    page_lock_edit_timeout_s: float = 2.0  # saves do editor: espera curta; página ainda ocupada => 409
+    page_lock_poll_s: float = 0.25
+
+    # Eventos de progresso (SSE em /pipeline/{job}/events; tabela SQLite ao lado da fila)
+    events_enabled: bool = True
+    events_poll_s: float = 0.25  # intervalo da thread de relay (latência máx. do push)
+    events_heartbeat_s: float = 15.0
+    events_keep_s: float = 24 * 3600.0
+
+    # Ordem de leitura: painéis (XY-cut nas calhas) antes das linhas, em regiões e no agrupamento
+    reading_order_panels: bool = True
 
     # Regions detection (speech balloons / text boxes)
     regions_min_area: int = 3000
     regions_max_area_ratio: float = 0.25
     regions_pad: int = 8
+    # Modo pirâmide: detecta numa cópia reduzida (1.0 = resolução cheia)
+    regions_detect_scale: float = 1.0
+    regions_detect_refine: bool = True  # refina bordas em resolução cheia (ROIs locais)
+    # Cache em disco (data/cache/regions) por hash da imagem + versão do detector + parâmetros
+    regions_cache_enabled: bool = True
+    # Detecção em lote do job (pool de processos + memória compartilhada); 0 => os.cpu_count()
+    regions_batch_workers: int = 0
+    # Polígono do balão/texto por região (mask_polygon) para limpeza/inpaint mais justos
+    regions_mask_polygons: bool = True
+    # Classificador texto/não-texto das propostas: off | flag (só marca) | drop (descarta)
+    regions_classifier_mode: str = "off"
+    regions_classifier_model: str = "../models/region_classifier.json"
+    regions_classifier_threshold: float = 0.0  # 0 => usa o threshold salvo no modelo
     dummy_mode: bool = True
     llm_base_url: str = ""
     llm_api_key: str = ""
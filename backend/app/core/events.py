@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.storage import ensure_dir, utc_now_iso
+
+logger = logging.getLogger(__name__)
+
+# Eventos de progresso do pipeline (step começou/terminou/falhou, checkpoint).
+#
+# O engine roda nos workers (outros processos), então todo evento vai para uma
+# tabela SQLite (append-only). Em cada processo da API, uma única thread de
+# relay lê as linhas novas e distribui para os assinantes em memória (EventBus):
+# N clientes SSE custam uma consulta por intervalo, não N leituras de state.
+# O id da linha é o id do evento SSE; Last-Event-ID reenvia o que faltou.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts          REAL    NOT NULL,
+    job_id      TEXT    NOT NULL,
+    page_number INTEGER,
+    type        TEXT    NOT NULL,
+    data        TEXT    NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS ix_events_job ON events (job_id, id);
+"""
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED: set = set()
+
+
+def events_path() -> Path:
+    from app.core.work_queue import queue_path
+    return queue_path().with_name("events.db")
+
+
+def _connect() -> sqlite3.Connection:
+    path = events_path()
+    ensure_dir(path.parent)
+    conn = sqlite3.connect(str(path), timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    key = str(path)
+    if key not in _INITIALIZED:
+        with _INIT_LOCK:
+            if key not in _INITIALIZED:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                _INITIALIZED.add(key)
+    return conn
+
+
+def _event(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "type": row["type"],
+        "job_id": row["job_id"],
+        "page_number": row["page_number"],
+        "ts": row["ts"],
+        **orjson.loads(row["data"]),
+    }
+
+
+def emit(job_id: str, page_number: Optional[int], type: str, **data: Any) -> None:
+    """Registra um evento; nunca levanta (progresso não pode derrubar o pipeline)."""
+    if not settings.events_enabled:
+        return
+    data.setdefault("on", utc_now_iso())
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO events (ts, job_id, page_number, type, data) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), job_id, page_number, type, orjson.dumps(data).decode()),
+            )
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Event {type} job={job_id} page={page_number} not recorded: {e}")
+
+
+def events_since(
+    after_id: int,
+    job_id: Optional[str] = None,
+    page_number: Optional[int] = None,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    sql = "SELECT * FROM events WHERE id > ?"
+    args: List[Any] = [after_id]
+    if job_id is not None:
+        sql += " AND job_id = ?"
+        args.append(job_id)
+    if page_number is not None:
+        sql += " AND page_number = ?"
+        args.append(page_number)
+    sql += " ORDER BY id LIMIT ?"
+    args.append(limit)
+    conn = _connect()
+    try:
+        return [_event(r) for r in conn.execute(sql, args).fetchall()]
+    finally:
+        conn.close()
+
+
+def last_event_id() -> int:
+    conn = _connect()
+    try:
+        return int(conn.execute("SELECT COALESCE(MAX(id), 0) AS m FROM events").fetchone()["m"])
+    finally:
+        conn.close()
+
+
+def purge_events(older_than_s: float) -> int:
+    conn = _connect()
+    try:
+        return conn.execute("DELETE FROM events WHERE ts < ?", (time.time() - older_than_s,)).rowcount
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Fan-out em memória
+# ---------------------------------------------------------------------------
+
+@dataclass(eq=False)
+class Subscription:
+    job_id: str
+    page_number: Optional[int]
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=1000))
+    overflowed: bool = False
+
+    def matches(self, ev: Dict[str, Any]) -> bool:
+        return ev["job_id"] == self.job_id and (self.page_number is None or ev["page_number"] == self.page_number)
+
+    def _put(self, ev: Dict[str, Any]) -> None:
+        # Roda no loop do assinante; cliente lento => fecha e ele reconecta com Last-Event-ID
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(ev)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBus:
+    """Assinaturas por job (e opcionalmente página), alimentadas por uma thread de relay."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subs: Dict[str, List[Subscription]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._last_id = 0
+        self.relayed = 0
+
+    def subscribe(self, job_id: str, page_number: Optional[int] = None) -> Subscription:
+        sub = Subscription(job_id, page_number, asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(job_id, []).append(sub)
+            self._ensure_relay()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.job_id, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._subs.pop(sub.job_id, None)
+
+    def publish(self, ev: Dict[str, Any]) -> None:
+        with self._lock:
+            targets = [s for s in self._subs.get(ev["job_id"], []) if s.matches(ev)]
+        for s in targets:
+            try:
+                s.loop.call_soon_threadsafe(s._put, ev)
+            except RuntimeError:
+                pass  # loop do assinante já fechou
+        self.relayed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": sum(len(v) for v in self._subs.values()),
+                "jobs": len(self._subs),
+                "last_event_id": self._last_id,
+                "relayed": self.relayed,
+                "relay_alive": bool(self._thread and self._thread.is_alive()),
+            }
+
+    def _ensure_relay(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._last_id = last_event_id()
+            self._thread = threading.Thread(target=self._relay, name="events-relay", daemon=True)
+            self._thread.start()
+
+    def _relay(self) -> None:
+        last_purge = 0.0
+        while True:
+            with self._lock:
+                # Sem assinantes, a thread sai (o próximo subscribe abre outra)
+                if not self._subs:
+                    self._thread = None
+                    return
+            try:
+                for ev in events_since(self._last_id):
+                    self._last_id = ev["id"]
+                    self.publish(ev)
+                if time.time() - last_purge > 600:
+                    purge_events(settings.events_keep_s)
+                    last_purge = time.time()
+            except Exception as e:
+                logger.warning(f"Event relay error: {e}")
+            time.sleep(settings.events_poll_s)
+
+
+bus = EventBus()
+
+
+# ---------------------------------------------------------------------------
+# SSE
+# ---------------------------------------------------------------------------
+
+def _sse(ev: Dict[str, Any]) -> str:
+    return f"id: {ev['id']}\nevent: {ev['type']}\ndata: {orjson.dumps(ev).decode()}\n\n"
+
+
+async def sse_stream(request, job_id: str, page_number: Optional[int] = None, last_event_id: Optional[str] = None):
+    """
+    Gerador text/event-stream de um job (ou página). Com Last-Event-ID reenvia
+    do banco o que o cliente perdeu; depois segue o EventBus ao vivo.
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    sub = bus.subscribe(job_id, page_number)  # antes do replay: nada cai no vão entre os dois
+    sent = int(last_event_id) if (last_event_id or "").isdigit() else None
+    try:
+        yield "retry: 3000\n\n"
+        if sent is not None:
+            while True:
+                batch = await run_in_threadpool(events_since, sent, job_id, page_number)
+                for ev in batch:
+                    sent = ev["id"]
+                    yield _sse(ev)
+                if len(batch) < 1000:
+                    break
+        while not sub.overflowed:
+            try:
+                ev = await asyncio.wait_for(sub.queue.get(), timeout=settings.events_heartbeat_s)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if sent is not None and ev["id"] <= sent:
+                continue  # já enviado no replay
+            sent = ev["id"]
+            yield _sse(ev)
+    finally:
+        bus.unsubscribe(sub)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+# Caixas sempre no formato [x1, y1, x2, y2] (x2/y2 exclusivos, como nos crops),
+# em arrays N x 4 int32; polígonos no container Geometry. Conversão de/para os
+# documentos JSON só nas bordas: item_bbox / boxes_from_items / Geometry.from_items
+# na entrada, to_list na saída.
+
+
+# ---------------------------------------------------------------------------
+# JSON <-> arrays
+# ---------------------------------------------------------------------------
+
+def item_bbox(item: Dict[str, Any], key: str = "bbox") -> Optional[List[int]]:
+    """bbox de uma região/bloco como lista de 4 ints (None se ausente ou malformada)."""
+    b = item.get(key) if isinstance(item, dict) else None
+    if not b or len(b) != 4:
+        return None
+    return [int(v) for v in b]
+
+
+def as_boxes(boxes: Any) -> np.ndarray:
+    """Qualquer sequência de [x1,y1,x2,y2] (ou array) => N x 4 int32."""
+    if boxes is None:
+        return np.zeros((0, 4), dtype=np.int32)
+    return np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+
+def boxes_from_items(items: Iterable[Dict[str, Any]], key: str = "bbox") -> np.ndarray:
+    """bbox de cada item (ausente/malformada => [0,0,0,0], mantendo o alinhamento com items)."""
+    return as_boxes([item_bbox(it, key) or (0, 0, 0, 0) for it in items])
+
+
+def to_list(boxes: np.ndarray) -> List[List[int]]:
+    return [[int(v) for v in b] for b in np.asarray(boxes).reshape(-1, 4).tolist()]
+
+
+# ---------------------------------------------------------------------------
+# Operações vetorizadas
+# ---------------------------------------------------------------------------
+
+def widths(b: np.ndarray) -> np.ndarray:
+    return b[:, 2] - b[:, 0]
+
+
+def heights(b: np.ndarray) -> np.ndarray:
+    return b[:, 3] - b[:, 1]
+
+
+def areas(b: np.ndarray) -> np.ndarray:
+    return np.maximum(0, widths(b)).astype(np.int64) * np.maximum(0, heights(b))
+
+
+def clamp(b: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Recorta as caixas à imagem ([0,w] x [0,h]); pode gerar caixas vazias (ver valid)."""
+    out = np.array(b, dtype=np.int32, copy=True).reshape(-1, 4)
+    out[:, [0, 2]] = np.clip(out[:, [0, 2]], 0, width)
+    out[:, [1, 3]] = np.clip(out[:, [1, 3]], 0, height)
+    return out
+
+
+def valid(b: np.ndarray) -> np.ndarray:
+    """Caixas com área positiva."""
+    return (b[:, 2] > b[:, 0]) & (b[:, 3] > b[:, 1])
+
+
+def pad(b: np.ndarray, p: int) -> np.ndarray:
+    return b + np.array([-p, -p, p, p], dtype=b.dtype)
+
+
+def union(b: np.ndarray) -> np.ndarray:
+    """Menor caixa que contém todas (array 4)."""
+    return np.concatenate([b[:, :2].min(axis=0), b[:, 2:].max(axis=0)])
+
+
+def iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU par a par (N x M)."""
+    a = a.astype(np.int64)[:, None, :]
+    b = b.astype(np.int64)[None, :, :]
+    iw = np.maximum(0, np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]))
+    ih = np.maximum(0, np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]))
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / (area_a + area_b - inter + 1e-9)
+
+
+def gaps(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distância entre bordas par a par (N x M) em x e em y; 0 quando se sobrepõem no eixo."""
+    a = a.astype(np.int64)[:, None, :]
+    b = b.astype(np.int64)[None, :, :]
+    gx = np.maximum(0, np.maximum(a[..., 0] - b[..., 2], b[..., 0] - a[..., 2]))
+    gy = np.maximum(0, np.maximum(a[..., 1] - b[..., 3], b[..., 1] - a[..., 3]))
+    return gx, gy
+
+
+def near(a: np.ndarray, b: np.ndarray, dist: int) -> np.ndarray:
+    """Sobrepostas ou a <= dist pixels nos dois eixos (N x M)."""
+    gx, gy = gaps(a, b)
+    return (gx <= dist) & (gy <= dist)
+
+
+def polygon_inside(points: np.ndarray, box: Sequence[int], tol: int = 2) -> bool:
+    """Todos os vértices dentro da caixa (com tolerância, bordas inclusivas)."""
+    if not len(points):
+        return False
+    x1, y1, x2, y2 = (int(v) for v in box)
+    xs, ys = points[:, 0], points[:, 1]
+    return bool(np.all((xs >= x1 - tol) & (xs <= x2 + tol) & (ys >= y1 - tol) & (ys <= y2 + tol)))
+
+
+def _fill_polygon(mask: np.ndarray, points: np.ndarray, value: int = 255, erode: int = 0) -> None:
+    # Preenche (e erode) só numa ROI em volta do polígono, não na página inteira.
+    # Preenchimento do PIL: mesmo resultado das máscaras de antes, borda a borda
+    h, w = mask.shape
+    m = erode + 1
+    rx1, ry1 = max(0, int(points[:, 0].min()) - m), max(0, int(points[:, 1].min()) - m)
+    rx2 = min(w, int(np.ceil(points[:, 0].max())) + m + 1)
+    ry2 = min(h, int(np.ceil(points[:, 1].max())) + m + 1)
+    if rx2 <= rx1 or ry2 <= ry1:
+        return
+    local = Image.new("L", (rx2 - rx1, ry2 - ry1), 0)
+    ImageDraw.Draw(local).polygon([(x - rx1, y - ry1) for x, y in points.tolist()], fill=255)
+    if erode > 0:
+        local = local.filter(ImageFilter.MinFilter(2 * erode + 1))
+    roi = mask[ry1:ry2, rx1:rx2]
+    roi[np.asarray(local) > 0] = value
+
+
+def rasterize(
+    size: Tuple[int, int],
+    *,
+    boxes: Optional[np.ndarray] = None,
+    polygons: Sequence[np.ndarray] = (),
+    inclusive: bool = False,
+    value: int = 255,
+    erode: Union[int, Sequence[int]] = 0,
+) -> np.ndarray:
+    """
+    Máscara uint8 (h x w) com as caixas e polígonos preenchidos.
+    inclusive=True trata x2/y2 como pixels pintados (mesmo que ImageDraw.rectangle).
+    erode: pixels erodidos de cada polígono (um valor para todos ou um por polígono).
+    """
+    w, h = size
+    mask = np.zeros((h, w), dtype=np.uint8)
+    if boxes is not None and len(boxes):
+        e = 1 if inclusive else 0
+        for x1, y1, x2, y2 in clamp(as_boxes(boxes) + np.array([0, 0, e, e], dtype=np.int32), w, h).tolist():
+            mask[y1:y2, x1:x2] = value
+    erodes = [int(erode)] * len(polygons) if np.isscalar(erode) else [int(v) for v in erode]
+    for p, k in zip(polygons, erodes):
+        pts = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+        if len(pts) > 2:
+            _fill_polygon(mask, pts, value, k)
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Container colunar
+# ---------------------------------------------------------------------------
+
+def _as_points(p: Any) -> Optional[np.ndarray]:
+    # Polígono JSON => M x 2 float64 (o editor pode mandar coordenadas fracionárias)
+    if p is None:
+        return None
+    try:
+        pts = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+    except (TypeError, ValueError):
+        return None
+    return pts if len(pts) > 2 else None
+
+
+@dataclass
+class Geometry:
+    """
+    Geometria de uma página: N caixas (N x 4 int32) + polígonos opcionais em
+    formato ragged (todos os vértices em `points` M x 2, o polígono i é
+    points[offsets[i]:offsets[i+1]]; vazio => sem polígono).
+    """
+
+    boxes: np.ndarray
+    points: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def from_parts(cls, boxes: Any, polygons: Sequence[Any] = ()) -> "Geometry":
+        """Caixas + um polígono (ou None) por caixa; polígonos com < 3 vértices são ignorados."""
+        b = as_boxes(boxes)
+        polys = [_as_points(p) for p in polygons] or [None] * len(b)
+        if len(polys) != len(b):
+            raise ValueError(f"{len(b)} boxes but {len(polys)} polygons")
+        offsets = np.zeros(len(b) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([0 if p is None else len(p) for p in polys])
+        pts = [p for p in polys if p is not None]
+        points = np.concatenate(pts) if pts else np.zeros((0, 2), dtype=np.float64)
+        return cls(b, points, offsets)
+
+    @classmethod
+    def from_boxes(cls, boxes: Any) -> "Geometry":
+        return cls.from_parts(boxes)
+
+    @classmethod
+    def from_items(
+        cls,
+        items: Sequence[Dict[str, Any]],
+        bbox_key: str = "bbox",
+        polygon_key: Optional[str] = "polygon",
+    ) -> "Geometry":
+        """
+        Regiões/blocos JSON => Geometry. Item sem bbox válida fica com a caixa
+        do polígono (ou [0,0,0,0], mantendo o alinhamento com items).
+        """
+        polys = [_as_points(it.get(polygon_key)) if polygon_key and isinstance(it, dict) else None for it in items]
+        boxes = boxes_from_items(items, bbox_key)
+        for i, it in enumerate(items):
+            if item_bbox(it, bbox_key) is None and polys[i] is not None:
+                boxes[i] = _points_box(polys[i])
+        return cls.from_parts(boxes, polys)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def polygon(self, i: int) -> Optional[np.ndarray]:
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return self.points[a:b] if b > a else None
+
+    def polygons(self) -> List[Optional[np.ndarray]]:
+        return [self.polygon(i) for i in range(len(self))]
+
+    def has_polygon(self) -> np.ndarray:
+        return np.diff(self.offsets) > 0
+
+    def polygon_boxes(self) -> np.ndarray:
+        """bbox de cada polígono (a própria caixa quando não há polígono)."""
+        out = self.boxes.copy()
+        for i in np.flatnonzero(self.has_polygon()):
+            out[i] = _points_box(self.polygon(i))
+        return out
+
+    def take(self, idx: Any) -> "Geometry":
+        idx = np.asarray(idx)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        return Geometry.from_parts(self.boxes[idx], [self.polygon(i) for i in idx.tolist()])
+
+    def scale_polygons(self, factor: float) -> "Geometry":
+        """Polígonos escalados em torno do próprio centróide (caixas iguais)."""
+        out = Geometry(self.boxes.copy(), self.points.copy(), self.offsets.copy())
+        for i in np.flatnonzero(self.has_polygon()):
+            a, b = out.offsets[i], out.offsets[i + 1]
+            pts = out.points[a:b]
+            c = pts.mean(axis=0)
+            out.points[a:b] = c + (pts - c) * factor
+        return out
+
+    def clamp(self, width: int, height: int) -> "Geometry":
+        pts = self.points.copy()
+        if len(pts):
+            pts[:, 0] = np.clip(pts[:, 0], 0, width)
+            pts[:, 1] = np.clip(pts[:, 1], 0, height)
+        return Geometry(clamp(self.boxes, width, height), pts, self.offsets.copy())
+
+    def valid(self) -> np.ndarray:
+        return valid(self.boxes)
+
+    def rasterize(
+        self,
+        size: Tuple[int, int],
+        *,
+        inclusive: bool = False,
+        value: int = 255,
+        erode: Union[int, Sequence[int]] = 0,
+    ) -> np.ndarray:
+        """Polígono quando existe, senão a caixa. erode: um valor ou um por item (só polígonos)."""
+        has = self.has_polygon()
+        idx = np.flatnonzero(has)
+        per_item = [int(erode)] * len(self) if np.isscalar(erode) else [int(v) for v in erode]
+        return rasterize(
+            size,
+            boxes=self.boxes[~has],
+            polygons=[self.polygon(i) for i in idx],
+            inclusive=inclusive,
+            value=value,
+            erode=[per_item[i] for i in idx],
+        )
+
+
+def _points_box(pts: np.ndarray) -> List[int]:
+    # Caixa inteira que cobre os vértices (x2/y2 exclusivos)
+    return [int(np.floor(pts[:, 0].min())), int(np.floor(pts[:, 1].min())),
+            int(np.ceil(pts[:, 0].max())) + 1, int(np.ceil(pts[:, 1].max())) + 1]
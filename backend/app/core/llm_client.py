@@ -1,5 +1,6 @@
 from openai import OpenAI
 import os
+from typing import Optional
 from app.core.config import settings
 
 def get_llm_client():
@@ -23,15 +24,16 @@ def get_llm_client():
         base_url=base_url if base_url else None
     )
 
-def translate_text(text: str, context: str = "") -> str:
+def translate_text(text: str, context: str = "", model: Optional[str] = None) -> str:
     """
     Translates text to Portuguese (Brazil) using the configured LLM.
+    model: sobrescreve LLM_MODEL (ex.: modelo mais barato da prévia).
     """
     client = get_llm_client()
     if not client:
         return f"[MOCK] {text}"
         
-    model = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    model = model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
     
     system_prompt = """You are a professional manga translator. Translate the following text from Japanese/English to Portuguese (Brazil).
     Maintain the tone and nuance. Output ONLY the translation, no explanations.
@@ -55,7 +57,7 @@ def translate_text(text: str, context: str = "") -> str:
         print(f"LLM Error: {e}")
         return f"[ERR] {text}"
 
-def call_vision_llm(image_path: str, prompt: str) -> str:
+def call_vision_llm(image_path: str, prompt: str, max_tokens: int = 300) -> str:
     """
     Calls GPT-4 Vision with a local image file.
     """
@@ -92,7 +94,7 @@ def call_vision_llm(image_path: str, prompt: str) -> str:
                     ],
                 }
             ],
-            max_tokens=300,
+            max_tokens=max_tokens,
         )
         return response.choices[0].message.content.strip()
     except Exception as e:
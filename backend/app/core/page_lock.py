@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.work_queue import _connect
+
+logger = logging.getLogger(__name__)
+
+# Lock por (job, página) entre processos: uma linha em page_locks (mesmo banco
+# da fila) com dono e validade. O dono renova enquanto segura; se o processo
+# morrer, o lock vence sozinho. Reentrante na mesma thread (rerun = rewind +
+# run_page_pipeline, os dois pegam o lock).
+
+
+class PageBusy(TimeoutError):
+    """A página continuou travada por outro run além do tempo de espera."""
+
+
+_local = threading.local()
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _held() -> Dict[Tuple[str, int], int]:
+    if not hasattr(_local, "held"):
+        _local.held = {}
+    return _local.held
+
+
+def try_acquire(job_id: str, page_number: int, owner: str, lease_s: float) -> bool:
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT owner, expires FROM page_locks WHERE job_id = ? AND page_number = ?", (job_id, page_number)
+        ).fetchone()
+        if row is not None and row["owner"] != owner and row["expires"] > now:
+            conn.execute("COMMIT")
+            return False
+        conn.execute(
+            "INSERT INTO page_locks (job_id, page_number, owner, acquired_at, expires) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (job_id, page_number) DO UPDATE SET owner = excluded.owner,"
+            " acquired_at = excluded.acquired_at, expires = excluded.expires",
+            (job_id, page_number, owner, now, now + lease_s),
+        )
+        conn.execute("COMMIT")
+        return True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def renew(job_id: str, page_number: int, owner: str, lease_s: float) -> bool:
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE page_locks SET expires = ? WHERE job_id = ? AND page_number = ? AND owner = ?",
+            (time.time() + lease_s, job_id, page_number, owner),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release(job_id: str, page_number: int, owner: str) -> None:
+    conn = _connect()
+    try:
+        conn.execute(
+            "DELETE FROM page_locks WHERE job_id = ? AND page_number = ? AND owner = ?", (job_id, page_number, owner)
+        )
+    finally:
+        conn.close()
+
+
+def active_locks(job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    sql = "SELECT * FROM page_locks WHERE expires > ?"
+    args: List[Any] = [time.time()]
+    if job_id is not None:
+        sql += " AND job_id = ?"
+        args.append(job_id)
+    conn = _connect()
+    try:
+        return [dict(r) for r in conn.execute(sql + " ORDER BY acquired_at", args).fetchall()]
+    finally:
+        conn.close()
+
+
+def _keepalive(job_id: str, page_number: int, owner: str, lease_s: float, stop: threading.Event) -> None:
+    while not stop.wait(max(1.0, lease_s / 3)):
+        if not renew(job_id, page_number, owner, lease_s):
+            logger.warning(f"Page lock {job_id}/{page_number} lost by {owner}")
+            return
+
+
+@contextmanager
+def page_lock(job_id: str, page_number: int, *, timeout_s: Optional[float] = None) -> Iterator[None]:
+    """
+    Serializa runs da mesma página (entre threads e processos). Quem chega com
+    a página ocupada espera o run em andamento terminar; como o pipeline retoma
+    do state, o segundo run costuma só confirmar o ponto em que o primeiro parou.
+    """
+    key = (job_id, int(page_number))
+    held = _held()
+    if key in held:
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    lease_s = settings.page_lock_lease_s
+    timeout_s = settings.page_lock_timeout_s if timeout_s is None else timeout_s
+    owner = _owner()
+    t0 = time.perf_counter()
+    waited = False
+    while not try_acquire(job_id, key[1], owner, lease_s):
+        if not waited:
+            logger.info(f"Page {job_id}/{page_number} busy; waiting for the in-flight run")
+            waited = True
+        if timeout_s and time.perf_counter() - t0 > timeout_s:
+            raise PageBusy(f"page {job_id}/{page_number} still locked after {timeout_s:.0f}s")
+        time.sleep(settings.page_lock_poll_s)
+    if waited:
+        logger.info(f"Page {job_id}/{page_number} acquired after {time.perf_counter() - t0:.1f}s")
+
+    held[key] = 1
+    stop = threading.Event()
+    threading.Thread(target=_keepalive, args=(job_id, key[1], owner, lease_s, stop), daemon=True).start()
+    try:
+        yield
+    finally:
+        stop.set()
+        held.pop(key, None)
+        release(job_id, key[1], owner)
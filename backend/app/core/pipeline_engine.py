@@ -1,15 +1,26 @@
 from __future__ import annotations
 
 from pathlib import Path
+import time
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from app.core.config import settings
+from app.core.events import emit
+from app.core.page_lock import page_lock
 from app.core.storage import ensure_dir, write_json, read_json, utc_now_iso
 from app.core.tools.ocr_router import run_ocr
 from app.core.agents.region_agent import region_agent
 from app.core.agents.grouping_agent import grouping_agent
 from app.core.agents.ocr_editor_agent import ocr_editor_agent
+from app.vision.reading_order import page_panels
+from app.core.regions_diff import (
+    diff_regions,
+    merge_incremental_blocks,
+    page_blocks,
+    page_regions,
+    regions_needing_ocr,
+)
 
 
 def _job_dir(job_id: str) -> Path:
@@ -64,6 +75,190 @@ def save_state(job_id: str, page_number: int, state: dict) -> None:
     write_json(_state_path(job_id, page_number), state)
 
 
+def step_index(steps: list, step_id: str) -> int:
+    for i, s in enumerate(steps):
+        if s.get("id") == step_id:
+            return i
+    return -1
+
+
+def ocr_step_index(steps: list) -> int:
+    # Mesmo critério do engine para o passo de OCR
+    for i, s in enumerate(steps):
+        if s.get("id") == "ocr" or (s.get("type") == "tool" and s.get("name", "").startswith("ocr")):
+            return i
+    return -1
+
+
+# Dependências entre steps e artefatos: (lê, escreve) por name do step (o OCR
+# casa pelo prefixo, como no engine). Editar um artefato invalida só os steps
+# que o leem e, em cascata, os que leem o que esses escrevem; o resto segue
+# "done" e o engine pula. Checkpoints humanos não entram (aprovação continua
+# valendo).
+STEP_ARTIFACTS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "region_agent": ((), ("regions",)),
+    "ocr": (("regions",), ("ocr_raw",)),
+    "grouping_agent": (("ocr_raw",), ("ocr_grouped",)),
+    "ocr_editor_agent": (("ocr_grouped",), ("ocr_final",)),
+    "translation_agent": (("ocr_final",), ("translation",)),
+    "cleaning_agent": (("regions",), ("cleaned_image",)),
+    "redraw_agent": (("regions",), ("redraw_image",)),
+    "typesetting_agent": (("translation", "regions", "cleaned_image", "redraw_image"), ("final_image",)),
+}
+
+
+def step_artifacts(step: dict) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """(lê, escreve) do step; None para checkpoints e steps sem mapa."""
+    if step.get("type") == "human_checkpoint":
+        return None
+    if step.get("id") == "ocr" or (step.get("type") == "tool" and step.get("name", "").startswith("ocr")):
+        return STEP_ARTIFACTS["ocr"]
+    return STEP_ARTIFACTS.get(step.get("name", ""))
+
+
+def downstream_steps(steps: list, *, artifacts: Iterable[str] = (), from_index: Optional[int] = None) -> List[int]:
+    """
+    Índices dos steps a recalcular quando `artifacts` mudam (edição) ou quando
+    steps[from_index] roda de novo (rerun). Step sem mapa conta como
+    dependente de tudo que mudou antes dele.
+    """
+    changed = set(artifacts)
+    out: List[int] = []
+    if from_index is not None and steps[from_index].get("type") == "human_checkpoint":
+        # Voltar a um checkpoint refaz tudo depois dele (o humano revê a etapa)
+        return [i for i in range(from_index + 1, len(steps)) if steps[i].get("type") != "human_checkpoint"]
+    for i in range(from_index or 0, len(steps)):
+        step = steps[i]
+        if step.get("type") == "human_checkpoint":
+            continue
+        io = step_artifacts(step)
+        if i == from_index or (io is None and (changed or out)) or (io is not None and changed & set(io[0])):
+            out.append(i)
+            if io is not None:
+                changed.update(io[1])
+    return out
+
+
+def invalidate_page(
+    job_id: str,
+    page_number: int,
+    steps: list,
+    *,
+    artifacts: Iterable[str] = (),
+    from_index: Optional[int] = None,
+    full_ocr: bool = True,
+    include: Iterable[int] = (),
+) -> dict:
+    """
+    Marca como "stale" os steps afetados (ver downstream_steps) e ajusta o
+    ponteiro: rerun (from_index) aponta para o step; edição de artefato só
+    volta o ponteiro (nunca o avança por cima de um checkpoint pendente).
+    include: índices marcados junto (ex.: steps de prévia no passe de
+    qualidade cheia). O que foi invalidado fica em state["last_invalidation"].
+    """
+    artifacts = sorted(set(artifacts))
+    state = load_state(job_id, page_number)
+    state.setdefault("steps", {})
+    indices = sorted(set(downstream_steps(steps, artifacts=artifacts, from_index=from_index)) | set(include))
+    now = utc_now_iso()
+    invalidated: List[str] = []
+    for i in indices:
+        step_id = steps[i].get("id", f"step{i}")
+        invalidated.append(step_id)
+        entry = state["steps"].get(step_id)
+        if isinstance(entry, dict) and entry.get("status") == "done":
+            entry["status"] = "stale"
+            entry["stale_since"] = now
+
+    if from_index is not None:
+        state["current_step"] = from_index
+        step_id = steps[from_index].get("id", f"step{from_index}")
+        # Não mostra o step como 'done' enquanto não roda de novo
+        if step_id in state["steps"]:
+            state["steps"][step_id]["status"] = "pending"
+        if full_ocr and from_index <= ocr_step_index(steps):
+            state.pop("ocr_dirty_regions", None)
+    elif indices:
+        state["current_step"] = min(int(state.get("current_step", 0)), indices[0])
+
+    if from_index is not None or include:
+        # Rerun: o que foi especulado antes não pode voltar no lugar do recálculo
+        from app.core.speculation import discard
+        discard(job_id, page_number)
+        state.pop("speculation_armed", None)
+
+    state["last_invalidation"] = {
+        "steps": invalidated,
+        "artifacts": artifacts,
+        "from_step": steps[from_index].get("id") if from_index is not None else None,
+        "on": now,
+    }
+    save_state(job_id, page_number, state)
+    if invalidated:
+        emit(job_id, page_number, "steps_invalidated", steps=invalidated, artifacts=artifacts)
+    return state
+
+
+def rewind_page(job_id: str, page_number: int, steps: list, target_index: int, *, full_ocr: bool = True) -> dict:
+    """
+    Rerun a partir de steps[target_index]: o step e os que dependem do que ele
+    escreve ficam pendentes; os demais steps seguintes continuam "done".
+    full_ocr=True descarta o modo incremental quando o alvo é o OCR ou anterior.
+    """
+    return invalidate_page(job_id, page_number, steps, from_index=target_index, full_ocr=full_ocr)
+
+
+def reset_page(job_id: str, page_number: int, step: int = 0) -> dict:
+    """Volta a página para o step `step` (índice): ele e seus dependentes ficam pendentes."""
+    steps = load_pipeline_def().get("steps", [])
+    with page_lock(job_id, page_number):
+        if 0 <= step < len(steps):
+            return invalidate_page(job_id, page_number, steps, from_index=step)
+        state = load_state(job_id, page_number)
+        state["current_step"] = step
+        save_state(job_id, page_number, state)
+        return state
+
+
+def pending_regions_checkpoint(job_id: str, page_number: int, steps: list) -> Optional[dict]:
+    """
+    Checkpoint humano antes do OCR (revisão das regiões) ainda não aprovado:
+    {"checkpoint_step_id", "checkpoint_id"}; None se aprovado ou se o pipeline
+    não tem esse checkpoint.
+    """
+    target_index = ocr_step_index(steps)
+    gates = [j for j in range(max(0, target_index)) if steps[j].get("type") == "human_checkpoint"]
+    if not gates:
+        return None
+    step_id = steps[gates[-1]].get("id", f"step{gates[-1]}")
+    cid = (load_state(job_id, page_number).get("checkpoint_ids") or {}).get(step_id)
+    if cid:
+        try:
+            if get_checkpoint(job_id, cid).get("status") == "approved":
+                return None
+        except FileNotFoundError:
+            pass
+    return {"checkpoint_step_id": step_id, "checkpoint_id": cid}
+
+
+def rerun_ocr_incremental(job_id: str, page_number: int) -> Optional[dict]:
+    """
+    Rerun a partir do OCR mantendo as dicas do OCR incremental (após salvar
+    regiões). Com o checkpoint de regiões ainda pendente, não volta o ponteiro:
+    o OCR só roda depois da aprovação humana.
+    """
+    steps = load_pipeline_def().get("steps", [])
+    target_index = ocr_step_index(steps)
+    if target_index < 0:
+        return None
+    with page_lock(job_id, page_number):
+        pending = pending_regions_checkpoint(job_id, page_number, steps)
+        if pending is not None:
+            return {"status": "awaiting_human", **pending}
+        rewind_page(job_id, page_number, steps, target_index, full_ocr=False)
+        return run_page_pipeline(job_id, page_number)
+
+
 def create_checkpoint(job_id: str, page_number: int, label: str, context: dict) -> str:
     cid = str(uuid.uuid4())
     cp = {
@@ -105,7 +300,252 @@ import traceback
 
 # ... imports ...
 
-def run_page_pipeline(job_id: str, page_number: int) -> dict:
+def update_page_regions(job_id: str, page_number: int, regions_doc: dict) -> dict:
+    """
+    Salva as regiões editadas e registra quais precisam de novo OCR.
+
+    Faz o diff (region_id + bbox) contra o arquivo anterior; regiões novas ou
+    com geometria alterada entram em state["ocr_dirty_regions"] (acumulando
+    com edições ainda não processadas) e perdem o mask_polygon da detecção. O próximo passo de OCR re-processa só
+    essas regiões e reaproveita o texto (inclusive edições manuais) das demais.
+    Havendo mudança, os steps que dependem das regiões ficam "stale"
+    (devolvidos em "invalidated").
+
+    Não espera um run inteiro: com a página ocupada além de
+    page_lock_edit_timeout_s, PageBusy (a API devolve 409; o editor reenvia).
+    """
+    rp = _regions_path(job_id, page_number)
+    invalidated: List[str] = []
+    # Diff e escrita dentro do lock: um run em andamento não lê as regiões
+    # novas no meio de um step nem grava por cima delas
+    with page_lock(job_id, page_number, timeout_s=settings.page_lock_edit_timeout_s):
+        old_doc = read_json(rp) if rp.exists() else None
+        new_regions = page_regions(regions_doc, page_number)
+        diff = diff_regions(page_regions(old_doc, page_number), new_regions)
+        # bbox editada => polígono da detecção não vale mais (limpeza/inpaint voltam à bbox)
+        changed = set(diff["changed"])
+        for r in new_regions:
+            if r.get("region_id") in changed:
+                r.pop("mask_polygon", None)
+                r.pop("mask_kind", None)
+        write_json(rp, regions_doc)
+
+        state = load_state(job_id, page_number)
+        dirty = set(state.get("ocr_dirty_regions") or [])
+        dirty.update(diff["added"])
+        dirty.update(diff["changed"])
+        state["ocr_dirty_regions"] = sorted(dirty)
+        save_state(job_id, page_number, state)
+
+        if diff["added"] or diff["changed"] or diff["removed"]:
+            steps = load_pipeline_def().get("steps", [])
+            invalidated = invalidate_page(job_id, page_number, steps, artifacts=("regions",))["last_invalidation"]["steps"]
+    return {**diff, "invalidated": invalidated}
+
+
+def _ocr_reusing(
+    page_number: int,
+    img_path: Path,
+    regions_doc: Optional[dict],
+    prev_blocks: list,
+    dirty: set,
+    engine: Optional[str] = None,
+) -> Tuple[dict, int, int]:
+    """OCR só das regiões sem bloco reaproveitável; devolve (doc, re-OCRadas, reaproveitadas)."""
+    regions = page_regions(regions_doc, page_number)
+    todo = regions_needing_ocr(regions, prev_blocks, dirty)
+    fresh: list = []
+    if todo:
+        sub_doc = {
+            "chapter_id": (regions_doc or {}).get("chapter_id", "001"),
+            "pages": [{"page_number": page_number, "image_file": img_path.name, "regions": todo}],
+        }
+        fresh = page_blocks(run_ocr(page_number=page_number, image_path=img_path, regions=sub_doc, engine=engine), page_number)
+
+    blocks = merge_incremental_blocks(regions, prev_blocks, fresh, dirty | {r.get("region_id") for r in todo})
+    fresh_ids = {b.get("region_id") for b in fresh}
+    reused = sum(1 for b in blocks if b.get("region_id") not in fresh_ids)
+    doc = {
+        "chapter_id": (regions_doc or {}).get("chapter_id", "001"),
+        "pages": [{"page_number": page_number, "image_file": img_path.name, "blocks": blocks}],
+    }
+    return doc, len(todo), reused
+
+
+def _run_ocr_step(
+    job_id: str,
+    page_number: int,
+    img_path: Path,
+    ctx: Dict[str, Any],
+    state: dict,
+    engine: Optional[str] = None,
+) -> dict:
+    """
+    OCR completo, ou incremental quando há regiões sujas de uma edição (ou uma
+    especulação). engine: sobrescreve a primária (prévia).
+    """
+    regions_doc = ctx.get("regions")
+    dirty = state.get("ocr_dirty_regions")
+    prev_blocks: list = []
+    for key in ("ocr_final", "ocr_grouped", "ocr_raw"):  # ocr_final carrega as edições manuais
+        prev_blocks = page_blocks(ctx.get(key), page_number)
+        if prev_blocks:
+            break
+
+    regions = page_regions(regions_doc, page_number)
+    if dirty is None or not regions or not any(b.get("region_id") for b in prev_blocks):
+        # Primeiro OCR da página: aproveita o que foi especulado enquanto ela
+        # esperava o checkpoint de regiões (só re-OCR do que o humano mudou)
+        spec = None
+        if regions and state.get("speculation_armed"):
+            from app.core.speculation import speculative_ocr
+            spec = speculative_ocr(job_id, page_number)
+            _disarm_if_spent(job_id, page_number, state)
+        if spec is not None:
+            doc, spec_dirty = spec
+            if spec_dirty is None:
+                n_ocr, reused = 0, len(page_blocks(doc, page_number))
+            else:
+                doc, n_ocr, reused = _ocr_reusing(
+                    page_number, img_path, regions_doc, page_blocks(doc, page_number), spec_dirty, engine
+                )
+            for pg in doc.get("pages", []):
+                if str(pg.get("page_number")) == str(page_number):
+                    pg["speculative"] = {"ocr": n_ocr, "reused": reused}
+            logger.info(f"Speculative OCR promoted: {reused} region(s) reused, {n_ocr} re-OCR'd")
+            return doc
+        return run_ocr(page_number=page_number, image_path=img_path, regions=regions_doc, engine=engine)
+
+    doc, n_ocr, reused = _ocr_reusing(page_number, img_path, regions_doc, prev_blocks, set(dirty), engine)
+    logger.info(f"Incremental OCR: {n_ocr} region(s) re-OCR'd, {reused} reused")
+    doc["pages"][0]["incremental"] = {"ocr": n_ocr, "reused": reused}
+    return doc
+
+
+def _schedule_speculation(job_id: str, page_number: int, steps: list, index: int) -> None:
+    # Página parada no checkpoint: adianta OCR/limpeza/redraw (nunca derruba o run)
+    try:
+        from app.core.speculation import schedule
+        schedule(job_id, page_number, steps, index)
+    except Exception as e:
+        logger.warning(f"Speculation not scheduled for {job_id}/{page_number}: {e}")
+
+
+def _settle_speculation(job_id: str, page_number: int, ctx: Dict[str, Any]) -> None:
+    # Uma vez por run, antes do primeiro step que pode usar a especulação
+    if ctx.get("speculation_settled"):
+        return
+    ctx["speculation_settled"] = True
+    from app.core.speculation import settle
+    settle(job_id, page_number)
+
+
+def _disarm_if_spent(job_id: str, page_number: int, state: dict) -> None:
+    from app.core.speculation import load_speculation
+    if load_speculation(job_id, page_number) is None:
+        state.pop("speculation_armed", None)
+
+
+def _promote_speculative_image(
+    job_id: str, page_number: int, ctx: Dict[str, Any], state: dict, artifact: str, out_path: Path
+) -> bool:
+    # Só o run que passou pela aprovação do checkpoint usa a especulação (rerun nunca)
+    if not state.get("speculation_armed"):
+        return False
+    from app.core.speculation import promote_image
+    promoted = promote_image(job_id, page_number, page_regions(ctx.get("regions"), page_number), artifact, out_path)
+    _disarm_if_spent(job_id, page_number, state)
+    return promoted
+
+
+def _page_mode(state: dict) -> str:
+    # "preview" enquanto algum artefato da página ainda for de prévia
+    entries = state.get("steps", {}).values()
+    return "preview" if any(isinstance(e, dict) and e.get("mode") == "preview" for e in entries) else "full"
+
+
+def _record_mode(
+    job_id: str,
+    page_number: int,
+    state: dict,
+    step: dict,
+    step_id: str,
+    before: Any,
+    preview_variant: bool,
+    ctx: Dict[str, Any],
+) -> None:
+    # Step que rodou com variante barata, ou que leu um artefato de prévia, é "preview"
+    entry = state["steps"].get(step_id)
+    io = step_artifacts(step)
+    if io is None or entry is before or not isinstance(entry, dict) or entry.get("status") != "done":
+        return
+    preview = preview_variant or bool(ctx["preview_artifacts"] & set(io[0]))
+    entry["mode"] = "preview" if preview else "full"
+    if preview:
+        ctx["preview_artifacts"].update(io[1])
+    else:
+        ctx["preview_artifacts"].difference_update(io[1])
+    state["mode"] = _page_mode(state)
+    save_state(job_id, page_number, state)
+
+
+def _mark_reviewed(state: dict, steps: list, checkpoint_index: int, ctx: Dict[str, Any]) -> None:
+    # Checkpoint aprovado: o humano aceitou o que veio antes; prévia vira "reviewed"
+    for j in range(checkpoint_index):
+        entry = state["steps"].get(steps[j].get("id", f"step{j}"))
+        if isinstance(entry, dict) and entry.get("mode") == "preview":
+            entry["mode"] = "reviewed"
+    ctx["preview_artifacts"].clear()
+    state["mode"] = _page_mode(state)
+
+
+def _schedule_full_pass(job_id: str, page_number: int) -> None:
+    # Fim da prévia: qualidade cheia em segundo plano (nunca derruba o run)
+    try:
+        from app.core.preview import schedule_full_pass
+        schedule_full_pass(job_id, page_number)
+    except Exception as e:
+        logger.warning(f"Full pass not scheduled for {job_id}/{page_number}: {e}")
+
+
+def _emit_step_end(
+    job_id: str,
+    page_number: int,
+    state: dict,
+    step: dict,
+    step_id: str,
+    index: int,
+    before: Any,
+    duration: float,
+) -> None:
+    entry = state["steps"].get(step_id)
+    base = {"step_id": step_id, "step_index": index, "duration_s": round(duration, 3)}
+    if entry is before or not isinstance(entry, dict):
+        # Nada registrado para o step: parou no checkpoint esperando aprovação
+        if step.get("type") == "human_checkpoint":
+            emit(job_id, page_number, "checkpoint_waiting", checkpoint_id=state.get("checkpoint_ids", {}).get(step_id), **base)
+        return
+    if entry.get("status") == "error":
+        emit(job_id, page_number, "step_failed", error=entry.get("error"), **base)
+    else:
+        emit(job_id, page_number, "step_finished", status=entry.get("status"), **base)
+
+
+def run_page_pipeline(job_id: str, page_number: int, mode: str = "full") -> dict:
+    """
+    mode="preview": OCR, tradução e redraw com as variantes baratas (ver
+    app.core.preview); terminada a prévia, o passe de qualidade cheia vai
+    para a fila. O modo de cada step e da página fica no state.
+    """
+    # Um run por página de cada vez (entre workers e threads da API)
+    with page_lock(job_id, page_number):
+        res = _run_page_pipeline(job_id, page_number, mode)
+    if mode == "preview" and load_state(job_id, page_number).get("mode") == "preview":
+        _schedule_full_pass(job_id, page_number)
+    return res
+
+
+def _run_page_pipeline(job_id: str, page_number: int, mode: str = "full") -> dict:
     pipe = load_pipeline_def()
     steps = pipe.get("steps", [])
     state = load_state(job_id, page_number)
@@ -114,7 +554,7 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
     state.setdefault("steps", {})
     state.setdefault("checkpoint_ids", {})
 
-    logger.info(f"--- RUN job={job_id} page={page_number} ---")
+    logger.info(f"--- RUN job={job_id} page={page_number} mode={mode} ---")
     logger.info(f"Pipeline definition: {len(steps)} steps loaded.")
     
     img_path = _page_image_path(job_id, page_number)
@@ -155,7 +595,17 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
     if redraw_img.exists():
         ctx["redraw_image"] = redraw_img.name
 
+    # Artefatos atuais que ainda são de prévia (quem os lê também vira prévia)
+    ctx["preview_artifacts"] = set()
+    for idx, st in enumerate(steps):
+        entry = state["steps"].get(st.get("id", f"step{idx}"))
+        io = step_artifacts(st)
+        if io is not None and isinstance(entry, dict) and entry.get("mode") == "preview":
+            ctx["preview_artifacts"].update(io[1])
+
     i = int(state.get("current_step", 0))
+    t_run = time.perf_counter()
+    emit(job_id, page_number, "run_started", from_step=i, mode=mode)
 
     while i < len(steps):
         step = steps[i]
@@ -163,8 +613,19 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
         stype = step.get("type")
 
         state["current_step"] = i
+        entry = state["steps"].get(step_id)
+        if step_artifacts(step) is not None and isinstance(entry, dict) and entry.get("status") == "done":
+            # Entradas não mudaram desde o último run (ver invalidate_page)
+            logger.info(f"Step {i}: {step_id} up to date - skipping")
+            i += 1
+            continue
         logger.info(f"Executing step {i}: {step.get('id')} ({stype})")
         save_state(job_id, page_number, state)
+        step_before = state["steps"].get(step_id)
+        step_pos = i  # os stages fazem i += 1 antes do continue; o evento de fim usa este
+        preview_variant = False
+        t_step = time.perf_counter()
+        emit(job_id, page_number, "step_started", step_id=step_id, step_index=i, label=step.get("label"))
 
         try:
             # 1) Regions stage
@@ -188,6 +649,7 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
 
             # 2) OCR stage
             if stype == "tool" and step.get("name", "").startswith("ocr"):
+                _settle_speculation(job_id, page_number, ctx)
                 # Force reload regions to ensure fresh data (e.g. if updated via API while pipeline running)
                 rp_path = _regions_path(job_id, page_number)
                 if rp_path.exists():
@@ -203,13 +665,20 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                 else:
                      logger.warning("Regions context MISSING in run_page_pipeline")
                      
-                doc = run_ocr(
-                    page_number=page_number, 
-                    image_path=img_path, 
-                    regions=ctx.get("regions")
+                engine = None
+                if mode == "preview":
+                    from app.core.preview import preview_ocr_engine
+                    engine = preview_ocr_engine()
+                doc = _run_ocr_step(job_id, page_number, img_path, ctx, state, engine)
+                spec = next(
+                    (pg.get("speculative") for pg in doc.get("pages", []) if str(pg.get("page_number")) == str(page_number)),
+                    None,
                 )
+                # OCR todo promovido da especulação é de qualidade cheia
+                preview_variant = engine is not None and not (spec and spec.get("ocr") == 0)
                 write_json(ocrp["raw"], doc)
                 ctx["ocr_raw"] = doc
+                state.pop("ocr_dirty_regions", None)
 
                 state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso()}
                 save_state(job_id, page_number, state)
@@ -221,7 +690,13 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
 
             # 3) Grouping stage
             if stype == "agent" and step.get("name") == "grouping_agent":
-                grouped = grouping_agent(ctx["ocr_raw"])
+                panels = None
+                if settings.reading_order_panels:
+                    try:
+                        panels = {page_number: page_panels(img_path)}
+                    except Exception as e:
+                        logger.warning(f"Panel segmentation failed for page {page_number}: {e}")
+                grouped = grouping_agent(ctx["ocr_raw"], panels=panels)
                 write_json(ocrp["grouped"], grouped)
                 ctx["ocr_grouped"] = grouped
 
@@ -265,6 +740,7 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                     cid_map[step_id] = cid
                     state["checkpoint_ids"] = cid_map
                     save_state(job_id, page_number, state)
+                    _schedule_speculation(job_id, page_number, steps, i)
 
                     return {
                         "status": "awaiting_human",
@@ -279,6 +755,7 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                 # Se não aprovado, para aqui (correto)
                 if cp.get("status") != "approved":
                     save_state(job_id, page_number, state)
+                    _schedule_speculation(job_id, page_number, steps, i)
                     return {
                         "status": "awaiting_human",
                         "checkpoint_id": cid,
@@ -288,6 +765,12 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                     }
 
                 # ✅ Se aprovado, marca step como done e segue
+                _mark_reviewed(state, steps, i, ctx)
+                if (state["steps"].get(step_id) or {}).get("status") != "done":
+                    # Primeiro run depois da aprovação: pode usar o que foi especulado na espera
+                    from app.core.speculation import load_speculation
+                    if load_speculation(job_id, page_number) is not None:
+                        state["speculation_armed"] = True
                 state["steps"][step_id] = {
                     "status": "done",
                     "completed_on": utc_now_iso(),
@@ -325,7 +808,19 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                      pass 
 
                 from app.core.agents.translation_agent import translation_agent
-                trans_doc = translation_agent(ctx["ocr_final"])
+                # Blocos com o mesmo texto de origem reaproveitam a tradução anterior
+                model = None
+                if mode == "preview":
+                    from app.core.preview import preview_llm_model
+                    model = preview_llm_model()
+                trans_doc = translation_agent(
+                    ctx["ocr_final"], previous=ctx.get("translation"), model=model, preview=model is not None
+                )
+                preview_variant = any(
+                    b.get("preview")
+                    for pg in trans_doc.get("pages", []) if pg.get("page_number") == page_number
+                    for b in pg.get("blocks", [])
+                )
                 
                 # Save translation
                 trans_path = _job_dir(job_id) / "translation"
@@ -334,7 +829,7 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                 write_json(outfile, trans_doc)
                 
                 ctx["translation"] = trans_doc
-                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso()}
+                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso(), **trans_doc.get("incremental", {})}
                 
                 i += 1
                 state["current_step"] = i
@@ -348,17 +843,20 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                      # Load regions
                      pass
                 
-                from app.core.agents.cleaning_agent import cleaning_agent
-                cleaned_img = cleaning_agent(img_path, ctx["regions"])
-                
                 # Save cleaned image
                 clean_dir = _job_dir(job_id) / "cleaned"
                 ensure_dir(clean_dir)
                 out_img_path = clean_dir / f"{img_path.stem}.png" # Save as png
-                cleaned_img.save(out_img_path)
+
+                _settle_speculation(job_id, page_number, ctx)
+                promoted = _promote_speculative_image(job_id, page_number, ctx, state, "cleaned_image", out_img_path)
+                if not promoted:
+                    from app.core.agents.cleaning_agent import cleaning_agent
+                    cleaned_img = cleaning_agent(img_path, ctx["regions"])
+                    cleaned_img.save(out_img_path)
                 
                 ctx["cleaned_image"] = out_img_path.name
-                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso(), "file": out_img_path.name}
+                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso(), "file": out_img_path.name, "speculative": promoted}
                 
                 i += 1
                 state["current_step"] = i
@@ -371,17 +869,25 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                 if "regions" not in ctx:
                      pass
                 
-                from app.core.agents.redraw_agent import redraw_agent
-                redraw_img = redraw_agent(img_path, ctx["regions"])
-                
                 # Save redraw image
                 redraw_dir = _job_dir(job_id) / "redraw"
                 ensure_dir(redraw_dir)
                 out_redraw_path = redraw_dir / f"{img_path.stem}.png"
-                redraw_img.save(out_redraw_path)
+
+                _settle_speculation(job_id, page_number, ctx)
+                promoted = _promote_speculative_image(job_id, page_number, ctx, state, "redraw_image", out_redraw_path)
+                if not promoted and mode == "preview":
+                    # Inpaint rápido numa cópia reduzida (o full_pass roda o LaMa depois)
+                    from app.core.preview import preview_redraw
+                    preview_redraw(img_path, ctx["regions"]).save(out_redraw_path)
+                    preview_variant = True
+                elif not promoted:
+                    from app.core.agents.redraw_agent import redraw_agent
+                    redraw_img = redraw_agent(img_path, ctx["regions"])
+                    redraw_img.save(out_redraw_path)
                 
                 ctx["redraw_image"] = out_redraw_path.name
-                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso(), "file": out_redraw_path.name}
+                state["steps"][step_id] = {"status": "done", "completed_on": utc_now_iso(), "file": out_redraw_path.name, "speculative": promoted}
                 
                 i += 1
                 state["current_step"] = i
@@ -460,12 +966,18 @@ def run_page_pipeline(job_id: str, page_number: int) -> dict:
                 "step_id": step_id,
                 "error": str(e)
             }
+        finally:
+            # Todo desfecho do step passa aqui (continue/return inclusive)
+            _record_mode(job_id, page_number, state, step, step_id, step_before, preview_variant, ctx)
+            _emit_step_end(job_id, page_number, state, step, step_id, step_pos, step_before, time.perf_counter() - t_step)
 
     state["current_step"] = len(steps)
     save_state(job_id, page_number, state)
+    emit(job_id, page_number, "run_completed", duration_s=round(time.perf_counter() - t_run, 3), mode=_page_mode(state))
 
     return {
         "status": "completed",
+        "mode": _page_mode(state),
         "checkpoint_id": None,
         "context": {k: ctx.get(k) for k in ["job_id", "page_number", "image_filename", "regions", "ocr_raw", "ocr_grouped", "ocr_final"]},
     }
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.pipeline_engine import get_checkpoint, load_pipeline_def, load_state
+
+logger = logging.getLogger(__name__)
+
+# Prefetch de leitura: quando o revisor abre a página N no editor, as páginas
+# N+1..N+k são aquecidas em segundo plano (prioridade bulk) até o próximo
+# checkpoint humano; página já parada num checkpoint ganha a especulação do
+# que vem depois dele. O OCR/LLM roda enquanto o revisor ainda está na N.
+
+# A tarefa de prefetch é um run_page comum (payload vazio): um "rodar a página"
+# de verdade coalesce com ela e sobe a prioridade, em vez de ficar na fila atrás.
+# Os ids ficam aqui só para contar o orçamento (por processo da API).
+_PREFETCH_TASKS: Set[int] = set()
+_PREFETCH_LOCK = threading.Lock()
+
+
+def _prefetch_inflight(active: list) -> int:
+    """Prefetch ainda na fila/rodando como bulk (um pedido real que coalesceu já não conta)."""
+    ids = {t["id"] for t in active if t["kind"] == "run_page" and t["priority"] == "bulk"}
+    with _PREFETCH_LOCK:
+        _PREFETCH_TASKS.intersection_update(ids)
+        return len(_PREFETCH_TASKS)
+
+
+def _page_status(job_id: str, page_number: int, steps: list) -> str:
+    """done | waiting (checkpoint pendente) | failed | pending (tem trabalho até o próximo checkpoint)."""
+    state = load_state(job_id, page_number)
+    i = int(state.get("current_step", 0))
+    if i >= len(steps):
+        return "done"
+    step_id = steps[i].get("id", f"step{i}")
+    if (state.get("steps", {}).get(step_id) or {}).get("status") == "error":
+        return "failed"
+    if steps[i].get("type") == "human_checkpoint":
+        cid = (state.get("checkpoint_ids") or {}).get(step_id)
+        if cid:
+            try:
+                if get_checkpoint(job_id, cid).get("status") != "approved":
+                    return "waiting"
+            except FileNotFoundError:
+                pass
+    return "pending"
+
+
+def prefetch_after(job_id: str, page_number: int, k: Optional[int] = None) -> Dict[int, str]:
+    """
+    Aquece as k páginas seguintes a page_number. Devolve o que aconteceu com
+    cada uma: queued | speculating | waiting | done | failed | busy (já tem
+    tarefa na fila) | budget (limite de prefetch em andamento atingido).
+    """
+    from app.core.batch_regions import job_page_numbers
+    from app.core.speculation import schedule
+    from app.core.work_queue import active_tasks, submit
+
+    k = settings.prefetch_pages if k is None else k
+    if k <= 0 or not settings.work_queue_enabled:
+        return {}
+    steps = load_pipeline_def().get("steps", [])
+    pages = [n for n in job_page_numbers(job_id) if n > page_number][:k]
+    if not pages:
+        return {}
+
+    active = active_tasks()
+    busy = {t["page_number"] for t in active if t["job_id"] == job_id}
+    inflight = _prefetch_inflight(active) + sum(1 for t in active if t["kind"] == "speculate")
+
+    out: Dict[int, str] = {}
+    for n in pages:
+        if n in busy:
+            out[n] = "busy"
+            continue
+        status = _page_status(job_id, n, steps)
+        if status in ("done", "failed"):
+            out[n] = status
+            continue
+        if inflight >= settings.prefetch_max_inflight:
+            out[n] = "budget"
+            continue
+        if status == "waiting":
+            i = int(load_state(job_id, n).get("current_step", 0))
+            if schedule(job_id, n, steps, i) is None:
+                out[n] = "waiting"  # nada a adiantar (ou já especulado)
+                continue
+            out[n] = "speculating"
+        else:
+            task, created = submit("run_page", job_id, n, priority="bulk")
+            if created:
+                with _PREFETCH_LOCK:
+                    _PREFETCH_TASKS.add(task["id"])
+            out[n] = "queued"
+        inflight += 1
+
+    logger.info(f"Prefetch after {job_id}/{page_number}: {out}")
+    return out
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.events import emit
+from app.core.page_lock import page_lock
+from app.core.pipeline_engine import (
+    invalidate_page,
+    load_pipeline_def,
+    load_state,
+    run_page_pipeline,
+    step_artifacts,
+)
+from app.vision.inpaint import fast_inpaint
+from app.vision.masks import build_region_mask
+
+logger = logging.getLogger(__name__)
+
+# Prévia rápida: um run em modo "preview" troca os steps caros por variantes
+# baratas (OCR na engine local, tradução no modelo barato + cache, redraw com
+# inpaint OpenCV numa cópia reduzida) e entrega um resultado aproximado em
+# segundos. Cada step registra "mode" no state; os que leem um artefato de
+# prévia também ficam "preview". Padrões: OCR "mangaocr_fast" (MangaOCR int8 com
+# teto de tokens menor) e tradução no gpt-4o-mini; o pipeline padrão não tem
+# tradução nem redraw, então lá a prévia só muda o OCR. Ao fim da prévia, um
+# "full_pass" (bulk) refaz em qualidade cheia só esses steps e substitui os
+# artefatos. O que o humano
+# aprovou num checkpoint vira "reviewed" e não é refeito.
+
+
+def _mangaocr_on_gpu() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return bool(torch.cuda.is_available())
+
+
+def preview_ocr_engine() -> Optional[str]:
+    """Engine de OCR da prévia; None se não há variante mais barata que a primária."""
+    engine = settings.preview_ocr_engine
+    if not engine or engine == settings.ocr_engine:
+        return None
+    if engine == "mangaocr_fast" and settings.ocr_engine == "mangaocr" and _mangaocr_on_gpu():
+        return None  # int8 roda na CPU: não ganha do MangaOCR normal na GPU
+    return engine
+
+
+def preview_llm_model() -> Optional[str]:
+    """Modelo da tradução na prévia; None => o mesmo do run completo (só o cache ajuda)."""
+    model = settings.preview_llm_model
+    if not model:
+        return None
+    if settings.llm_base_url and "preview_llm_model" not in settings.model_fields_set:
+        # O padrão é um modelo da OpenAI; outro provedor precisa de PREVIEW_LLM_MODEL
+        return None
+    return model if model != (settings.llm_model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")) else None
+
+
+def preview_redraw(image_path: Path, regions: dict) -> Image.Image:
+    """Redraw da prévia: mesma máscara do redraw_agent, inpaint rápido em vez do LaMa."""
+    img = Image.open(image_path).convert("RGB")
+    mask, stats = build_region_mask(img.size, regions)
+    if stats["regions"] == 0:
+        return img
+    return fast_inpaint(img, mask, settings.preview_max_side)
+
+
+def preview_steps(state: dict, steps: list) -> List[int]:
+    """Índices dos steps cujo artefato atual ainda é de prévia."""
+    out: List[int] = []
+    for i, step in enumerate(steps):
+        entry = state.get("steps", {}).get(step.get("id", f"step{i}"))
+        if isinstance(entry, dict) and entry.get("mode") == "preview":
+            out.append(i)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Passe de qualidade cheia (worker)
+# ---------------------------------------------------------------------------
+
+def schedule_full_pass(job_id: str, page_number: int) -> Optional[int]:
+    """Enfileira o full_pass da página (bulk); pedido repetido reaproveita o que está na fila."""
+    if not settings.preview_full_pass:
+        return None
+    from app.core.work_queue import run_now, submit
+    task, created = submit("full_pass", job_id, page_number, priority="bulk")
+    if created and not settings.work_queue_enabled:
+        # Sem worker: roda no processo da API, sem segurar a prévia já entregue
+        threading.Thread(target=run_now, args=(task["id"],), daemon=True, name=f"full-pass-{task['id']}").start()
+    emit(job_id, page_number, "full_pass_queued", run_id=task["id"])
+    return task["id"]
+
+
+def full_pass(job_id: str, page_number: int) -> Dict[str, Any]:
+    """Tarefa "full_pass": marca os steps de prévia (e dependentes) como stale e roda em modo full."""
+    steps = load_pipeline_def().get("steps", [])
+    with page_lock(job_id, page_number):
+        targets = preview_steps(load_state(job_id, page_number), steps)
+        if not targets:
+            return {"status": "skipped", "reason": "no preview artifacts"}
+        artifacts = {a for i in targets for a in (step_artifacts(steps[i]) or ((), ()))[1]}
+        state = invalidate_page(job_id, page_number, steps, artifacts=artifacts, include=targets)
+        logger.info(f"Full pass {job_id}/{page_number}: redoing {state['last_invalidation']['steps']}")
+        return run_page_pipeline(job_id, page_number, mode="full")
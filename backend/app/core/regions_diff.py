@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.geometry import item_bbox
+
+
+def page_regions(regions_doc: Optional[dict], page_number: int) -> List[Dict[str, Any]]:
+    """Lista de regiões da página (aceita {"regions": [...]} ou {"pages": [...]})."""
+    if not isinstance(regions_doc, dict):
+        return []
+    if isinstance(regions_doc.get("regions"), list):
+        return regions_doc["regions"]
+    for p in regions_doc.get("pages") or []:
+        if str(p.get("page_number")) == str(page_number):
+            return p.get("regions") or []
+    return []
+
+
+def page_blocks(ocr_doc: Optional[dict], page_number: int) -> List[Dict[str, Any]]:
+    if not isinstance(ocr_doc, dict):
+        return []
+    for p in ocr_doc.get("pages") or []:
+        if str(p.get("page_number")) == str(page_number):
+            return p.get("blocks") or []
+    return []
+
+
+def diff_regions(old: Iterable[Dict[str, Any]], new: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Diff por region_id + bbox:
+    - added: region_id novo (ou região sem id)
+    - changed: mesmo region_id com bbox diferente
+    - removed: region_id que sumiu
+    - unchanged: mesmo region_id e mesma bbox
+    """
+    old_by_id = {r.get("region_id"): item_bbox(r) for r in old if r.get("region_id")}
+    out: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "unchanged": []}
+    seen: Set[str] = set()
+    for r in new:
+        rid = r.get("region_id")
+        if not rid:
+            continue
+        seen.add(rid)
+        if rid not in old_by_id:
+            out["added"].append(rid)
+        elif old_by_id[rid] != item_bbox(r):
+            out["changed"].append(rid)
+        else:
+            out["unchanged"].append(rid)
+    out["removed"] = [rid for rid in old_by_id if rid not in seen]
+    return out
+
+
+def regions_needing_ocr(
+    regions: List[Dict[str, Any]],
+    prev_blocks: List[Dict[str, Any]],
+    dirty: Set[str],
+) -> List[Dict[str, Any]]:
+    """Regiões sem resultado reaproveitável: sujas, sem id, ou sem bloco anterior."""
+    prev_ids = {b.get("region_id") for b in prev_blocks if b.get("region_id")}
+    return [
+        r for r in regions
+        if not r.get("region_id") or r["region_id"] in dirty or r["region_id"] not in prev_ids
+    ]
+
+
+def merge_incremental_blocks(
+    regions: List[Dict[str, Any]],
+    prev_blocks: List[Dict[str, Any]],
+    fresh_blocks: List[Dict[str, Any]],
+    dirty: Set[str],
+) -> List[Dict[str, Any]]:
+    """
+    Monta os blocos da página na ordem das regiões atuais:
+    - região re-OCRada => bloco novo
+    - região inalterada => bloco anterior (preserva edições manuais de texto)
+    - região removida => descartada
+    """
+    prev_by_id = {b["region_id"]: b for b in prev_blocks if b.get("region_id")}
+    fresh_by_id = {b["region_id"]: b for b in fresh_blocks if b.get("region_id")}
+
+    merged: List[Dict[str, Any]] = []
+    for r in regions:
+        rid = r.get("region_id")
+        if rid in fresh_by_id:
+            merged.append(dict(fresh_by_id[rid]))
+        elif rid and rid not in dirty and rid in prev_by_id:
+            merged.append(dict(prev_by_id[rid]))
+
+    for i, b in enumerate(merged, start=1):
+        b["block_id"] = f"t{i}"
+    return merged
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.events import emit
+from app.core.geometry import item_bbox
+from app.core.pipeline_engine import (
+    _job_dir,
+    _page_image_path,
+    _regions_path,
+    load_pipeline_def,
+    load_state,
+    step_artifacts,
+)
+from app.core.regions_diff import diff_regions, page_blocks, page_regions
+from app.core.storage import ensure_dir, read_json, utc_now_iso, write_json
+
+logger = logging.getLogger(__name__)
+
+# Especulação no checkpoint de regiões: enquanto a página espera aprovação, um
+# worker (tarefa "speculate", prioridade bulk) já roda OCR, limpeza e redraw
+# sobre as regiões propostas e guarda o resultado em speculative/page_NNN/,
+# junto com o fingerprint das regiões. Nada no state nem nos artefatos do job
+# muda. Na aprovação, o engine promove: regiões iguais => copia; regiões
+# editadas => OCR só das alteradas (imagens só com fingerprint idêntico).
+# Cada artefato é lido uma vez só (promovido ou descartado por estar velho) e
+# só pelo run que passou pela aprovação (state["speculation_armed"]); rerun ou
+# invalidação apaga o diretório, então um rerun de OCR/LaMa sempre recalcula.
+
+# Artefatos que dá para adiantar só com as regiões
+_ARTIFACT_FILES = {
+    "ocr_raw": "ocr_raw.json",
+    "cleaned_image": "cleaned.png",
+    "redraw_image": "redraw.png",
+}
+
+
+def _spec_dir(job_id: str, page_number: int) -> Path:
+    return _job_dir(job_id) / "speculative" / f"page_{page_number:03d}"
+
+
+def regions_fingerprint(regions: List[Dict[str, Any]]) -> str:
+    """Hash de id + bbox + polígono de cada região (o que OCR e máscaras usam)."""
+    key = [(r.get("region_id"), item_bbox(r), r.get("mask_polygon")) for r in regions]
+    return hashlib.sha1(orjson.dumps(key, option=orjson.OPT_SERIALIZE_NUMPY)).hexdigest()
+
+
+def speculative_steps(steps: list, checkpoint_index: int) -> List[int]:
+    """
+    Steps depois do checkpoint que só dependem das regiões (limpeza/redraw
+    não dependem do texto, então passam por cima do checkpoint de texto).
+    """
+    out: List[int] = []
+    for i in range(checkpoint_index + 1, len(steps)):
+        io = step_artifacts(steps[i])
+        if io is not None and set(io[0]) == {"regions"} and io[1] and io[1][0] in _ARTIFACT_FILES:
+            out.append(i)
+    return out
+
+
+def load_speculation(job_id: str, page_number: int) -> Optional[dict]:
+    p = _spec_dir(job_id, page_number) / "meta.json"
+    return read_json(p) if p.exists() else None
+
+
+def discard(job_id: str, page_number: int) -> None:
+    """Apaga a especulação da página (e cancela a que está na fila)."""
+    if settings.work_queue_enabled:
+        from app.core.work_queue import cancel_queued
+        cancel_queued(job_id, page_number, ("speculate",), reason="page invalidated")
+    shutil.rmtree(_spec_dir(job_id, page_number), ignore_errors=True)
+
+
+def _consume(job_id: str, page_number: int, meta: dict, artifact: str) -> None:
+    # Artefato usado ou velho sai da especulação; sem nenhum, some o diretório
+    d = _spec_dir(job_id, page_number)
+    name = meta.get("artifacts", {}).pop(artifact, None)
+    if name:
+        (d / name).unlink(missing_ok=True)
+    if meta.get("artifacts"):
+        write_json(d / "meta.json", meta)
+    else:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _current_regions(job_id: str, page_number: int) -> Optional[dict]:
+    rp = _regions_path(job_id, page_number)
+    return read_json(rp) if rp.exists() else None
+
+
+# ---------------------------------------------------------------------------
+# Agendamento e execução (worker)
+# ---------------------------------------------------------------------------
+
+def schedule(job_id: str, page_number: int, steps: list, checkpoint_index: int) -> Optional[int]:
+    """Enfileira a especulação da página parada em steps[checkpoint_index] (se valer a pena)."""
+    if not (settings.speculation_enabled and settings.work_queue_enabled):
+        return None
+    targets = speculative_steps(steps, checkpoint_index)
+    regions_doc = _current_regions(job_id, page_number)
+    if not targets or regions_doc is None:
+        return None
+    meta = load_speculation(job_id, page_number) or {}
+    wanted = {step_artifacts(steps[i])[1][0] for i in targets}
+    fp = regions_fingerprint(page_regions(regions_doc, page_number))
+    if meta.get("fingerprint") == fp and wanted <= set(meta.get("artifacts", {})):
+        return None  # já especulado para estas regiões
+
+    from app.core.work_queue import submit
+    task, _ = submit("speculate", job_id, page_number, priority="bulk")
+    return task["id"]
+
+
+def speculate_page(job_id: str, page_number: int) -> Dict[str, Any]:
+    """Tarefa "speculate": roda os steps adiantáveis sobre as regiões atuais."""
+    steps = load_pipeline_def().get("steps", [])
+    i = int(load_state(job_id, page_number).get("current_step", 0))
+    if i >= len(steps) or steps[i].get("type") != "human_checkpoint":
+        return {"status": "skipped", "reason": "page not waiting at a checkpoint"}
+    targets = speculative_steps(steps, i)
+    regions_doc = _current_regions(job_id, page_number)
+    if not targets or regions_doc is None:
+        return {"status": "skipped", "reason": "nothing to speculate"}
+
+    regions = page_regions(regions_doc, page_number)
+    fp = regions_fingerprint(regions)
+    meta = load_speculation(job_id, page_number) or {}
+    if meta.get("fingerprint") != fp:
+        meta = {"fingerprint": fp, "regions": regions, "created_on": utc_now_iso(), "artifacts": {}}
+    d = ensure_dir(_spec_dir(job_id, page_number))
+    img_path = _page_image_path(job_id, page_number)
+    t0 = time.perf_counter()
+
+    for idx in targets:
+        artifact = step_artifacts(steps[idx])[1][0]
+        if artifact in meta["artifacts"]:
+            continue
+        current = _current_regions(job_id, page_number)
+        if current is None or regions_fingerprint(page_regions(current, page_number)) != fp:
+            # Humano mexeu nas regiões no meio: o que já saiu continua útil (reuso parcial)
+            logger.info(f"Speculation {job_id}/{page_number} stopped: regions changed")
+            return {"status": "aborted", "reason": "regions changed", "artifacts": sorted(meta["artifacts"])}
+        out = d / _ARTIFACT_FILES[artifact]
+        if artifact == "ocr_raw":
+            from app.core.tools.ocr_router import run_ocr
+            write_json(out, run_ocr(page_number=page_number, image_path=img_path, regions=regions_doc))
+        elif artifact == "cleaned_image":
+            from app.core.agents.cleaning_agent import cleaning_agent
+            cleaning_agent(img_path, regions_doc).save(out)
+        elif artifact == "redraw_image":
+            from app.core.agents.redraw_agent import redraw_agent
+            redraw_agent(img_path, regions_doc).save(out)
+        meta["artifacts"][artifact] = out.name
+        write_json(d / "meta.json", meta)
+
+    elapsed = round(time.perf_counter() - t0, 3)
+    logger.info(f"Speculation {job_id}/{page_number} ready in {elapsed}s: {sorted(meta['artifacts'])}")
+    emit(job_id, page_number, "speculation_ready", artifacts=sorted(meta["artifacts"]), duration_s=elapsed)
+    return {"status": "done", "artifacts": sorted(meta["artifacts"]), "elapsed_s": elapsed}
+
+
+def settle(job_id: str, page_number: int) -> None:
+    """
+    Chamado pelo run aprovado antes de usar a especulação: cancela a que ainda
+    está na fila e espera (até speculation_wait_s) a que já está rodando, em
+    vez de refazer o mesmo OCR em paralelo.
+    """
+    if not settings.work_queue_enabled:
+        return
+    from app.core.work_queue import cancel_queued, list_tasks
+    cancel_queued(job_id, page_number, ("speculate",), reason="page run started")
+    deadline = time.monotonic() + settings.speculation_wait_s
+    while any(
+        t["kind"] == "speculate" and t["status"] == "leased" and (t["lease_expires"] or 0) > time.time()
+        for t in list_tasks(job_id, page_number, limit=20)
+    ):
+        if time.monotonic() > deadline:
+            logger.info(f"Speculation {job_id}/{page_number} still running; not waiting any longer")
+            return
+        time.sleep(settings.page_lock_poll_s)
+
+
+# ---------------------------------------------------------------------------
+# Promoção (engine)
+# ---------------------------------------------------------------------------
+
+def speculative_ocr(job_id: str, page_number: int) -> Optional[Tuple[dict, Optional[Set[str]]]]:
+    """
+    (doc especulado, regiões que mudaram desde a especulação) ou None.
+    Regiões idênticas => None no lugar do conjunto (o doc vale como está);
+    senão o engine re-OCRa só as que mudaram (ver _ocr_reusing), o que exige
+    blocos com region_id. O OCR especulado sai da especulação aqui.
+    """
+    meta = load_speculation(job_id, page_number)
+    if not meta or "ocr_raw" not in meta.get("artifacts", {}):
+        return None
+    p = _spec_dir(job_id, page_number) / meta["artifacts"]["ocr_raw"]
+    doc = read_json(p) if p.exists() else None
+    _consume(job_id, page_number, meta, "ocr_raw")
+    if doc is None:
+        return None
+    regions = page_regions(_current_regions(job_id, page_number), page_number)
+    if regions_fingerprint(regions) == meta.get("fingerprint"):
+        return doc, None
+    if not any(b.get("region_id") for b in page_blocks(doc, page_number)):
+        return None
+    diff = diff_regions(meta.get("regions") or [], regions)
+    return doc, set(diff["added"]) | set(diff["changed"])
+
+
+def promote_image(job_id: str, page_number: int, regions: List[Dict[str, Any]], artifact: str, out_path: Path) -> bool:
+    """
+    Move a imagem especulada para out_path se as regiões são as mesmas da
+    especulação; senão ela é descartada.
+    """
+    meta = load_speculation(job_id, page_number)
+    if not meta or artifact not in meta.get("artifacts", {}):
+        return False
+    src = _spec_dir(job_id, page_number) / meta["artifacts"][artifact]
+    if not src.exists() or meta.get("fingerprint") != regions_fingerprint(regions):
+        _consume(job_id, page_number, meta, artifact)
+        return False
+    shutil.copyfile(src, out_path)
+    _consume(job_id, page_number, meta, artifact)
+    logger.info(f"Speculative {artifact} promoted for {job_id}/{page_number}")
+    return True
@@ -6,55 +6,27 @@ import numpy as np
 
 def _detect_text_regions(img_rgb: np.ndarray, max_blocks: int) -> List[Tuple[int,int,int,int]]:
     import cv2
-    gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
-    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9,9))
-    dil = cv2.dilate(thr, kernel, iterations=1)
-    contours, _ = cv2.findContours(dil, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    h, w = gray.shape[:2]
-    boxes = []
-    for c in contours:
-        x, y, ww, hh = cv2.boundingRect(c)
-        area = ww * hh
-        if area < 800:
-            continue
-        if ww < 20 or hh < 20:
-            continue
-        if ww > w*0.95 and hh > h*0.95:
-            continue
-        pad = 4
-        x1 = max(0, x - pad)
-        y1 = max(0, y - pad)
-        x2 = min(w, x + ww + pad)
-        y2 = min(h, y + hh + pad)
-        boxes.append((x1,y1,x2,y2))
+    from app.vision.region_detector import detect_boxes
 
+    gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
+    boxes = [tuple(b) for b in detect_boxes(gray, "mangaocr_baseline").tolist()]
     boxes.sort(key=lambda b: (-(b[0]+b[2])/2, (b[1]+b[3])/2))
     return boxes[:max_blocks]
 
 def run_ocr_mangaocr(image_path: Path, page_number: int, max_blocks: int = 40) -> dict:
-    try:
-        from PIL import Image
-        from manga_ocr import MangaOcr
-    except Exception as e:
-        raise RuntimeError(
-            "MangaOCR não está instalado. Instale PyTorch primeiro e depois rode: "
-            "pip install -r requirements-ocr-mangaocr.txt"
-        ) from e
+    from PIL import Image
+    from app.ocr.mangaocr_service import get_mangaocr_service
 
-    ocr = MangaOcr()
+    # Modelo carregado uma vez por worker (não recarrega os pesos a cada página)
+    service = get_mangaocr_service()
+    service.load()
     img = Image.open(image_path).convert("RGB")
     img_np = np.array(img)
 
     boxes = _detect_text_regions(img_np, max_blocks=max_blocks)
+    texts = service.recognize([img.crop(b) for b in boxes])
     blocks = []
-    for i, (x1,y1,x2,y2) in enumerate(boxes, start=1):
-        crop = img.crop((x1,y1,x2,y2))
-        try:
-            text = ocr(crop)
-        except Exception:
-            text = ""
+    for i, ((x1,y1,x2,y2), text) in enumerate(zip(boxes, texts), start=1):
         ww = x2 - x1
         hh = y2 - y1
         shape_hint = "vertical" if hh >= ww*1.2 else "horizontal"
@@ -72,7 +44,7 @@ def run_ocr_mangaocr(image_path: Path, page_number: int, max_blocks: int = 40) -
         ))
 
     if not blocks:
-        text = ocr(img)
+        text = service.recognize([img])[0]
         blocks = [OCRBlock(
             block_id="t1",
             original_text=(text or "").strip(),
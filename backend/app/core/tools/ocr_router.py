@@ -1,35 +1,259 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
 from pathlib import Path
-import traceback
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
+from app.core.config import settings
 from app.core.tools.ocr_stub import run_ocr_stub
-# from app.ocr.mangaocr_tool import run_ocr_mangaocr
-from app.ocr.gpt_vision_tool import run_ocr_gpt_vision
 
+logger = logging.getLogger(__name__)
+
+# Assinatura comum: (page_number, image_path, chapter_id, regions) -> ocr doc
+EngineFn = Callable[[int, Path, str, Optional[dict]], dict]
+
+# Limites superiores (segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS: Tuple[float, ...] = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _engine_gpt_vision(page_number: int, image_path: Path, chapter_id: str, regions: Optional[dict]) -> dict:
+    from app.ocr.gpt_vision_tool import run_ocr_gpt_vision
+    return run_ocr_gpt_vision(
+        image_path=str(image_path),
+        chapter_id=chapter_id,
+        page_number=page_number,
+        image_filename=image_path.name,
+        regions=regions,
+    )
+
+
+def _engine_mangaocr(page_number: int, image_path: Path, chapter_id: str, regions: Optional[dict]) -> dict:
+    from app.ocr.mangaocr_tool import run_ocr_mangaocr
+    return run_ocr_mangaocr(
+        image_path=str(image_path),
+        chapter_id=chapter_id,
+        page_number=page_number,
+        image_filename=image_path.name,
+        regions=regions,
+    )
+
+
+def _engine_mangaocr_fast(page_number: int, image_path: Path, chapter_id: str, regions: Optional[dict]) -> dict:
+    # Variante da prévia: MangaOCR int8 (CPU) com teto de tokens menor
+    from app.ocr.mangaocr_tool import run_ocr_mangaocr
+    return run_ocr_mangaocr(
+        image_path=str(image_path),
+        chapter_id=chapter_id,
+        page_number=page_number,
+        image_filename=image_path.name,
+        regions=regions,
+        variant="fast",
+    )
+
+
+def _engine_stub(page_number: int, image_path: Path, chapter_id: str, regions: Optional[dict]) -> dict:
+    return run_ocr_stub(page_number=page_number, image_filename=image_path.name)
+
+
+@dataclass
+class _EngineStats:
+    """Janela deslizante + histograma + circuit breaker de uma engine."""
+    window: Deque[Tuple[float, bool]] = field(default_factory=deque)  # (latência, ok)
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    total_s: float = 0.0
+    state: str = "closed"  # closed | open | half_open
+    opened_at: float = 0.0
+    trial_in_flight: bool = False
+
+    def p95(self) -> float:
+        lat = sorted(x[0] for x in self.window)
+        if not lat:
+            return 0.0
+        return lat[min(len(lat) - 1, int(round(0.95 * (len(lat) - 1))))]
+
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for _, ok in self.window if not ok) / len(self.window)
+
+
+class OCRRouter:
+    """
+    Roteador de OCR:
+    - engine primária vinda de settings.ocr_engine (gpt_vision | mangaocr | stub)
+    - timeout por engine
+    - circuit breaker: se p95 ou taxa de erro da engine passar do limite,
+      o tráfego vai para a engine local (settings.ocr_fallback_engine) até o cooldown
+    - histograma de latência por engine
+    """
+
+    def __init__(self) -> None:
+        self._engines: Dict[str, EngineFn] = {}
+        self._stats: Dict[str, _EngineStats] = {}
+        self._lock = threading.Lock()
+        # Um pool por engine: chamada remota que estourou o timeout segue presa
+        # na thread dela e não pode atrasar (nem estourar o timeout de) a local
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
 
-def run_ocr(page_number: int, image_path: Path, chapter_id: str = "001", regions: dict = None) -> dict:
+    def register(self, name: str, fn: EngineFn) -> None:
+        with self._lock:
+            self._engines[name] = fn
+            self._stats.setdefault(name, _EngineStats())
+            if name not in self._executors:
+                self._executors[name] = ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"ocr-{name}")
+
+    def engines(self) -> List[str]:
+        return list(self._engines.keys())
+
+    # --- circuit breaker ---
+
+    def _allow(self, name: str) -> bool:
+        with self._lock:
+            st = self._stats[name]
+            if st.state == "closed":
+                return True
+            if st.state == "open" and time.monotonic() - st.opened_at >= settings.ocr_breaker_cooldown_s:
+                st.state = "half_open"
+            if st.state == "half_open" and not st.trial_in_flight:
+                # deixa passar uma única chamada de teste
+                st.trial_in_flight = True
+                return True
+            return False
+
+    def _record(self, name: str, latency: float, ok: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            st = self._stats[name]
+            st.calls += 1
+            st.total_s += latency
+            st.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            if not ok:
+                st.errors += 1
+            if timed_out:
+                st.timeouts += 1
+
+            st.window.append((latency, ok))
+            while len(st.window) > settings.ocr_breaker_window:
+                st.window.popleft()
+
+            if st.state == "half_open":
+                st.trial_in_flight = False
+                if ok:
+                    st.state = "closed"
+                    st.window.clear()
+                else:
+                    st.state = "open"
+                    st.opened_at = time.monotonic()
+                return
+
+            if st.state == "closed" and len(st.window) >= settings.ocr_breaker_min_samples:
+                p95, err = st.p95(), st.error_rate()
+                if p95 > settings.ocr_breaker_p95_s or err > settings.ocr_breaker_error_rate:
+                    st.state = "open"
+                    st.opened_at = time.monotonic()
+                    logger.warning(
+                        f"[OCR_ROUTER] circuit OPEN for '{name}' (p95={p95:.1f}s, error_rate={err:.0%})"
+                    )
+
+    # --- execução ---
+
+    def _call(self, name: str, page_number: int, image_path: Path, chapter_id: str, regions: Optional[dict]) -> dict:
+        timeout = float(settings.ocr_engine_timeouts.get(name, 0)) or None
+        t0 = time.monotonic()
+        future = self._executors[name].submit(self._engines[name], page_number, image_path, chapter_id, regions)
+        try:
+            doc = future.result(timeout=timeout)
+        except FutureTimeout:
+            # A thread continua rodando em background; o resultado é descartado.
+            self._record(name, time.monotonic() - t0, ok=False, timed_out=True)
+            raise TimeoutError(f"OCR engine '{name}' exceeded {timeout}s")
+        except Exception:
+            self._record(name, time.monotonic() - t0, ok=False)
+            raise
+        self._record(name, time.monotonic() - t0, ok=True)
+        return doc
+
+    def route(
+        self,
+        page_number: int,
+        image_path: Path,
+        chapter_id: str = "001",
+        regions: Optional[dict] = None,
+        engine: Optional[str] = None,
+    ) -> dict:
+        primary = settings.ocr_engine if settings.ocr_engine in self._engines else "mangaocr"
+        chain: List[str] = []
+        # engine explícita (ex.: prévia) vai na frente; se falhar, segue a cadeia normal
+        for name in (engine, primary, settings.ocr_fallback_engine, "stub"):
+            if name in self._engines and name not in chain:
+                chain.append(name)
+
+        for name in chain:
+            if name != "stub" and not self._allow(name):
+                logger.warning(f"[OCR_ROUTER] circuit open for '{name}', skipping")
+                continue
+            try:
+                doc = self._call(name, page_number, image_path, chapter_id, regions)
+                logger.info(f"[OCR_ROUTER] page {page_number} served by '{name}'")
+                return doc
+            except Exception:
+                logger.exception(f"[OCR_ROUTER] engine '{name}' failed")
+
+        return run_ocr_stub(page_number=page_number, image_filename=image_path.name)
+
+    def metrics(self) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        with self._lock:
+            for name, st in self._stats.items():
+                labels = [f"le_{b:g}" for b in LATENCY_BUCKETS] + ["le_inf"]
+                out[name] = {
+                    "state": st.state,
+                    "calls": st.calls,
+                    "errors": st.errors,
+                    "timeouts": st.timeouts,
+                    "mean_s": round(st.total_s / st.calls, 3) if st.calls else 0.0,
+                    "window_p95_s": round(st.p95(), 3),
+                    "window_error_rate": round(st.error_rate(), 3),
+                    "histogram": dict(zip(labels, st.buckets)),
+                }
+        return out
+
+
+router = OCRRouter()
+router.register("gpt_vision", _engine_gpt_vision)
+router.register("mangaocr", _engine_mangaocr)
+router.register("mangaocr_fast", _engine_mangaocr_fast)
+router.register("stub", _engine_stub)
+
+
+def run_ocr(
+    page_number: int,
+    image_path: Path,
+    chapter_id: str = "001",
+    regions: dict = None,
+    engine: Optional[str] = None,
+) -> dict:
     """
     OCR Router:
-    - default: GPT-4 Vision -> Real OCR
-    - fallback: stub (if GPT fails)
+    - engine: settings.ocr_engine (gpt_vision | mangaocr | stub), ou `engine` se informada
+    - fallback: settings.ocr_fallback_engine (local), depois stub
     """
 
     # 1) File check
     if not image_path.exists():
-        print(f"[OCR_ROUTER] ERROR: image not found at: {image_path}")
+        logger.error(f"[OCR_ROUTER] ERROR: image not found at: {image_path}")
         return run_ocr_stub(page_number=page_number, image_filename=image_path.name)
 
-    try:
-        # 2) Real OCR (GPT Vision)
-        return run_ocr_gpt_vision(
-            image_path=str(image_path),
-            chapter_id=chapter_id,
-            page_number=page_number,
-            image_filename=image_path.name,
-            regions=regions,
-        )
-    except Exception:
-        # 3) Log error + fallback
-        print("[OCR_ROUTER] GPT Vision failed, using OCR_STUB. Full traceback:")
-        traceback.print_exc()
-        return run_ocr_stub(page_number=page_number, image_filename=image_path.name)
+    return router.route(page_number, image_path, chapter_id=chapter_id, regions=regions, engine=engine)
+
 
+def ocr_router_metrics() -> Dict[str, dict]:
+    return router.metrics()
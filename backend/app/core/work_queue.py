@@ -0,0 +1,816 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.storage import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+# Fila durável em SQLite: a API só enfileira; os workers (python -m app.worker)
+# pegam tarefas com lease. Enquanto roda, o worker renova o lease; se o worker
+# morrer, o lease vence (visibility timeout) e outro worker pega a tarefa de
+# novo. Falhas voltam para a fila com backoff até max_attempts; depois "dead".
+#
+# status: queued -> leased -> done | (queued de novo) | dead; queued -> superseded
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT    NOT NULL,
+    job_id        TEXT    NOT NULL,
+    page_number   INTEGER,
+    payload       TEXT    NOT NULL DEFAULT '{}',
+    status        TEXT    NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    available_at  REAL    NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    result        TEXT,
+    created_at    REAL    NOT NULL,
+    updated_at    REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_ready ON tasks (status, available_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_page ON tasks (job_id, page_number);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT    PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS page_locks (
+    job_id      TEXT    NOT NULL,
+    page_number INTEGER NOT NULL,
+    owner       TEXT    NOT NULL,
+    acquired_at REAL    NOT NULL,
+    expires     REAL    NOT NULL,
+    PRIMARY KEY (job_id, page_number)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id   TEXT    PRIMARY KEY,
+    concurrency INTEGER NOT NULL,
+    started_at  REAL    NOT NULL,
+    last_seen   REAL    NOT NULL
+);
+"""
+
+# Colunas adicionadas depois da primeira versão (ALTER TABLE em bancos antigos)
+_COLUMNS = {
+    "idempotency_key": "TEXT",
+    "priority": "TEXT NOT NULL DEFAULT 'normal'",
+}
+_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_tasks_idem ON tasks (idempotency_key) WHERE idempotency_key IS NOT NULL",
+]
+
+
+# Tarefas na fila que uma nova tarefa do tipo torna inúteis: rewind + run
+# já leva a página até o fim (ou até o próximo checkpoint); especulação na
+# fila não deve segurar a página de um run de verdade
+SUPERSEDES: Dict[str, Tuple[str, ...]] = {
+    "run_page": ("speculate",),
+    "rerun_ocr": ("run_page", "speculate"),
+    "rerun_step": ("run_page", "speculate"),
+}
+
+
+# Classes de prioridade, da mais urgente para a menos: interactive (editor),
+# normal, bulk (upload de capítulo, prefetch). Ver claim() para a ordem.
+PRIORITIES: Tuple[str, ...] = ("interactive", "normal", "bulk")
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key já usada para outra tarefa (tipo/job/página/payload diferentes)."""
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED: set = set()
+
+
+def queue_path() -> Path:
+    if settings.work_queue_path:
+        return Path(settings.work_queue_path).resolve()
+    return settings.data_dir() / "queue" / "work_queue.db"
+
+
+def _connect() -> sqlite3.Connection:
+    # Uma conexão por operação: seguro entre threads e entre processos (WAL)
+    path = queue_path()
+    ensure_dir(path.parent)
+    conn = sqlite3.connect(str(path), timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 30000")
+    key = str(path)
+    if key not in _INITIALIZED:
+        with _INIT_LOCK:
+            if key not in _INITIALIZED:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                have = {r["name"] for r in conn.execute("PRAGMA table_info(tasks)")}
+                for col, decl in _COLUMNS.items():
+                    if col not in have:
+                        conn.execute(f"ALTER TABLE tasks ADD COLUMN {col} {decl}")
+                for sql in _INDEXES:
+                    conn.execute(sql)
+                _INITIALIZED.add(key)
+    return conn
+
+
+def _bump(conn: sqlite3.Connection, name: str, n: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+        (name, n),
+    )
+
+
+def _task(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    t = dict(row)
+    t["payload"] = orjson.loads(t["payload"]) if t["payload"] else {}
+    t["result"] = orjson.loads(t["result"]) if t["result"] else None
+    return t
+
+
+def submit(
+    kind: str,
+    job_id: str,
+    page_number: Optional[int] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    idempotency_key: Optional[str] = None,
+    coalesce: bool = True,
+    join_running: bool = False,
+    delay_s: float = 0.0,
+    debounce_s: float = 0.0,
+    priority: str = "normal",
+    max_attempts: Optional[int] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Enfileira e devolve (tarefa, criada). Com idempotency_key, repetir o pedido
+    devolve a tarefa original (criada=False) em vez de abrir outra; a mesma
+    chave com outro pedido => IdempotencyConflict.
+
+    coalesce: se já existe a mesma tarefa (tipo/job/página/payload) esperando
+    na fila, devolve essa (marcada com "coalesced"; ainda não começou, então
+    vai ver os dados atuais). Tarefas na fila que a nova cobre (SUPERSEDES)
+    são canceladas ("superseded").
+    join_running: idem para uma que já está rodando (só para pedidos sem dado
+    novo, p.ex. "rodar a página"; após uma edição o run em andamento pode ter
+    lido a versão antiga, então a nova tarefa fica na fila atrás dele).
+    debounce_s: janela por página (saves seguidos do editor): a tarefa só fica
+    pronta debounce_s depois do último pedido; cada pedido igual empurra a janela.
+    priority: classe em PRIORITIES; um pedido mais urgente que a tarefa
+    reaproveitada sobe a prioridade dela.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown task kind: {kind}")
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    payload = payload or {}
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if idempotency_key:
+            row = conn.execute("SELECT * FROM tasks WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                task = _task(row)
+                if (task["kind"], task["job_id"], task["page_number"], task["payload"]) != (kind, job_id, page_number, payload):
+                    raise IdempotencyConflict(idempotency_key)
+                return task, False
+        row = None
+        if coalesce:
+            statuses = ("queued", "leased") if join_running else ("queued",)
+            row = conn.execute(
+                f"SELECT * FROM tasks WHERE kind = ? AND job_id = ? AND page_number IS ? AND payload = ?"
+                f" AND status IN ({','.join('?' * len(statuses))}) ORDER BY id LIMIT 1",
+                (kind, job_id, page_number, orjson.dumps(payload).decode(), *statuses),
+            ).fetchone()
+        if row is not None:
+            task_id, created = row["id"], False
+            if idempotency_key and row["idempotency_key"] is None:
+                # A tarefa herda a chave: a repetição do cliente vira replay dela
+                conn.execute("UPDATE tasks SET idempotency_key = ? WHERE id = ?", (idempotency_key, task_id))
+            if PRIORITIES.index(priority) < PRIORITIES.index(row["priority"]):
+                conn.execute("UPDATE tasks SET priority = ? WHERE id = ?", (priority, task_id))
+            if debounce_s and row["status"] == "queued" and not row["attempts"] and row["available_at"] < now + debounce_s:
+                conn.execute(
+                    "UPDATE tasks SET available_at = ?, updated_at = ? WHERE id = ?", (now + debounce_s, now, task_id)
+                )
+                _bump(conn, "debounced")
+            _bump(conn, "coalesced")
+        else:
+            cur = conn.execute(
+                "INSERT INTO tasks (kind, job_id, page_number, payload, status, priority, max_attempts, available_at,"
+                " idempotency_key, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    job_id,
+                    page_number,
+                    orjson.dumps(payload).decode(),
+                    priority,
+                    max_attempts or settings.work_queue_max_attempts,
+                    now + max(delay_s, debounce_s),
+                    idempotency_key or None,
+                    now,
+                    now,
+                ),
+            )
+            task_id, created = cur.lastrowid, True
+        superseded = 0
+        if coalesce and SUPERSEDES.get(kind):
+            covered = SUPERSEDES[kind]
+            superseded = conn.execute(
+                f"UPDATE tasks SET status = 'superseded', result = ?, updated_at = ?"
+                f" WHERE job_id = ? AND page_number IS ? AND status = 'queued' AND id != ?"
+                f" AND kind IN ({','.join('?' * len(covered))})",
+                (orjson.dumps({"superseded_by": task_id}).decode(), now, job_id, page_number, task_id, *covered),
+            ).rowcount
+            if superseded:
+                _bump(conn, "superseded", superseded)
+        task = _task(conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone())
+        conn.execute("COMMIT")
+    except IdempotencyConflict:
+        raise
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    if superseded:
+        logger.info(f"Task {task_id} superseded {superseded} queued task(s) of job={job_id} page={page_number}")
+    if not created:
+        logger.info(f"Coalesced {kind} job={job_id} page={page_number} onto task {task_id} ({task['status']})")
+        return {**task, "coalesced": True}, False
+    logger.info(f"Queued task {task_id}: {kind} job={job_id} page={page_number} ({priority})")
+    return task, True
+
+
+def enqueue(
+    kind: str,
+    job_id: str,
+    page_number: Optional[int] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    delay_s: float = 0.0,
+    priority: str = "normal",
+    max_attempts: Optional[int] = None,
+) -> int:
+    task, _ = submit(kind, job_id, page_number, payload, delay_s=delay_s, priority=priority, max_attempts=max_attempts)
+    return int(task["id"])
+
+
+def claim(
+    worker_id: str,
+    kinds: Optional[Iterable[str]] = None,
+    lease_s: Optional[float] = None,
+    task_id: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Pega a próxima tarefa pronta (na fila e disponível, ou com lease vencido)
+    e a marca como leased por `worker_id`. None se não houver nada.
+    task_id restringe a uma tarefa específica (execução no processo da API).
+    concurrency: threads do processo worker (padrão WORKER_CONCURRENCY).
+
+    Ordem: menor available_at + queue_aging_s * (classe + runs ativos do job),
+    com classe 0/1/2 = interactive/normal/bulk. Uma tarefa bulk passa na frente
+    de uma interactive que chegou 2 * queue_aging_s depois dela (aging: nada
+    fica esperando para sempre), e cada run já ativo do mesmo job atrasa as
+    outras tarefas dele (um upload de 300 páginas não ocupa todos os workers).
+    Classes no limite de runs ativos do processo (queue_max_running_*, contados
+    pelas tarefas leased com o prefixo "host:pid:" do worker_id) ficam de fora.
+    """
+    lease_s = lease_s or settings.work_queue_lease_s
+    kinds = list(kinds or [])
+    kind_sql = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+    if task_id is not None:
+        kind_sql += " AND id = ?"
+        kinds.append(task_id)
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if task_id is None:
+            conc = max(1, concurrency or settings.worker_concurrency)
+            prefix = worker_id.rsplit(":", 1)[0] + ":"
+            running = dict(
+                conn.execute(
+                    "SELECT priority, COUNT(*) FROM tasks WHERE status = 'leased' AND lease_expires > ?"
+                    " AND substr(lease_owner, 1, ?) = ? GROUP BY priority",
+                    (now, len(prefix), prefix),
+                ).fetchall()
+            )
+            full = [c for c in PRIORITIES if 0 < _class_limit(c, conc) <= running.get(c, 0)]
+            if conc == 1 and settings.queue_max_running_bulk < 0 and "bulk" not in full and conn.execute(
+                "SELECT 1 FROM tasks WHERE status = 'queued' AND available_at <= ? AND priority = 'interactive' LIMIT 1",
+                (now,),
+            ).fetchone():
+                # Vaga única: com interactive pronta, bulk não a pega (nem com aging)
+                full.append("bulk")
+            if full:
+                kind_sql += f" AND priority NOT IN ({','.join('?' * len(full))})"
+                kinds.extend(full)
+        # Lease vencido sem tentativas sobrando: o worker morreu na última chance
+        conn.execute(
+            "UPDATE tasks SET status = 'dead', lease_owner = NULL, updated_at = ?,"
+            " last_error = COALESCE(last_error || ' | ', '') || 'lease expired'"
+            " WHERE status = 'leased' AND lease_expires <= ? AND attempts >= max_attempts",
+            (now, now),
+        )
+        # Página com run em andamento (tarefa leased ou lock de um run fora da
+        # fila) fica para depois: o worker não ocupa uma vaga esperando o lock
+        row = conn.execute(
+            "SELECT id FROM tasks"
+            " WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?))"
+            + kind_sql
+            + " AND NOT EXISTS (SELECT 1 FROM tasks b WHERE b.status = 'leased' AND b.lease_expires > ?"
+            "   AND b.job_id = tasks.job_id AND b.page_number IS tasks.page_number AND b.id != tasks.id)"
+            " AND NOT EXISTS (SELECT 1 FROM page_locks l WHERE l.expires > ?"
+            "   AND l.job_id = tasks.job_id AND l.page_number IS tasks.page_number)"
+            " ORDER BY available_at + ? * ("
+            "   CASE priority WHEN 'interactive' THEN 0 WHEN 'bulk' THEN 2 ELSE 1 END"
+            "   + (SELECT COUNT(*) FROM tasks r WHERE r.status = 'leased' AND r.lease_expires > ? AND r.job_id = tasks.job_id)"
+            " ), id LIMIT 1",
+            (now, now, *kinds, now, now, settings.queue_aging_s, now),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?"
+            " WHERE id = ?",
+            (worker_id, now + lease_s, now, row["id"]),
+        )
+        task = _task(conn.execute("SELECT * FROM tasks WHERE id = ?", (row["id"],)).fetchone())
+        conn.execute("COMMIT")
+        return task
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _class_limit(priority: str, concurrency: int) -> int:
+    """Máximo de runs ativos da classe num processo worker com `concurrency` threads; 0 = sem limite."""
+    limit = int(getattr(settings, f"queue_max_running_{priority}", 0))
+    if limit < 0:
+        # auto: bulk deixa uma vaga livre para o editor. Com uma vaga só, bulk
+        # fica com ela apenas sem interactive pronta (ver claim); uma tarefa
+        # bulk já rodando não é interrompida
+        limit = max(1, concurrency - 1)
+    return limit
+
+
+def heartbeat(task_id: int, worker_id: str, lease_s: Optional[float] = None) -> bool:
+    """Renova o lease; False se a tarefa não é mais deste worker (lease perdido)."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + (lease_s or settings.work_queue_lease_s), now, task_id, worker_id),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def complete(task_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+    now = time.time()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (orjson.dumps(result).decode() if result is not None else None, now, task_id, worker_id),
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def fail(task_id: int, worker_id: str, error: str) -> Optional[str]:
+    """
+    Registra a falha: volta para a fila com backoff exponencial, ou "dead" se
+    acabaram as tentativas. Devolve o novo status (None se o lease foi perdido).
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (task_id, worker_id),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        if row["attempts"] >= row["max_attempts"]:
+            status, available_at = "dead", now
+        else:
+            status = "queued"
+            available_at = now + settings.work_queue_retry_backoff_s * (2 ** (row["attempts"] - 1))
+        conn.execute(
+            "UPDATE tasks SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL,"
+            " updated_at = ? WHERE id = ?",
+            (status, available_at, error[:2000], now, task_id),
+        )
+        conn.execute("COMMIT")
+        return status
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def get_task(task_id: int) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    try:
+        return _task(conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def get_tasks(task_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    ids = list(task_ids)
+    if not ids:
+        return {}
+    conn = _connect()
+    try:
+        out: Dict[int, Dict[str, Any]] = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            rows = conn.execute(f"SELECT * FROM tasks WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            out.update((r["id"], _task(r)) for r in rows.fetchall())
+        return out
+    finally:
+        conn.close()
+
+
+def list_tasks(job_id: str, page_number: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    conn = _connect()
+    try:
+        if page_number is None:
+            rows = conn.execute("SELECT * FROM tasks WHERE job_id = ? ORDER BY id DESC LIMIT ?", (job_id, limit))
+        else:
+            rows = conn.execute(
+                "SELECT * FROM tasks WHERE job_id = ? AND page_number = ? ORDER BY id DESC LIMIT ?",
+                (job_id, page_number, limit),
+            )
+        return [_task(r) for r in rows.fetchall()]
+    finally:
+        conn.close()
+
+
+def active_tasks(job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Tarefas na fila ou rodando (de um job, ou de todos)."""
+    sql = "SELECT * FROM tasks WHERE status IN ('queued', 'leased')"
+    args: List[Any] = []
+    if job_id is not None:
+        sql += " AND job_id = ?"
+        args.append(job_id)
+    conn = _connect()
+    try:
+        return [_task(r) for r in conn.execute(sql + " ORDER BY id", args).fetchall()]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Presença dos workers: cada processo worker (host:pid) marca last_seen
+# enquanto roda, para a API avisar quando há fila e ninguém consumindo
+# ---------------------------------------------------------------------------
+
+def worker_seen(worker_id: str, concurrency: int) -> None:
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO workers (worker_id, concurrency, started_at, last_seen) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (worker_id) DO UPDATE SET concurrency = excluded.concurrency, last_seen = excluded.last_seen",
+            (worker_id, concurrency, now, now),
+        )
+    finally:
+        conn.close()
+
+
+def worker_gone(worker_id: str) -> None:
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+    finally:
+        conn.close()
+
+
+def live_workers() -> List[Dict[str, Any]]:
+    """Processos worker vistos nos últimos worker_stale_s segundos."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM workers WHERE last_seen > ? ORDER BY worker_id", (time.time() - settings.worker_stale_s,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def check_workers() -> bool:
+    """Loga um aviso se a fila está ligada e nenhum worker está consumindo. True se há worker."""
+    if not settings.work_queue_enabled:
+        return True
+    try:
+        workers = live_workers()
+    except sqlite3.Error as e:
+        logger.warning(f"Work queue check failed: {e}")
+        return False
+    if workers:
+        logger.info(f"Work queue: {len(workers)} worker(s) online ({', '.join(w['worker_id'] for w in workers)})")
+        return True
+    ready = queue_stats()["ready"]
+    logger.warning(
+        f"WORK_QUEUE_ENABLED=true but no worker seen in the last {settings.worker_stale_s:.0f}s"
+        f" ({ready} task(s) ready): pipeline runs stay queued until `python -m app.worker` is running"
+        " (or set WORK_QUEUE_ENABLED=false to run them in the API process)"
+    )
+    return False
+
+
+def queue_stats() -> Dict[str, Any]:
+    now = time.time()
+    conn = _connect()
+    try:
+        by_status = {r["status"]: r["n"] for r in conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status")}
+        ready = conn.execute(
+            "SELECT COUNT(*) AS n, MIN(available_at) AS oldest FROM tasks WHERE status = 'queued' AND available_at <= ?",
+            (now,),
+        ).fetchone()
+        expired = conn.execute(
+            "SELECT COUNT(*) AS n FROM tasks WHERE status = 'leased' AND lease_expires <= ?", (now,)
+        ).fetchone()["n"]
+        locked = conn.execute("SELECT COUNT(*) AS n FROM page_locks WHERE expires > ?", (now,)).fetchone()["n"]
+        workers = conn.execute(
+            "SELECT COUNT(*) AS n FROM workers WHERE last_seen > ?", (now - settings.worker_stale_s,)
+        ).fetchone()["n"]
+        counters = {r["name"]: r["value"] for r in conn.execute("SELECT name, value FROM counters")}
+        by_priority: Dict[str, Dict[str, int]] = {}
+        for r in conn.execute(
+            "SELECT priority, status, COUNT(*) AS n FROM tasks WHERE status IN ('queued', 'leased') GROUP BY priority, status"
+        ):
+            by_priority.setdefault(r["priority"], {})[r["status"]] = r["n"]
+    finally:
+        conn.close()
+    return {
+        "path": str(queue_path()),
+        "by_status": by_status,
+        "ready": ready["n"],
+        "oldest_ready_age_s": round(now - ready["oldest"], 3) if ready["oldest"] else 0.0,
+        "expired_leases": expired,
+        "locked_pages": locked,
+        "workers": workers,
+        "by_priority": {
+            # max_running vale por processo worker (com WORKER_CONCURRENCY threads)
+            c: {**by_priority.get(c, {}), "max_running": _class_limit(c, settings.worker_concurrency)} for c in PRIORITIES
+        },
+        # coalesced: pedidos que reaproveitaram uma tarefa; superseded: tarefas
+        # canceladas por uma mais nova; debounced: janelas empurradas por um save
+        "counters": {k: counters.get(k, 0) for k in ("coalesced", "superseded", "debounced")},
+    }
+
+
+def cancel_queued(job_id: str, page_number: Optional[int], kinds: Iterable[str], reason: str = "") -> int:
+    """Cancela (status superseded) as tarefas desses tipos ainda na fila para a página."""
+    kinds = list(kinds)
+    now = time.time()
+    conn = _connect()
+    try:
+        n = conn.execute(
+            f"UPDATE tasks SET status = 'superseded', result = ?, updated_at = ?"
+            f" WHERE job_id = ? AND page_number IS ? AND status = 'queued' AND kind IN ({','.join('?' * len(kinds))})",
+            (orjson.dumps({"reason": reason}).decode(), now, job_id, page_number, *kinds),
+        ).rowcount
+    finally:
+        conn.close()
+    if n:
+        logger.info(f"Cancelled {n} queued {'/'.join(kinds)} task(s) of job={job_id} page={page_number}: {reason}")
+    return n
+
+
+def purge_finished(older_than_s: float) -> int:
+    """Apaga tarefas done/dead/superseded mais antigas que older_than_s."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "DELETE FROM tasks WHERE status IN ('done', 'dead', 'superseded') AND updated_at < ?", (time.time() - older_than_s,)
+        )
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Tarefas
+# ---------------------------------------------------------------------------
+
+def _checked(res: Optional[dict]) -> Dict[str, Any]:
+    # Falha de step vira exceção para a fila tentar de novo (o state continua no step que falhou)
+    res = res or {}
+    if res.get("status") == "failed":
+        raise RuntimeError(f"step {res.get('step_id')} failed: {res.get('error')}")
+    return {k: res.get(k) for k in ("status", "checkpoint_id", "checkpoint_step_id") if res.get(k)}
+
+
+def _run_page(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.pipeline_engine import run_page_pipeline
+    return _checked(run_page_pipeline(job_id, page_number, mode=payload.get("mode", "full")))
+
+
+def _rerun_ocr(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.pipeline_engine import rerun_ocr_incremental
+    return _checked(rerun_ocr_incremental(job_id, page_number))
+
+
+def _rerun_step(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.pipeline_engine import load_pipeline_def, rewind_page, run_page_pipeline, step_index
+    steps = load_pipeline_def().get("steps", [])
+    target_index = step_index(steps, payload["step_id"])
+    if target_index == -1:
+        raise ValueError(f"Step {payload['step_id']} not found in pipeline definition")
+    from app.core.page_lock import page_lock
+    with page_lock(job_id, page_number):
+        rewind_page(job_id, page_number, steps, target_index)
+        return _checked(run_page_pipeline(job_id, page_number))
+
+
+def _reset_page(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Mesmo efeito de /pipeline/reset/{job}/{page}
+    from app.core.pipeline_engine import reset_page
+    step = int(payload.get("step", 0))
+    state = reset_page(job_id, page_number, step)
+    return {"status": "reset", "current_step": step, "invalidated": (state.get("last_invalidation") or {}).get("steps", [])}
+
+
+def _speculate(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.speculation import speculate_page
+    return speculate_page(job_id, page_number)
+
+
+def _full_pass(job_id: str, page_number: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.preview import full_pass
+    return _checked(full_pass(job_id, page_number))
+
+
+def _detect_regions(job_id: str, page_number: Optional[int], payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Tarefa do job inteiro (page_number None): lote de detecção de regiões
+    from app.core.batch_regions import detect_job_regions
+    summary = detect_job_regions(
+        job_id, payload.get("pages"), workers=int(payload.get("workers") or 0), force=bool(payload.get("force"))
+    )
+    return {"status": "completed", **summary}
+
+
+HANDLERS: Dict[str, Callable[[str, int, Dict[str, Any]], Dict[str, Any]]] = {
+    "run_page": _run_page,
+    "rerun_ocr": _rerun_ocr,
+    "rerun_step": _rerun_step,
+    "reset_page": _reset_page,
+    "speculate": _speculate,
+    "full_pass": _full_pass,
+    "detect_regions": _detect_regions,
+}
+
+
+def run_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    return HANDLERS[task["kind"]](task["job_id"], task["page_number"], task.get("payload") or {})
+
+
+def _heartbeat(task_id: int, worker_id: str, done: threading.Event) -> None:
+    # Renova o lease a cada 1/3 do visibility timeout enquanto a tarefa roda
+    interval = max(1.0, settings.work_queue_lease_s / 3)
+    while not done.wait(interval):
+        if not heartbeat(task_id, worker_id):
+            logger.warning(f"Lost lease on task {task_id}; result will be discarded")
+            return
+
+
+def execute(task: Dict[str, Any], worker_id: str) -> Optional[str]:
+    """Roda uma tarefa já leased por worker_id (com renovação do lease) e registra o desfecho."""
+    tid = task["id"]
+    logger.info(
+        f"[{worker_id}] task {tid}: {task['kind']} job={task['job_id']} page={task['page_number']}"
+        f" (attempt {task['attempts']}/{task['max_attempts']})"
+    )
+    done = threading.Event()
+    threading.Thread(target=_heartbeat, args=(tid, worker_id, done), daemon=True).start()
+    t0 = time.perf_counter()
+    try:
+        result = run_task(task)
+    except Exception as e:
+        done.set()
+        status = fail(tid, worker_id, f"{e}\n{traceback.format_exc(limit=5)}")
+        logger.error(f"[{worker_id}] task {tid} failed ({e}); now {status}")
+        return status
+    done.set()
+    result["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    if not complete(tid, worker_id, result):
+        logger.warning(f"[{worker_id}] task {tid} finished after its lease was lost; result discarded")
+        return None
+    logger.info(f"[{worker_id}] task {tid} done in {result['elapsed_s']}s: {result.get('status')}")
+    return "done"
+
+
+def run_now(task_id: int) -> None:
+    """Executa a tarefa no próprio processo (fila desligada => BackgroundTasks)."""
+    worker_id = f"api:{os.getpid()}"
+    while True:
+        task = get_task(task_id)
+        if task is None or task["status"] != "queued":
+            return  # já rodou, ou foi cancelada por uma tarefa mais nova
+        # Espera a janela de debounce (que outro save pode ter empurrado) ou a
+        # página ficar livre
+        wait = task["available_at"] - time.time()
+        if wait > 0:
+            time.sleep(wait)
+            continue
+        task = claim(worker_id, task_id=task_id)
+        if task is not None:
+            execute(task, worker_id)
+            return
+        time.sleep(settings.worker_poll_s)
+
+
+def dispatch(
+    kind: str,
+    job_id: str,
+    page_number: Optional[int],
+    background_tasks=None,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    idempotency_key: Optional[str] = None,
+    join_running: bool = False,
+    debounce_s: float = 0.0,
+    priority: str = "normal",
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Ponto único das rotas: registra a tarefa na fila (devolve (tarefa, criada)).
+    Pedido igual a um que ainda está na fila reaproveita a tarefa (ver submit).
+    Com a fila desligada, a tarefa roda no processo da API via BackgroundTasks,
+    mas continua registrada (status/run_id funcionam igual).
+    """
+    task, created = submit(
+        kind, job_id, page_number, payload,
+        idempotency_key=idempotency_key, join_running=join_running, debounce_s=debounce_s, priority=priority,
+    )
+    if created and not settings.work_queue_enabled and background_tasks is not None:
+        background_tasks.add_task(run_now, task["id"])
+    return task, created
+
+
+# ---------------------------------------------------------------------------
+# Visão de "run" para a API
+# ---------------------------------------------------------------------------
+
+_RUN_STATUS = {"queued": "queued", "leased": "running", "done": "completed", "dead": "failed", "superseded": "superseded"}
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if not ts:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def run_view(task: Dict[str, Any]) -> Dict[str, Any]:
+    status = _RUN_STATUS.get(task["status"], task["status"])
+    if status == "queued" and task["attempts"]:
+        status = "retrying"
+    return {
+        "run_id": task["id"],
+        "kind": task["kind"],
+        "job_id": task["job_id"],
+        "page_number": task["page_number"],
+        "params": task["payload"],
+        "priority": task.get("priority", "normal"),
+        "status": status,
+        "attempts": task["attempts"],
+        "max_attempts": task["max_attempts"],
+        "result": task["result"],
+        "error": (task["last_error"] or "").split("\n", 1)[0] or None,
+        "created_on": _iso(task["created_at"]),
+        "updated_on": _iso(task["updated_at"]),
+        "next_attempt_on": _iso(task["available_at"]) if status == "retrying" else None,
+        "not_before": _iso(task["available_at"]) if status == "queued" and task["available_at"] > time.time() else None,
+        "superseded_by": (task["result"] or {}).get("superseded_by") if status == "superseded" else None,
+    }
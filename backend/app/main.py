@@ -12,6 +12,7 @@ from app.api.routes_jobs import router as jobs_router
 from app.api.routes_pages import router as pages_router
 from app.api.routes_pipeline import router as pipeline_router
 from app.api.routes_preview import router as preview_router
+from app.core.page_lock import PageBusy
 
 app = FastAPI(
     title="MojiTranslateAI API",
@@ -19,6 +20,17 @@ app = FastAPI(
     openapi_version="3.1.0",
 )
 
+@app.exception_handler(PageBusy)
+async def page_busy_handler(request: Request, exc: PageBusy):
+    # Página travada por um run em andamento: o cliente tenta de novo depois
+    from app.core.config import settings
+    retry_after = max(1, round(settings.page_lock_edit_timeout_s))
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Page is busy with a running pipeline step; retry later", "error": str(exc)},
+        headers={"Retry-After": str(retry_after)},
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Global Exception: {exc}")
@@ -36,6 +48,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def check_work_queue():
+    # Com a fila ligada, nada roda sem `python -m app.worker`: confere depois de
+    # uma janela de presença (API e worker costumam subir juntos)
+    import threading
+    from app.core.config import settings
+    from app.core.work_queue import check_workers
+    if settings.work_queue_enabled:
+        timer = threading.Timer(settings.worker_stale_s / 3, check_workers)
+        timer.daemon = True
+        timer.start()
+
 # Rotas de API
 app.include_router(health_router, tags=["health"])
 app.include_router(jobs_router, tags=["jobs"])
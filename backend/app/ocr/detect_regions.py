@@ -1,129 +1,137 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from app.core import geometry
+from app.vision.reading_order import reading_order, segment_panels
+from app.vision.region_detector import detect_boxes
 
-@dataclass(frozen=True)
-class Region:
-    x1: int
-    y1: int
-    x2: int
-    y2: int
+# Versão da saída do detect_regions (entra na chave do cache de regiões).
+# Incrementar ao mudar preset, merge ou ordenação de forma que altere as caixas.
+DETECTOR_VERSION = "detect_regions_v1.1"
 
-    def as_bbox(self) -> List[int]:
-        return [int(self.x1), int(self.y1), int(self.x2), int(self.y2)]
 
-
-def _clamp(v: int, lo: int, hi: int) -> int:
-    return max(lo, min(hi, v))
-
-
-def _union(a: Region, b: Region) -> Region:
-    return Region(
-        x1=min(a.x1, b.x1),
-        y1=min(a.y1, b.y1),
-        x2=max(a.x2, b.x2),
-        y2=max(a.y2, b.y2),
-    )
-
-
-def _overlap_ratio(a: Region, b: Region) -> float:
-    # IoU simplificado
-    ix1, iy1 = max(a.x1, b.x1), max(a.y1, b.y1)
-    ix2, iy2 = min(a.x2, b.x2), min(a.y2, b.y2)
-    iw, ih = max(0, ix2 - ix1), max(0, iy2 - iy1)
-    inter = iw * ih
-    if inter == 0:
-        return 0.0
-    area_a = (a.x2 - a.x1) * (a.y2 - a.y1)
-    area_b = (b.x2 - b.x1) * (b.y2 - b.y1)
-    return inter / float(area_a + area_b - inter + 1e-9)
-
-
-def _are_close_or_overlapping(a: Region, b: Region, dist_threshold: int = 20) -> bool:
+def _merge_overlapping(boxes: np.ndarray, dist_threshold: int = 25) -> np.ndarray:
     """
-    Returns True if regions overlap OR are within dist_threshold pixels of each other.
+    Aggressive merge: overlap OR distance <= threshold (geometry.near).
+
+    Mesma semântica da varredura original (maior região como semente, absorve
+    tudo que estiver próximo do bbox *crescente* até estabilizar), mas as
+    candidatas vêm de um índice espacial em grade em vez de varrer a lista
+    inteira a cada passada. Como "próximo" é monotônico no crescimento do bbox,
+    o fecho de cada semente é único e a saída é idêntica à versão O(n³).
     """
-    # Simply check if expanding one by threshold makes them overlap
-    # Or check gap
-    x_overlap = max(0, min(a.x2, b.x2) - max(a.x1, b.x1)) > 0
-    y_overlap = max(0, min(a.y2, b.y2) - max(a.y1, b.y1)) > 0
-    
-    if x_overlap and y_overlap:
-        return True
-        
-    # Check proximity
-    # If they overlap in X, check Y distance. If overlap in Y, check X distance.
-    # This assumes we want to merge things that are aligned.
-    
-    # Generic distance check:
-    x_gap = max(0, a.x1 - b.x2, b.x1 - a.x2)
-    y_gap = max(0, a.y1 - b.y2, b.y1 - a.y2)
-    
-    return x_gap <= dist_threshold and y_gap <= dist_threshold
-
-def _merge_overlapping(regions: List[Region], iou_threshold: float = 0.10, dist_threshold: int = 25) -> List[Region]:
-    # Aggressive merge: IO > threshold OR Distance < threshold
-    if not regions:
-        return regions
+    b = geometry.as_boxes(boxes)
+    if not len(b):
+        return b
 
     # Sort large to small helps allow big bubbles to eat small ones inside/near them
-    regions = sorted(regions, key=lambda r: ((r.x2 - r.x1) * (r.y2 - r.y1)), reverse=True)
-    merged: List[Region] = []
-
-    while regions:
-        current = regions.pop(0)
-        changed = True
-        while changed:
-            changed = False
-            keep: List[Region] = []
-            for r in regions:
-                # Merge if close/overlapping OR if one is inside another (implied by union of close)
-                if _are_close_or_overlapping(current, r, dist_threshold=dist_threshold):
-                    current = _union(current, r)
-                    changed = True
-                else:
-                    keep.append(r)
-            regions = keep
+    b = b[np.argsort(-geometry.areas(b), kind="stable")]
+    n = len(b)
+    d = int(dist_threshold)
+    cell = max(64, 4 * d)
+
+    grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for idx, (x1, y1, x2, y2) in enumerate(b.tolist()):
+        for cx in range(x1 // cell, x2 // cell + 1):
+            for cy in range(y1 // cell, y2 // cell + 1):
+                grid[(cx, cy)].append(idx)
+
+    alive = [True] * n
+    merged: List[np.ndarray] = []
+
+    for seed in range(n):
+        if not alive[seed]:
+            continue
+        alive[seed] = False
+        current = b[seed]
+
+        while True:
+            # "Próximo" <=> intersecta o bbox expandido por dist_threshold
+            x1, y1, x2, y2 = current.tolist()
+            cand: List[int] = []
+            for cx in range((x1 - d) // cell, (x2 + d) // cell + 1):
+                for cy in range((y1 - d) // cell, (y2 + d) // cell + 1):
+                    bucket = grid.get((cx, cy))
+                    if not bucket:
+                        continue
+                    live = [i for i in bucket if alive[i]]
+                    if len(live) != len(bucket):
+                        grid[(cx, cy)] = live
+                    cand.extend(live)
+            if not cand:
+                break
+            cand_arr = np.unique(np.asarray(cand))
+            hits = cand_arr[geometry.near(current[None], b[cand_arr], d)[0]]
+            if not len(hits):
+                break
+            for i in hits.tolist():
+                alive[i] = False
+            current = geometry.union(np.vstack([current[None], b[hits]]))
         merged.append(current)
 
-    return merged
+    return np.asarray(merged, dtype=b.dtype).reshape(-1, 4)
 
 
-def _sort_reading_order_rtl(regions: List[Region], line_tol: int = 60) -> List[Region]:
+def _sort_reading_order_rtl(
+    boxes: np.ndarray,
+    line_tol: int = 60,
+    panels: Optional[List[List[int]]] = None,
+) -> np.ndarray:
     """
-    Ordena por leitura típica de mangá:
+    Ordena por leitura típica de mangá (app.vision.reading_order):
+    - por painel, quando `panels` é dado
     - agrupa por 'linhas' (y) e ordena da direita para esquerda dentro da linha
     - linhas de cima para baixo
     """
-    if not regions:
-        return regions
-
-    regs = sorted(regions, key=lambda r: r.y1)
-    lines: List[List[Region]] = []
-    for r in regs:
-        placed = False
-        for line in lines:
-            y_avg = sum(x.y1 for x in line) / len(line)
-            if abs(r.y1 - y_avg) <= line_tol:
-                line.append(r)
-                placed = True
-                break
-        if not placed:
-            lines.append([r])
+    order = reading_order(boxes.tolist(), panels=panels, line_tol=line_tol)
+    return boxes[np.asarray(order, dtype=np.int64)]
 
-    for line in lines:
-        line.sort(key=lambda r: r.x1, reverse=True)
 
-    ordered: List[Region] = []
-    for line in lines:
-        ordered.extend(line)
+def read_gray(image_path: str):
+    """Decodifica a página em tons de cinza (mesma conversão usada pela detecção)."""
+    img = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError(f"Não foi possível abrir a imagem: {image_path}")
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-    return ordered
+
+def detect_regions_gray(
+    gray,
+    *,
+    min_area: int = 2000,
+    max_area_ratio: float = 0.40,
+    pad: int = 8,
+    scale: float = 1.0,
+    refine: bool = True,
+    panel_order: bool = False,
+    panels: Optional[List[List[int]]] = None,
+) -> List[List[int]]:
+    """
+    detect_regions sobre uma imagem já decodificada (ex.: memória compartilhada do batch).
+
+    panel_order=True ordena por painel antes das linhas (`panels` já segmentados
+    ou segment_panels na própria imagem).
+    """
+    boxes = detect_boxes(
+        gray,
+        "ocr_v1",
+        min_area=min_area,
+        max_area_ratio=max_area_ratio,
+        pad=pad,
+        scale=scale,
+        refine=refine,
+    )
+    boxes = _merge_overlapping(boxes)
+    if panel_order and panels is None:
+        panels = segment_panels(gray)
+    boxes = _sort_reading_order_rtl(boxes, line_tol=70, panels=panels if panel_order else None)
+
+    return geometry.to_list(boxes)
 
 
 def detect_regions(
@@ -132,74 +140,30 @@ def detect_regions(
     min_area: int = 2000,
     max_area_ratio: float = 0.40,
     pad: int = 8,
+    scale: float = 1.0,
+    refine: bool = True,
+    panel_order: bool = False,
 ) -> List[List[int]]:
     """
     Detector v1 (heurístico):
     - binariza para destacar texto/traços
     - usa morfologia para unir caracteres em “blocos”
-    - extrai contornos e filtra por área
+    - extrai componentes e filtra por área/proporção (preset "ocr_v1" de
+      app.vision.region_detector)
     - mescla caixas que se sobrepõem
-    - ordena em leitura RTL
+    - ordena em leitura RTL (panel_order=True: painel antes das linhas)
+
+    Modo pirâmide (scale < 1): detecta numa cópia reduzida, mapeia as caixas
+    de volta e (refine=True) ajusta as bordas em resolução cheia em ROIs locais.
 
     Retorna lista de bbox no formato [x1,y1,x2,y2].
     """
-    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
-    if img is None:
-        raise FileNotFoundError(f"Não foi possível abrir a imagem: {image_path}")
-
-    h, w = img.shape[:2]
-    max_area = int((w * h) * max_area_ratio)
-
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # Binarização robusta (texto/traços -> branco em fundo preto)
-    # Increased block size for better local handling
-    thr = cv2.adaptiveThreshold(
-        gray, 255,
-        cv2.ADAPTIVE_THRESH_MEAN_C,
-        cv2.THRESH_BINARY_INV,
-        45, 10
+    return detect_regions_gray(
+        read_gray(image_path),
+        min_area=min_area,
+        max_area_ratio=max_area_ratio,
+        pad=pad,
+        scale=scale,
+        refine=refine,
+        panel_order=panel_order,
     )
-
-    # Morfologia: unir caracteres em regiões
-    # Dynamic kernel size based on image width (approx 1% of width)
-    # Ensures odd number
-    k_size = max(5, int(w / 120))
-    if k_size % 2 == 0:
-        k_size += 1
-        
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k_size, k_size))
-    mor = cv2.morphologyEx(thr, cv2.MORPH_CLOSE, kernel, iterations=2) # Increased iterations to fuse better
-    # mor = cv2.dilate(mor, kernel, iterations=1) # Dilate usually overkill if close is aggressive
-
-    contours, _ = cv2.findContours(mor, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    regions: List[Region] = []
-    for c in contours:
-        x, y, cw, ch = cv2.boundingRect(c)
-        area = cw * ch
-        if area < min_area:
-            continue
-        if area > max_area:
-            continue
-
-        # Aspect Ratio filtering
-        ratio = cw / float(ch)
-        if ratio > 6.0 or ratio < 0.15: # Ignore very thin or very tall lines
-            continue
-
-        x1 = _clamp(x - pad, 0, w)
-        y1 = _clamp(y - pad, 0, h)
-        x2 = _clamp(x + cw + pad, 0, w)
-        y2 = _clamp(y + ch + pad, 0, h)
-
-        # descarta caixas degeneradas
-        if (x2 - x1) < 20 or (y2 - y1) < 20:
-            continue
-
-        regions.append(Region(x1, y1, x2, y2))
-
-    regions = _merge_overlapping(regions, iou_threshold=0.10) # Lower threshold to merge more aggressively
-    regions = _sort_reading_order_rtl(regions, line_tol=70)
-
-    return [r.as_bbox() for r in regions]
@@ -5,8 +5,13 @@ import tempfile
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
+import numpy as np
 from PIL import Image
+from app.core.config import settings
+from app.core.geometry import as_boxes, clamp, valid
 from app.ocr.detect_regions import detect_regions
+from app.ocr.ink_filter import prefilter_boxes
+from app.ocr.mosaic import MOSAIC_PROMPT, build_mosaics, parse_label_map
 from app.core.llm_client import call_vision_llm
 
 def run_ocr_gpt_vision(
@@ -26,6 +31,7 @@ def run_ocr_gpt_vision(
     width, height = img.size
 
     bboxes: List[List[int]] = []
+    region_ids: List[Optional[str]] = []  # paralelo a bboxes (None => detecção automática)
 
     # 1) Use existing regions if provided
     if regions:
@@ -40,6 +46,7 @@ def run_ocr_gpt_vision(
                       for r in r_list:
                            if "bbox" in r:
                                 bboxes.append(r["bbox"])
+                                region_ids.append(r.get("region_id"))
                       break
         if not found_page:
             print(f"[GPT-OCR] WARNING: Regions provided but page {page_number} not found.")
@@ -69,34 +76,48 @@ def run_ocr_gpt_vision(
         "Do not include any notes or explanations."
     )
 
+    # Validate coords
+    boxes: List[tuple] = []
+    boxes_rid: List[Optional[str]] = []
+    clamped = clamp(as_boxes(bboxes), width, height)
+    for n, ((x1, y1, x2, y2), ok) in enumerate(zip(clamped.tolist(), valid(clamped).tolist())):
+        if not ok:
+            continue
+        boxes.append((x1, y1, x2, y2))
+        boxes_rid.append(region_ids[n] if n < len(region_ids) else None)
+
+    # Pré-filtro local: crops sem tinta não vão para o LLM
+    prefilter_stats = None
+    keep = [True] * len(boxes)
+    if settings.ocr_prefilter_enabled and boxes:
+        keep, prefilter_stats = prefilter_boxes(np.asarray(img.convert("L")), boxes)
+        print(f"[GPT-OCR] Prefilter skipped {prefilter_stats['skipped']}/{len(boxes)} crops")
+
     with tempfile.TemporaryDirectory() as temp_dir:
-        for (x1, y1, x2, y2) in bboxes:
-            # Validate coords
-            x1, y1 = max(0, int(x1)), max(0, int(y1))
-            x2, y2 = min(width, int(x2)), min(height, int(y2))
-            
-            if x2 <= x1 or y2 <= y1:
-                continue
-
-            crop = img.crop((x1, y1, x2, y2))
-            
-            # Save crop to temp file for the LLM client
-            crop_filename = f"crop_{idx}.jpg"
-            crop_path = os.path.join(temp_dir, crop_filename)
-            crop.save(crop_path, format="JPEG", quality=95)
-            
-            print(f"[GPT-OCR] Processing block {idx}...")
-            text = call_vision_llm(crop_path, prompt)
-            text = (text or "").strip()
-            
-            # Remove markdown code blocks if present (common LLM artifact)
-            if text.startswith("```"):
-                lines = text.splitlines()
-                if len(lines) >= 2:
-                    text = "\n".join(lines[1:-1])
-                text = text.replace("```", "").strip()
-
-            print(f"[GPT-OCR] Block {idx}: '{text}'")
+        # Modo mosaico: todos os crops da página em 1 (ou poucas) requisições
+        texts: Dict[int, str] = {}
+        from_mosaic: set = set()
+        pending = [j for j, k in enumerate(keep) if k]
+        if settings.ocr_mosaic_enabled and len(pending) > 1:
+            texts = _transcribe_mosaic(img, boxes, pending, temp_dir)
+            from_mosaic = set(texts)
+            missing = [j for j in pending if j not in texts]
+            if missing:
+                print(f"[GPT-OCR] Mosaic missing {len(missing)} labels, falling back to per-crop calls")
+            pending = missing
+
+        # Per-crop (padrão, ou fallback dos labels que faltaram no mosaico)
+        for j in pending:
+            print(f"[GPT-OCR] Processing block {j + 1}...")
+            texts[j] = _transcribe_crop(img, boxes[j], temp_dir, j + 1, prompt)
+
+        for j, ((x1, y1, x2, y2), has_ink, rid) in enumerate(zip(boxes, keep, boxes_rid)):
+            text = texts.get(j, "")
+            notes = "gpt4_vision_mosaic" if j in from_mosaic else "gpt4_vision"
+            if not has_ink:
+                notes = "gpt4_vision_prefilter_skipped"
+            if has_ink:
+                print(f"[GPT-OCR] Block {idx}: '{text}'")
 
             if not text:
                 # If explicit regions, keep empty blocks
@@ -106,6 +127,7 @@ def run_ocr_gpt_vision(
             blocks.append(
                 {
                     "block_id": f"t{idx}",
+                    "region_id": rid,
                     "original_text": text,
                     "bbox": [int(x1), int(y1), int(x2), int(y2)],
                     "is_speech": True,
@@ -113,7 +135,7 @@ def run_ocr_gpt_vision(
                     "shape_hint": "unknown",
                     "max_characters": len(text),
                     "max_lines": text.count('\n') + 1,
-                    "notes": "gpt4_vision",
+                    "notes": notes,
                     "group_id": None,
                     "reading_order": None,
                     "block_type": "unknown",
@@ -147,6 +169,52 @@ def run_ocr_gpt_vision(
                 "page_number": page_number,
                 "image_file": image_filename,
                 "blocks": blocks,
+                "prefilter": prefilter_stats,
             }
         ],
     }
+
+
+def _clean_llm_text(text: str) -> str:
+    text = (text or "").strip()
+    # Remove markdown code blocks if present (common LLM artifact)
+    if text.startswith("```"):
+        lines = text.splitlines()
+        if len(lines) >= 2:
+            text = "\n".join(lines[1:-1])
+        text = text.replace("```", "").strip()
+    return text
+
+
+def _transcribe_crop(img: Image.Image, box: tuple, temp_dir: str, n: int, prompt: str) -> str:
+    crop = img.crop(box)
+
+    # Save crop to temp file for the LLM client
+    crop_path = os.path.join(temp_dir, f"crop_{n}.jpg")
+    crop.save(crop_path, format="JPEG", quality=95)
+    return _clean_llm_text(call_vision_llm(crop_path, prompt))
+
+
+def _transcribe_mosaic(img: Image.Image, boxes: List[tuple], indices: List[int], temp_dir: str) -> Dict[int, str]:
+    """
+    Empacota os crops em mosaicos rotulados ([1], [2], ...) e pede um JSON
+    {label: texto} por mosaico. Retorna {índice da caixa: texto} apenas
+    para os labels que voltaram na resposta.
+    """
+    labels = [str(j + 1) for j in indices]
+    sheets = build_mosaics(
+        [img.crop(boxes[j]) for j in indices],
+        labels,
+        max_side=settings.ocr_mosaic_max_side,
+        max_crops=settings.ocr_mosaic_max_crops,
+    )
+    out: Dict[int, str] = {}
+    for n, (sheet, sheet_labels) in enumerate(sheets, start=1):
+        path = os.path.join(temp_dir, f"mosaic_{n}.jpg")
+        sheet.save(path, format="JPEG", quality=95)
+        print(f"[GPT-OCR] Mosaic {n}/{len(sheets)} with {len(sheet_labels)} crops...")
+        answer = parse_label_map(call_vision_llm(path, MOSAIC_PROMPT, max_tokens=200 + 150 * len(sheet_labels)))
+        for label in sheet_labels:
+            if label in answer:
+                out[int(label) - 1] = _clean_llm_text(answer[label])
+    return out
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Totais acumulados no processo (para calibrar thresholds x economia de chamadas)
+_TOTALS: Dict[str, int] = {"checked": 0, "skipped": 0, "low_ink": 0, "low_variance": 0, "few_components": 0}
+_TOTALS_LOCK = threading.Lock()
+
+
+def _box_sums(integral: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    # integral tem shape (h+1, w+1); boxes = N x [x1,y1,x2,y2] (x2/y2 exclusivos)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    return integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+
+
+def prefilter_boxes(
+    gray: np.ndarray,
+    boxes: Sequence[Sequence[int]],
+    *,
+    min_ink_ratio: float | None = None,
+    min_std: float | None = None,
+    min_components: int | None = None,
+) -> Tuple[List[bool], Dict[str, Any]]:
+    """
+    Pré-filtro barato (local) de crops sem conteúdo textual.
+
+    - densidade de tinta: fração de pixels "tinta" (threshold adaptativo) por crop
+    - variância: desvio padrão de cinza por crop
+      (ambas vetorizadas com imagens integrais, O(1) por caixa)
+    - nº de componentes conexos: só para as caixas que passaram nas anteriores
+
+    Retorna (keep[i], stats). Caixas devem estar clampadas na imagem.
+    """
+    min_ink_ratio = settings.ocr_prefilter_min_ink_ratio if min_ink_ratio is None else min_ink_ratio
+    min_std = settings.ocr_prefilter_min_std if min_std is None else min_std
+    min_components = settings.ocr_prefilter_min_components if min_components is None else min_components
+
+    stats: Dict[str, Any] = {
+        "checked": len(boxes),
+        "skipped": 0,
+        "low_ink": 0,
+        "low_variance": 0,
+        "few_components": 0,
+        "thresholds": {
+            "min_ink_ratio": min_ink_ratio,
+            "min_std": min_std,
+            "min_components": min_components,
+        },
+    }
+    if not len(boxes):
+        return [], stats
+
+    b = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    areas = np.maximum(1, (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])).astype(np.float64)
+
+    ink = cv2.adaptiveThreshold(gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+    ink_int = cv2.integral(ink, sdepth=cv2.CV_32S)
+    g_int, g_sq_int = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    ink_ratio = _box_sums(ink_int, b) / areas
+    mean = _box_sums(g_int, b) / areas
+    var = np.maximum(0.0, _box_sums(g_sq_int, b) / areas - mean * mean)
+    std = np.sqrt(var)
+
+    low_ink = ink_ratio < min_ink_ratio
+    low_var = std < min_std
+    keep = ~(low_ink | low_var)
+
+    few_cc = np.zeros(len(b), dtype=bool)
+    if min_components > 0:
+        for i in np.flatnonzero(keep):
+            x1, y1, x2, y2 = b[i]
+            n, _, cc_stats, _ = cv2.connectedComponentsWithStats(ink[y1:y2, x1:x2], connectivity=8)
+            # ignora o fundo (label 0) e ruído de 1-2 pixels
+            n_cc = int(np.count_nonzero(cc_stats[1:, cv2.CC_STAT_AREA] >= 3)) if n > 1 else 0
+            if n_cc < min_components:
+                few_cc[i] = True
+        keep &= ~few_cc
+
+    stats["low_ink"] = int(np.count_nonzero(low_ink))
+    stats["low_variance"] = int(np.count_nonzero(low_var & ~low_ink))
+    stats["few_components"] = int(np.count_nonzero(few_cc))
+    stats["skipped"] = int(np.count_nonzero(~keep))
+
+    with _TOTALS_LOCK:
+        for k in ("checked", "skipped", "low_ink", "low_variance", "few_components"):
+            _TOTALS[k] += int(stats[k])
+
+    if stats["skipped"]:
+        logger.info(
+            f"OCR prefilter skipped {stats['skipped']}/{stats['checked']} crops "
+            f"(low_ink={stats['low_ink']}, low_variance={stats['low_variance']}, "
+            f"few_components={stats['few_components']})"
+        )
+    return keep.tolist(), stats
+
+
+def prefilter_totals() -> Dict[str, int]:
+    with _TOTALS_LOCK:
+        return dict(_TOTALS)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, List, Sequence
+
+from PIL import Image
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mesmo limite de tokens do MangaOcr.__call__
+MAX_LENGTH = 300
+
+# Lote que falha por erro de forma da API interna do manga_ocr desliga o
+# caminho em lote na hora; outras falhas (OOM, crop ruim) só desligam depois
+# de tantas seguidas; antes disso só o chunk que falhou vai crop a crop
+API_SHAPE_ERRORS = (AttributeError, TypeError, ImportError, NotImplementedError)
+MAX_BATCH_FAILURES = 3
+
+
+class MangaOcrService:
+    """
+    Serviço único de OCR MangaOCR (um por processo/worker):
+    - carrega o modelo uma única vez (lazy, thread-safe)
+    - processa crops em lotes pelo encoder/decoder (model.generate em batch)
+    - número de threads do torch configurável
+    - variante opcional quantizada dinamicamente (int8, CPU)
+    - max_length: teto de tokens gerados por crop (a prévia usa um menor)
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 8,
+        torch_threads: int = 0,
+        quantize: bool = False,
+        max_length: int = MAX_LENGTH,
+    ) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.torch_threads = int(torch_threads)
+        self.quantize = bool(quantize)
+        self.max_length = max(1, int(max_length))
+        self._ocr: Any = None
+        self._load_lock = threading.Lock()
+        # generate() não é reentrante com segurança entre threads; serializa inferência
+        self._infer_lock = threading.Lock()
+        self._batched = True
+        self._batch_failures = 0
+
+    def load(self) -> Any:
+        if self._ocr is not None:
+            return self._ocr
+        with self._load_lock:
+            if self._ocr is not None:
+                return self._ocr
+            try:
+                import torch
+                from manga_ocr import MangaOcr
+            except Exception as e:
+                raise RuntimeError(
+                    "MangaOCR não está instalado. Instale PyTorch primeiro e depois rode: "
+                    "pip install -r requirements-ocr-mangaocr.txt"
+                ) from e
+
+            if self.torch_threads > 0:
+                torch.set_num_threads(self.torch_threads)
+
+            # Quantização dinâmica só existe para CPU
+            ocr = MangaOcr(force_cpu=True) if self.quantize else MangaOcr()
+            if self.quantize:
+                ocr.model = torch.quantization.quantize_dynamic(
+                    ocr.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                logger.info("MangaOCR loaded with dynamic int8 quantization (CPU)")
+
+            ocr.model.eval()
+            self._ocr = ocr
+            logger.info(
+                f"MangaOCR service ready (batch_size={self.batch_size}, "
+                f"torch_threads={torch.get_num_threads()}, quantize={self.quantize}, max_length={self.max_length})"
+            )
+            return self._ocr
+
+    def recognize(self, crops: Sequence[Image.Image]) -> List[str]:
+        """Retorna o texto (strip) de cada crop, na mesma ordem."""
+        if not crops:
+            return []
+        ocr = self.load()
+        texts: List[str] = []
+        with self._infer_lock:
+            for start in range(0, len(crops), self.batch_size):
+                chunk = list(crops[start:start + self.batch_size])
+                texts.extend(self._recognize_chunk(ocr, chunk))
+        return [(t or "").strip() for t in texts]
+
+    def _recognize_chunk(self, ocr: Any, chunk: List[Image.Image]) -> List[str]:
+        # Crop sozinho vai pelo MangaOcr.__call__, a não ser que o teto de tokens seja outro
+        if self._batched and (len(chunk) > 1 or self.max_length != MAX_LENGTH):
+            try:
+                texts = self._generate_batch(ocr, chunk)
+                self._batch_failures = 0
+                return texts
+            except Exception as e:
+                self._batch_failures += 1
+                if isinstance(e, API_SHAPE_ERRORS) or self._batch_failures >= MAX_BATCH_FAILURES:
+                    logger.warning(
+                        f"MangaOCR batched inference disabled after {self._batch_failures} failure(s), using per-crop: {e!r}"
+                    )
+                    self._batched = False
+                else:
+                    logger.warning(f"MangaOCR batched inference failed, per-crop for this chunk: {e!r}")
+        out: List[str] = []
+        for crop in chunk:
+            try:
+                out.append(ocr(crop))
+            except Exception as e:
+                logger.error(f"MangaOCR failed on crop: {e}")
+                out.append("")
+        return out
+
+    def _generate_batch(self, ocr: Any, chunk: List[Image.Image]) -> List[str]:
+        import torch
+        from manga_ocr.ocr import post_process
+
+        # Mesmo pré-processamento do MangaOcr.__call__, empilhado em um único tensor
+        pixels = [ocr._preprocess(c.convert("L").convert("RGB")) for c in chunk]
+        x = torch.stack(pixels).to(ocr.model.device)
+        with torch.inference_mode():
+            ids = ocr.model.generate(x, max_length=self.max_length).cpu()
+        decoded = ocr.tokenizer.batch_decode(ids, skip_special_tokens=True)
+        return [post_process(t) for t in decoded]
+
+
+# Singleton por processo e variante: "default" (OCR normal) e "fast" (prévia:
+# int8 + teto de tokens menor; segundo modelo na memória só se a prévia rodar)
+_SERVICES: Dict[str, MangaOcrService] = {}
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_mangaocr_service(variant: str = "default") -> MangaOcrService:
+    service = _SERVICES.get(variant)
+    if service is None:
+        with _SERVICE_LOCK:
+            service = _SERVICES.get(variant)
+            if service is None:
+                if variant == "fast":
+                    service = MangaOcrService(
+                        batch_size=settings.mangaocr_batch_size,
+                        torch_threads=settings.mangaocr_torch_threads,
+                        quantize=True,
+                        max_length=settings.preview_ocr_max_tokens,
+                    )
+                else:
+                    service = MangaOcrService(
+                        batch_size=settings.mangaocr_batch_size,
+                        torch_threads=settings.mangaocr_torch_threads,
+                        quantize=settings.mangaocr_quantize,
+                    )
+                _SERVICES[variant] = service
+    return service
@@ -2,20 +2,19 @@ from __future__ import annotations
 
 from typing import Dict, Any, Optional, List
 
+import numpy as np
 from PIL import Image
-from manga_ocr import MangaOcr
 
+from app.core.config import settings
+from app.core.geometry import as_boxes, clamp, valid
 from app.ocr.detect_regions import detect_regions
+from app.ocr.ink_filter import prefilter_boxes
+from app.ocr.mangaocr_service import get_mangaocr_service
 
-# Singleton para evitar recarregar o modelo a cada request
-_MANGA_OCR: Optional[MangaOcr] = None
 
-
-def _get_ocr() -> MangaOcr:
-    global _MANGA_OCR
-    if _MANGA_OCR is None:
-        _MANGA_OCR = MangaOcr()
-    return _MANGA_OCR
+def _get_ocr():
+    # Modelo compartilhado pelo serviço (carregado uma vez por processo)
+    return get_mangaocr_service().load()
 
 
 def run_ocr_mangaocr(
@@ -24,18 +23,20 @@ def run_ocr_mangaocr(
     page_number: int = 1,
     image_filename: str = "001.jpg",
     regions: Optional[Dict] = None,
+    variant: str = "default",
 ) -> Dict[str, Any]:
     """
     OCR real (v2):
     - Uses provided regions (if any) or runs heuristic detection
-    - Executa MangaOCR em cada crop
+    - Executa MangaOCR nos crops em lote (serviço compartilhado; variant="fast" => prévia)
     """
-    ocr = _get_ocr()
+    service = get_mangaocr_service(variant)
 
     img = Image.open(image_path).convert("RGB")
     width, height = img.size
 
     bboxes: List[List[int]] = []
+    region_ids: List[Optional[str]] = []  # paralelo a bboxes (None => detecção automática)
 
     # 1) Use existing regions if provided (Strict Mode)
     if regions:
@@ -52,6 +53,7 @@ def run_ocr_mangaocr(
                       for r in r_list:
                            if "bbox" in r:
                                 bboxes.append(r["bbox"])
+                                region_ids.append(r.get("region_id"))
                       break
         
         if not found_page:
@@ -79,30 +81,34 @@ def run_ocr_mangaocr(
              print("[MangaOCR] No bboxes found/provided. Fallback to page-level.")
              bboxes = [[0, 0, width, height]]
 
-    blocks: List[Dict[str, Any]] = []
-    idx = 1
-    for (x1, y1, x2, y2) in bboxes:
-        # Validate coords
-        x1, y1 = max(0, int(x1)), max(0, int(y1))
-        x2, y2 = min(width, int(x2)), min(height, int(y2))
-        
-        if x2 <= x1 or y2 <= y1:
+    # 3) Valida coords e recorta (o OCR roda depois, em lote)
+    boxes: List[tuple] = []
+    crops: List[Image.Image] = []
+    boxes_rid: List[Optional[str]] = []
+    clamped = clamp(as_boxes(bboxes), width, height)
+    for n, ((x1, y1, x2, y2), ok) in enumerate(zip(clamped.tolist(), valid(clamped).tolist())):
+        if not ok:
             print(f"[MangaOCR] Invalid bbox detected: {x1},{y1},{x2},{y2} - skipping")
             continue
 
-        crop = img.crop((x1, y1, x2, y2))
-        text = (ocr(crop) or "").strip()
-        
+        boxes.append((x1, y1, x2, y2))
+        boxes_rid.append(region_ids[n] if n < len(region_ids) else None)
+        crops.append(img.crop((x1, y1, x2, y2)))
+
+    # Pré-filtro local: crops sem tinta não passam pelo modelo
+    prefilter_stats = None
+    keep = [True] * len(boxes)
+    if settings.ocr_prefilter_enabled and boxes:
+        keep, prefilter_stats = prefilter_boxes(np.asarray(img.convert("L")), boxes)
+        print(f"[MangaOCR] Prefilter skipped {prefilter_stats['skipped']}/{len(boxes)} crops")
+
+    recognized = iter(service.recognize([c for c, k in zip(crops, keep) if k]))
+    texts = [next(recognized) if k else "" for k in keep]
+
+    blocks: List[Dict[str, Any]] = []
+    idx = 1
+    for (x1, y1, x2, y2), text, has_ink, rid in zip(boxes, texts, keep, boxes_rid):
         print(f"[MangaOCR] Block {idx} ({x1},{y1},{x2},{y2}): '{text}'")
-        
-        if not text:
-             # Keep empty block if it was explicitly a region? 
-             # Or maybe it's just noise. 
-             # If user provided region, we should probably keep it even if empty, so they can edit.
-             # PREVIOUS Logic: continued if not text.
-             # CHANGE: If explicit regions were used, we might want to keep it?
-             # For now, let's keep the logging and see.
-             pass
 
         if not text:
             # If explicit regions were provided, keep the block so user can edit it.
@@ -116,6 +122,7 @@ def run_ocr_mangaocr(
         blocks.append(
             {
                 "block_id": f"t{idx}",
+                "region_id": rid,
                 "original_text": text,
                 "bbox": [int(x1), int(y1), int(x2), int(y2)],
                 "is_speech": True,
@@ -123,9 +130,9 @@ def run_ocr_mangaocr(
                 "shape_hint": "unknown",
                 "max_characters": 40,
                 "max_lines": 2,
-                "notes": "mangaocr_crop_v2"
+                "notes": ("mangaocr_crop_v2"
                 if (x1, y1, x2, y2) != (0, 0, width, height)
-                else "mangaocr_pagelevel_v2",
+                else "mangaocr_pagelevel_v2") + ("" if has_ink else "_prefilter_skipped"),
                 "group_id": None,
                 "reading_order": None,
                 "block_type": "unknown",
@@ -159,6 +166,7 @@ def run_ocr_mangaocr(
                 "page_number": page_number,
                 "image_file": image_filename,
                 "blocks": blocks,
+                "prefilter": prefilter_stats,
             }
         ],
     }
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+LABEL_BAND = 26  # altura da faixa do rótulo acima de cada crop
+GAP = 12  # espaço entre células (evita que o modelo "junte" balões vizinhos)
+
+MOSAIC_PROMPT = (
+    "This image is a mosaic of separate crops taken from one manga page. "
+    "Each crop has a red label like [3] printed directly above it. "
+    "Transcribe the text inside each crop exactly as it appears. "
+    "Return ONLY a JSON object mapping every label number (as a string) to its text, "
+    'for example {"1": "...", "2": ""}. Use an empty string when a crop has no legible text. '
+    "Do not include the labels themselves in the text and do not add notes or explanations."
+)
+
+
+def _label_font(size: int = 20):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def _fit(crop: Image.Image, max_side: int) -> Image.Image:
+    # Crop maior que a folha inteira: reduz mantendo proporção
+    limit = max_side - 2 * GAP - LABEL_BAND
+    scale = min(1.0, limit / float(max(crop.width, crop.height, 1)))
+    if scale >= 1.0:
+        return crop
+    return crop.resize((max(1, int(crop.width * scale)), max(1, int(crop.height * scale))))
+
+
+def pack_shelves(sizes: Sequence[Tuple[int, int]], max_side: int) -> List[List[Tuple[int, int, int]]]:
+    """
+    Bin packing por prateleiras (shelf, altura decrescente).
+    sizes = (w, h) de cada célula (já incluindo a faixa do rótulo).
+    Retorna folhas: [[(index, x, y), ...], ...], cada folha cabe em max_side x max_side.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    sheets: List[List[Tuple[int, int, int]]] = []
+    cur: List[Tuple[int, int, int]] = []
+    x = y = GAP
+    shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w + GAP > max_side:  # próxima prateleira
+            x, y = GAP, y + shelf_h + GAP
+            shelf_h = 0
+        if y + h + GAP > max_side:  # próxima folha
+            sheets.append(cur)
+            cur, x, y, shelf_h = [], GAP, GAP, 0
+        cur.append((i, x, y))
+        x += w + GAP
+        shelf_h = max(shelf_h, h)
+    if cur:
+        sheets.append(cur)
+    return sheets
+
+
+def build_mosaics(
+    crops: Sequence[Image.Image],
+    labels: Sequence[str],
+    *,
+    max_side: int = 2048,
+    max_crops: int = 24,
+) -> List[Tuple[Image.Image, List[str]]]:
+    """Monta as folhas de mosaico; retorna [(imagem, labels contidos), ...]."""
+    fitted = [_fit(c.convert("RGB"), max_side) for c in crops]
+    sizes = [(c.width, c.height + LABEL_BAND) for c in fitted]
+    font = _label_font()
+
+    out: List[Tuple[Image.Image, List[str]]] = []
+    step = max(1, max_crops)
+    for start in range(0, len(fitted), step):
+        # respeita o limite de crops por requisição
+        idxs = list(range(start, min(start + step, len(fitted))))
+        for sheet in pack_shelves([sizes[i] for i in idxs], max_side):
+            cells = [(idxs[j], x, y) for j, x, y in sheet]
+            w = max(x + sizes[i][0] for i, x, _ in cells) + GAP
+            h = max(y + sizes[i][1] for i, _, y in cells) + GAP
+            canvas = Image.new("RGB", (w, h), (255, 255, 255))
+            draw = ImageDraw.Draw(canvas)
+            for i, x, y in cells:
+                draw.text((x, y + 2), f"[{labels[i]}]", fill=(220, 0, 0), font=font)
+                canvas.paste(fitted[i], (x, y + LABEL_BAND))
+                draw.rectangle(
+                    [x - 1, y + LABEL_BAND - 1, x + fitted[i].width, y + LABEL_BAND + fitted[i].height],
+                    outline=(0, 160, 255),
+                )
+            out.append((canvas, [labels[i] for i, _, _ in cells]))
+    return out
+
+
+def parse_label_map(text: str) -> Dict[str, str]:
+    """Extrai o JSON {label: texto} da resposta (tolera ```json ... ``` e texto em volta)."""
+    s = (text or "").strip()
+    m = re.search(r"\{[\s\S]*\}", s)
+    if not m:
+        return {}
+    try:
+        obj = json.loads(m.group(0))
+    except Exception:
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    out: Dict[str, str] = {}
+    for k, v in obj.items():
+        key = str(k).strip().strip("[]")
+        if isinstance(v, str):
+            out[key] = v.strip()
+        elif v is None:
+            out[key] = ""
+    return out
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.ocr.detect_regions import DETECTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "errors": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _STATS_LOCK:
+        _STATS[key] += 1
+
+
+def cache_dir() -> Path:
+    # Compartilhado entre jobs: reenvio das mesmas páginas reaproveita a detecção
+    return settings.data_dir() / "cache" / "regions"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(image_sha256: str, params: Dict[str, Any]) -> str:
+    """Chave = (hash da imagem, versão do detector, parâmetros)."""
+    payload = json.dumps(
+        {"image": image_sha256, "detector": DETECTOR_VERSION, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return cache_dir() / key[:2] / f"{key}.json"
+
+
+def load(key: str) -> Optional[List[List[int]]]:
+    path = _entry_path(key)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # entrada corrompida => recalcula
+        logger.warning(f"Ignoring unreadable region cache entry {path.name}: {e}")
+        _count("errors")
+        return None
+    boxes = data.get("boxes")
+    if data.get("detector") != DETECTOR_VERSION or not isinstance(boxes, list):
+        return None
+    return [[int(v) for v in b] for b in boxes]
+
+
+def store(key: str, boxes: List[List[int]], params: Dict[str, Any]) -> None:
+    path = _entry_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(
+            json.dumps({"detector": DETECTOR_VERSION, "params": params, "boxes": boxes}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)  # atômico: leitores nunca veem arquivo pela metade
+    except Exception as e:
+        logger.warning(f"Could not write region cache entry {path.name}: {e}")
+        _count("errors")
+
+
+def lookup(image_path: Path, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[List[int]]]]:
+    """
+    Consulta o cache sem detectar: (key, boxes) no acerto, (key, None) na falta
+    e (None, None) com o cache desligado. A key serve para o store() depois.
+    """
+    if not settings.regions_cache_enabled:
+        return None, None
+    key = cache_key(file_sha256(Path(image_path)), params)
+    boxes = load(key)
+    _count("hits" if boxes is not None else "misses")
+    return key, boxes
+
+
+def cached_detect(
+    image_path: Path,
+    params: Dict[str, Any],
+    detect: Callable[..., List[List[int]]],
+) -> Tuple[List[List[int]], bool]:
+    """
+    Executa detect(str(image_path), **params) com cache em disco.
+    Retorna (boxes, hit). Com regions_cache_enabled=False sempre recalcula.
+    """
+    key, boxes = lookup(image_path, params)
+    if boxes is not None:
+        return boxes, True
+
+    boxes = detect(str(image_path), **params)
+    if key is not None:
+        store(key, boxes, params)
+    return boxes, False
+
+
+def cache_stats() -> Dict[str, int]:
+    with _STATS_LOCK:
+        return dict(_STATS)
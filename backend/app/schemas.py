@@ -4,6 +4,7 @@ from typing import List, Optional, Any, Dict
 
 class OCRBlock(BaseModel):
     block_id: str
+    region_id: Optional[str] = None
     original_text: str
     bbox: List[int]  # [x1,y1,x2,y2]
     is_speech: bool = True
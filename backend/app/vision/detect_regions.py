@@ -1,20 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List
 
 import cv2
 
-
-def _clip_bbox(x1: int, y1: int, x2: int, y2: int, w: int, h: int) -> Tuple[int, int, int, int]:
-    x1 = max(0, min(int(x1), w - 1))
-    y1 = max(0, min(int(y1), h - 1))
-    x2 = max(0, min(int(x2), w))
-    y2 = max(0, min(int(y2), h))
-    if x2 <= x1:
-        x2 = min(w, x1 + 1)
-    if y2 <= y1:
-        y2 = min(h, y1 + 1)
-    return x1, y1, x2, y2
+from app.vision.region_detector import detect_boxes
 
 
 def detect_regions(
@@ -32,7 +22,7 @@ def detect_regions(
     - grayscale + blur
     - binarização adaptativa invertida (texto preto vira branco)
     - dilatação leve para unir caracteres em blocos
-    - contornos + filtro por área
+    - componentes + filtro por área (preset "vision_v1" de app.vision.region_detector)
 
     Retorno:
       [{"region_id":"r1","bbox":[x1,y1,x2,y2],"type_hint":"unknown","score":0.0}, ...]
@@ -41,38 +31,19 @@ def detect_regions(
     if img is None:
         raise FileNotFoundError(f"Não foi possível ler a imagem: {image_path}")
 
-    h, w = img.shape[:2]
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    if blur and blur > 1:
-        k = blur if blur % 2 == 1 else blur + 1
-        gray = cv2.GaussianBlur(gray, (k, k), 0)
-
-    thr = cv2.adaptiveThreshold(
+    boxes = detect_boxes(
         gray,
-        255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV,
-        35,
-        11,
+        "vision_v1",
+        min_area=min_area,
+        max_area_ratio=max_area_ratio,
+        blur=blur or 0,
+        kernel=dilation or 0,
+        morph="dilate" if dilation and dilation > 0 else "none",
     )
 
-    if dilation and dilation > 0:
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (dilation, dilation))
-        thr = cv2.dilate(thr, kernel, iterations=1)
-
-    contours, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    max_area = int(w * h * max_area_ratio)
     regions: List[Dict[str, Any]] = []
-    rid = 0
-    for c in contours:
-        x, y, ww, hh = cv2.boundingRect(c)
-        area = int(ww * hh)
-        if area < min_area or area > max_area:
-            continue
-        x1, y1, x2, y2 = _clip_bbox(x, y, x + ww, y + hh, w, h)
-        rid += 1
+    for rid, (x1, y1, x2, y2) in enumerate(boxes.tolist(), start=1):
         regions.append(
             {
                 "region_id": f"r{rid}",
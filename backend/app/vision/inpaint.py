@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def fast_inpaint(img: Image.Image, mask: Image.Image, max_side: int = 1024, radius: int = 3) -> Image.Image:
+    """
+    Inpaint rápido (Telea, OpenCV) numa cópia reduzida da página: o lado maior
+    vai a max_side (0 => resolução cheia), o resultado volta ao tamanho
+    original e só substitui os pixels da máscara; o resto da página continua
+    na resolução cheia. Aproximação para a prévia, não substitui o LaMa.
+    """
+    img = img.convert("RGB")
+    mask = mask.convert("L")
+    w, h = img.size
+    scale = min(1.0, max_side / max(w, h)) if max_side > 0 else 1.0
+    sw, sh = max(1, round(w * scale)), max(1, round(h * scale))
+
+    src = np.asarray(img.resize((sw, sh), Image.BILINEAR) if scale < 1.0 else img)
+    m = np.asarray(mask.resize((sw, sh), Image.NEAREST) if scale < 1.0 else mask)
+    # 1px a mais na cópia reduzida cobre a borda do texto perdida na redução
+    m = cv2.dilate((m > 0).astype(np.uint8) * 255, np.ones((3, 3), np.uint8))
+    out = Image.fromarray(cv2.inpaint(np.ascontiguousarray(src), m, radius, cv2.INPAINT_TELEA))
+    if scale < 1.0:
+        out = out.resize((w, h), Image.BILINEAR)
+
+    result = img.copy()
+    result.paste(out, (0, 0), mask)
+    return result
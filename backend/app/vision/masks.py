@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.geometry import Geometry, item_bbox, polygon_inside, rasterize
+
+Point = List[int]
+
+
+# ---------------------------------------------------------------------------
+# Detecção: polígono do balão (interior) ou do texto dentro da bbox
+# ---------------------------------------------------------------------------
+
+def _approx(contour: np.ndarray, eps_frac: float) -> np.ndarray:
+    eps = max(1.0, eps_frac * cv2.arcLength(contour, True))
+    return cv2.approxPolyDP(contour, eps, True).reshape(-1, 2)
+
+
+def balloon_interior(roi: np.ndarray, min_fill: float = 0.25) -> Optional[np.ndarray]:
+    """
+    Interior claro do balão: maior componente claro (4-conexo) que não toca a
+    borda da ROI. Os traços do texto viram buracos e somem ao pegar só o
+    contorno externo. None se não houver balão fechado.
+    """
+    _, bright = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    n, labels, st, _ = cv2.connectedComponentsWithStats(bright, connectivity=4)
+    if n <= 1:
+        return None
+    rh, rw = roi.shape[:2]
+    x, y = st[1:, cv2.CC_STAT_LEFT], st[1:, cv2.CC_STAT_TOP]
+    cw, ch = st[1:, cv2.CC_STAT_WIDTH], st[1:, cv2.CC_STAT_HEIGHT]
+    inner = (x > 0) & (y > 0) & (x + cw < rw) & (y + ch < rh)
+    area = np.where(inner, st[1:, cv2.CC_STAT_AREA], 0)
+    k = int(np.argmax(area))
+    if area[k] < min_fill * rw * rh:
+        return None
+    comp = (labels == k + 1).astype(np.uint8)
+    contours, _ = cv2.findContours(comp, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return max(contours, key=cv2.contourArea) if contours else None
+
+
+def text_hull(roi: np.ndarray, max_fill: float = 0.9) -> Optional[np.ndarray]:
+    """Envoltória convexa dos traços de texto (tinta fechada + margem). None se ~ a bbox inteira."""
+    rh, rw = roi.shape[:2]
+    ink = cv2.adaptiveThreshold(roi, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+    k = max(3, min(rw, rh) // 15) | 1
+    ink = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (k, k)))
+    ink = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)))
+    # A envoltória dos contornos externos é a mesma de todos os pixels, com bem menos pontos
+    contours, _ = cv2.findContours(ink, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    hull = cv2.convexHull(np.concatenate(contours))
+    if cv2.contourArea(hull) >= max_fill * rw * rh:
+        return None
+    return hull
+
+
+def region_mask_polygon(
+    gray: np.ndarray,
+    bbox: Sequence[int],
+    eps_frac: float = 0.01,
+) -> Optional[Tuple[str, List[Point]]]:
+    """
+    Polígono simplificado (approxPolyDP) dentro da bbox, em coordenadas da página:
+    ("balloon", pts) => interior do balão; ("text", pts) => envoltória do texto.
+    None quando não há ganho sobre o retângulo.
+    """
+    h, w = gray.shape[:2]
+    x1, y1 = max(0, int(bbox[0])), max(0, int(bbox[1]))
+    x2, y2 = min(w, int(bbox[2])), min(h, int(bbox[3]))
+    if x2 - x1 < 8 or y2 - y1 < 8:
+        return None
+    roi = gray[y1:y2, x1:x2]
+
+    kind, contour = "balloon", balloon_interior(roi)
+    if contour is None:
+        kind, contour = "text", text_hull(roi)
+    if contour is None:
+        return None
+    poly = _approx(contour, eps_frac)
+    if len(poly) < 3:
+        return None
+    return kind, [[int(px) + x1, int(py) + y1] for px, py in poly]
+
+
+# ---------------------------------------------------------------------------
+# Consumo: máscara de limpeza/inpaint (polygon > mask_polygon > bbox)
+# ---------------------------------------------------------------------------
+
+def page_region_list(regions: Any) -> List[Dict[str, Any]]:
+    """Regiões do documento ({"regions": [...]}, {"pages": [{"regions": [...]}]} ou lista)."""
+    if isinstance(regions, list):
+        return regions
+    if not isinstance(regions, dict):
+        return []
+    if isinstance(regions.get("regions"), list):
+        return regions["regions"]
+    out: List[Dict[str, Any]] = []
+    for p in regions.get("pages") or []:
+        if "regions" in p:
+            out.extend(p["regions"])
+    return out
+
+
+def _valid_polygon(poly: Any) -> bool:
+    return isinstance(poly, list) and len(poly) > 2
+
+
+def polygon_inside_bbox(poly: Sequence[Sequence[int]], bbox: Sequence[int], tol: int = 2) -> bool:
+    return polygon_inside(np.asarray(poly, dtype=np.float64).reshape(-1, 2), bbox, tol)
+
+
+def region_shape(r: Dict[str, Any]) -> Tuple[str, Optional[List[Any]]]:
+    """
+    Forma usada na máscara da região:
+    - "polygon": desenhado pelo usuário
+    - "mask_polygon": vindo da detecção, só se ainda couber na bbox atual
+      (bbox editada depois da detecção => polígono obsoleto)
+    - "bbox": retângulo
+    """
+    if _valid_polygon(r.get("polygon")):
+        return "polygon", r["polygon"]
+    bbox = r.get("bbox")
+    mp = r.get("mask_polygon")
+    if _valid_polygon(mp) and bbox and len(bbox) == 4 and polygon_inside_bbox(mp, bbox):
+        return "mask_polygon", mp
+    if bbox and len(bbox) == 4:
+        return "bbox", bbox
+    return "none", None
+
+
+def _mask_items(regions: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+    # Forma de cada região para a máscara ({"bbox", "polygon"} para Geometry.from_items)
+    # + origem ("polygon", "mask_polygon", "bbox"); regiões sem forma ficam de fora
+    items: List[Dict[str, Any]] = []
+    kinds: List[str] = []
+    for r in page_region_list(regions):
+        kind, shape = region_shape(r)
+        if shape is None:
+            continue
+        kinds.append(kind)
+        items.append({"bbox": r.get("bbox"), "polygon": shape if kind != "bbox" else None})
+    return items, kinds
+
+
+def build_region_mask(
+    size: Tuple[int, int],
+    regions: Any,
+    *,
+    polygon_erode: int = 0,
+    mask_polygon_erode: int = 0,
+) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Máscara "L" (255 = limpar/inpaint) de todas as regiões + estatísticas:
+    {"regions", "sources": {polygon, mask_polygon, bbox}, "mask_px", "bbox_px"}.
+    bbox_px = área que a máscara teria só com retângulos (para medir a redução).
+    """
+    items, kinds = _mask_items(regions)
+    geo = Geometry.from_items(items)
+    with_bbox = np.array([item_bbox(it) is not None for it in items], dtype=bool)
+    erode = {"polygon": polygon_erode, "mask_polygon": mask_polygon_erode, "bbox": 0}
+    mask = geo.rasterize(size, inclusive=True, erode=[erode[k] for k in kinds])
+    sources = {k: kinds.count(k) for k in ("polygon", "mask_polygon", "bbox")}
+    stats = {
+        "regions": len(kinds),
+        "sources": sources,
+        "mask_px": int(np.count_nonzero(mask)),
+        "bbox_px": int(np.count_nonzero(rasterize(size, boxes=geo.boxes[with_bbox], inclusive=True))),
+    }
+    return Image.fromarray(mask, "L"), stats
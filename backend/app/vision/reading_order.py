@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Sequence[int]
+
+
+# ---------------------------------------------------------------------------
+# Linhas: mesmo agrupamento da versão v1, em O(n log n)
+# ---------------------------------------------------------------------------
+
+def group_lines(ys: Sequence[int], line_tol: int) -> List[List[int]]:
+    """
+    Agrupa índices em "linhas" pela coordenada y (y1), como a v1: percorre em y
+    crescente e cada item entra na primeira linha (ordem de criação) cuja média
+    de y esteja a <= line_tol; senão abre uma linha nova.
+
+    Como y só cresce e a média de uma linha nunca passa do y atual, uma linha
+    com média < y - line_tol nunca mais aceita ninguém ("morta"); todas as
+    linhas vivas aceitam. Então basta a linha viva mais antiga: um heap por
+    média (descarta as mortas) + um heap por ordem de criação, com soma/contagem
+    incrementais no lugar de recalcular a média a cada comparação.
+    """
+    order = sorted(range(len(ys)), key=lambda i: ys[i])
+    lines: List[List[int]] = []
+    sums: List[int] = []
+    alive: List[bool] = []
+    by_mean: List[Tuple[float, int, int]] = []  # (média, linha, tamanho quando empilhado)
+    by_age: List[int] = []
+
+    for i in order:
+        y = ys[i]
+        # descarta linhas mortas (entradas obsoletas do heap são puladas pelo tamanho)
+        while by_mean:
+            mean, ln, size = by_mean[0]
+            if size != len(lines[ln]):
+                heapq.heappop(by_mean)
+                continue
+            if abs(y - mean) <= line_tol:
+                break
+            heapq.heappop(by_mean)
+            alive[ln] = False
+        while by_age and not alive[by_age[0]]:
+            heapq.heappop(by_age)
+
+        if by_age:
+            ln = by_age[0]
+            lines[ln].append(i)
+            sums[ln] += y
+        else:
+            ln = len(lines)
+            lines.append([i])
+            sums.append(y)
+            alive.append(True)
+            heapq.heappush(by_age, ln)
+        heapq.heappush(by_mean, (sums[ln] / len(lines[ln]), ln, len(lines[ln])))
+
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Painéis: XY-cut nas calhas brancas (sarjetas) entre quadros
+# ---------------------------------------------------------------------------
+
+def _gutters(profile: np.ndarray, max_ink: float, min_run: int) -> List[Tuple[int, int]]:
+    """Faixas internas [a, b) com tinta <= max_ink (ignora as margens nas pontas)."""
+    empty = np.concatenate(([False], profile <= max_ink, [False])).astype(np.int8)
+    d = np.diff(empty)
+    starts, ends = np.flatnonzero(d == 1), np.flatnonzero(d == -1)
+    n = len(profile)
+    return [(int(a), int(b)) for a, b in zip(starts, ends) if b - a >= min_run and a > 0 and b < n]
+
+
+def _xy_cut(
+    ink: np.ndarray,
+    x1: int,
+    y1: int,
+    x2: int,
+    y2: int,
+    horizontal: bool,
+    depth: int,
+    min_side: int,
+    rtl: bool,
+    out: List[List[int]],
+    tried_other: bool = False,
+) -> None:
+    sub = ink[y1:y2, x1:x2]
+    if depth > 0 and sub.size:
+        # horizontal => cortes entre faixas de linhas (painéis empilhados)
+        profile = sub.sum(axis=1 if horizontal else 0)
+        span = sub.shape[1] if horizontal else sub.shape[0]
+        extent = sub.shape[0] if horizontal else sub.shape[1]
+        cuts = [(a + b) // 2 for a, b in _gutters(profile, 0.01 * span, max(2, extent // 250))]
+        edges = [0] + cuts + [extent]
+        # só corta se todos os pedaços tiverem tamanho de painel
+        if cuts and all(b - a >= min_side for a, b in zip(edges, edges[1:])):
+            pieces = list(zip(edges, edges[1:]))
+            if not horizontal and rtl:
+                pieces.reverse()  # mangá: colunas da direita para a esquerda
+            for a, b in pieces:
+                if horizontal:
+                    _xy_cut(ink, x1, y1 + a, x2, y1 + b, False, depth - 1, min_side, rtl, out)
+                else:
+                    _xy_cut(ink, x1 + a, y1, x1 + b, y2, True, depth - 1, min_side, rtl, out)
+            return
+        if not tried_other:
+            _xy_cut(ink, x1, y1, x2, y2, not horizontal, depth, min_side, rtl, out, tried_other=True)
+            return
+    out.append([x1, y1, x2, y2])
+
+
+def segment_panels(
+    gray: np.ndarray,
+    *,
+    rtl: bool = True,
+    max_side: int = 512,
+    ink_thresh: int = 200,
+    max_depth: int = 6,
+    min_panel_frac: float = 0.08,
+) -> List[List[int]]:
+    """
+    Quadros da página em ordem de leitura ([x1,y1,x2,y2], coordenadas da página).
+
+    XY-cut recursivo numa cópia reduzida: corta nas faixas sem tinta que
+    atravessam o bloco inteiro, alternando linhas/colunas (linhas de cima para
+    baixo, colunas RTL). Os cortes passam no meio da calha, então os quadros
+    ladrilham a página e todo ponto cai em exatamente um. Página sem calhas =>
+    um quadro só (a ordem volta a ser só por linhas).
+    """
+    h, w = gray.shape[:2]
+    s = min(1.0, max_side / float(max(h, w)))
+    small = cv2.resize(gray, (max(1, int(w * s)), max(1, int(h * s))), interpolation=cv2.INTER_AREA) if s < 1 else gray
+    ink = (small < ink_thresh).astype(np.int32)
+    sh, sw = ink.shape
+    min_side = max(4, int(min_panel_frac * min(sh, sw)))
+
+    out: List[List[int]] = []
+    _xy_cut(ink, 0, 0, sw, sh, True, max_depth, min_side, rtl, out)
+
+    panels = []
+    for px1, py1, px2, py2 in out:
+        # volta para a resolução cheia; as bordas da página ficam exatas
+        panels.append([
+            0 if px1 == 0 else int(round(px1 / s)),
+            0 if py1 == 0 else int(round(py1 / s)),
+            w if px2 == sw else int(round(px2 / s)),
+            h if py2 == sh else int(round(py2 / s)),
+        ])
+    return panels
+
+
+# Um XY-cut por página: cache por (caminho, mtime, tamanho) dentro do processo
+_PANELS_LOCK = threading.Lock()
+_PANELS_CACHE: "OrderedDict[Tuple[str, int, int], List[List[int]]]" = OrderedDict()
+_PANELS_MAX = 512
+
+
+def page_panels(image_path: Path, gray: Optional[np.ndarray] = None) -> List[List[int]]:
+    """Painéis da página (cacheado). `gray` evita decodificar de novo quando já existe."""
+    p = Path(image_path).resolve()
+    st = p.stat()
+    key = (str(p), st.st_mtime_ns, st.st_size)
+    with _PANELS_LOCK:
+        hit = _PANELS_CACHE.get(key)
+        if hit is not None:
+            _PANELS_CACHE.move_to_end(key)
+            return hit
+    if gray is None:
+        gray = cv2.imread(str(p), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise FileNotFoundError(f"Não foi possível abrir a imagem: {p}")
+    panels = segment_panels(gray)
+    with _PANELS_LOCK:
+        _PANELS_CACHE[key] = panels
+        while len(_PANELS_CACHE) > _PANELS_MAX:
+            _PANELS_CACHE.popitem(last=False)
+    return panels
+
+
+# ---------------------------------------------------------------------------
+# Ordem de leitura: painel -> linha -> direita para a esquerda
+# ---------------------------------------------------------------------------
+
+def panel_index(boxes: Sequence[Box], panels: Sequence[Box]) -> np.ndarray:
+    """Painel de cada caixa pelo centro (o mais próximo se o centro cair fora de todos)."""
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    p = np.asarray(panels, dtype=np.float64).reshape(-1, 4)
+    cx = ((b[:, 0] + b[:, 2]) / 2)[:, None]
+    cy = ((b[:, 1] + b[:, 3]) / 2)[:, None]
+    dx = np.maximum(0, np.maximum(p[None, :, 0] - cx, cx - p[None, :, 2]))
+    dy = np.maximum(0, np.maximum(p[None, :, 1] - cy, cy - p[None, :, 3]))
+    return np.argmin(dx * dx + dy * dy, axis=1)
+
+
+def reading_order(
+    boxes: Sequence[Box],
+    *,
+    panels: Optional[Sequence[Box]] = None,
+    line_tol: int = 60,
+    rtl: bool = True,
+) -> List[int]:
+    """
+    Índices de `boxes` ([x1,y1,x2,y2]) em ordem de leitura:
+    - por painel (na ordem de `panels`; sem painéis => a página inteira)
+    - dentro do painel, linhas de cima para baixo (group_lines sobre y1)
+    - dentro da linha, x1 decrescente (RTL) ou crescente
+
+    Sem painéis a saída é idêntica à ordenação v1 (empates estáveis).
+    """
+    n = len(boxes)
+    if not n:
+        return []
+    groups: Dict[int, List[int]] = {}
+    if panels and len(panels) > 1:
+        for i, k in enumerate(panel_index(boxes, panels).tolist()):
+            groups.setdefault(int(k), []).append(i)
+    else:
+        groups[0] = list(range(n))
+
+    ordered: List[int] = []
+    for k in sorted(groups):
+        members = groups[k]
+        for line in group_lines([int(boxes[i][1]) for i in members], line_tol):
+            idx = [members[j] for j in line]
+            idx.sort(key=lambda i: int(boxes[i][0]), reverse=rtl)
+            ordered.extend(idx)
+    return ordered
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.geometry import as_boxes, clamp, heights, widths
+
+logger = logging.getLogger(__name__)
+
+# Ordem fixa: o modelo salvo guarda a lista e é recusado se não bater
+FEATURE_NAMES: List[str] = [
+    "log_aspect",  # log(w/h)
+    "rel_area",  # área da caixa / área da página
+    "ink_ratio",  # fração de tinta (threshold adaptativo)
+    "gray_mean",
+    "gray_std",
+    "bright_ratio",  # fração de pixels claros (fundo de balão)
+    "edge_density",  # fração de pixels de borda (Canny)
+    "log_n_cc",  # log(1 + nº de componentes de tinta)
+    "max_cc_span",  # maior extensão de um componente relativa à caixa (bordas de painel ~1)
+    "median_cc_area",  # área mediana dos componentes / área da caixa
+    "cc_height_cv",  # variação da altura dos componentes (retícula ~0, texto > 0)
+    "border_cc_ratio",  # fração dos componentes que tocam a borda da caixa
+]
+
+
+def region_features(gray: np.ndarray, boxes: Sequence[Sequence[int]]) -> np.ndarray:
+    """
+    Features por caixa (N x len(FEATURE_NAMES), float32).
+
+    Tudo é calculado só na ROI de cada caixa (as propostas cobrem uma fração
+    pequena da página, então sai bem mais barato que processar a página inteira).
+    """
+    h, w = gray.shape[:2]
+    feats = np.zeros((len(boxes), len(FEATURE_NAMES)), dtype=np.float64)
+    if not len(boxes):
+        return feats.astype(np.float32)
+
+    b = clamp(as_boxes(boxes), w, h)
+    bw = np.maximum(1, widths(b)).astype(np.int64)
+    bh = np.maximum(1, heights(b)).astype(np.int64)
+    feats[:, 0] = np.log(bw / bh)
+    feats[:, 1] = (bw * bh) / float(max(1, w * h))
+
+    for i, (x1, y1, x2, y2) in enumerate(b.tolist()):
+        roi = gray[y1:y2, x1:x2]
+        if roi.shape[0] < 3 or roi.shape[1] < 3:
+            continue
+        rh, rw = roi.shape[:2]
+        ink = cv2.adaptiveThreshold(roi, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+        mean, std = cv2.meanStdDev(roi)
+        feats[i, 2] = cv2.countNonZero(ink) / float(rw * rh)
+        feats[i, 3] = float(mean[0][0]) / 255.0
+        feats[i, 4] = float(std[0][0]) / 255.0
+        feats[i, 5] = np.count_nonzero(roi >= 200) / float(rw * rh)
+        feats[i, 6] = cv2.countNonZero(cv2.Canny(roi, 80, 160)) / float(rw * rh)
+
+        _, _, st, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        st = st[1:]
+        st = st[st[:, cv2.CC_STAT_AREA] >= 3]  # ignora ruído de 1-2 pixels
+        if not len(st):
+            continue
+        cw, ch = st[:, cv2.CC_STAT_WIDTH], st[:, cv2.CC_STAT_HEIGHT]
+        cx, cy = st[:, cv2.CC_STAT_LEFT], st[:, cv2.CC_STAT_TOP]
+        feats[i, 7] = np.log1p(len(st))
+        feats[i, 8] = float(np.max(np.maximum(cw / rw, ch / rh)))
+        feats[i, 9] = float(np.median(st[:, cv2.CC_STAT_AREA])) / (rw * rh)
+        feats[i, 10] = float(np.std(ch) / max(1e-6, np.mean(ch)))
+        touches = (cx == 0) | (cy == 0) | (cx + cw >= rw) | (cy + ch >= rh)
+        feats[i, 11] = float(np.mean(touches))
+
+    return feats.astype(np.float32)
+
+
+def _tree_arrays(t: Dict[str, list]) -> Dict[str, np.ndarray]:
+    return {
+        "feature": np.asarray(t["feature"], dtype=np.int64),
+        "threshold": np.asarray(t["threshold"], dtype=np.float64),
+        "left": np.asarray(t["left"], dtype=np.int64),
+        "right": np.asarray(t["right"], dtype=np.int64),
+        "value": np.asarray(t["value"], dtype=np.float64),
+    }
+
+
+def _tree_predict(t: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    # Desce todas as linhas ao mesmo tempo, um nível por iteração
+    rows = np.arange(len(X))
+    node = np.zeros(len(X), dtype=np.int64)
+    while True:
+        inner = t["left"][node] >= 0
+        if not inner.any():
+            break
+        go_left = X[rows, np.maximum(t["feature"][node], 0)] <= t["threshold"][node]
+        node = np.where(inner, np.where(go_left, t["left"][node], t["right"][node]), node)
+    return t["value"][node]
+
+
+class GBDTModel:
+    """
+    Gradient boosting (árvores binárias, perda logística) serializado em JSON:
+
+    {"format": "gbdt-v1", "features": [...], "base_score": logit, "learning_rate": lr,
+     "threshold": 0.5, "trees": [{"feature": [], "threshold": [], "left": [], "right": [], "value": []}]}
+
+    Folha <=> left == -1. Inferência vetorizada sobre todas as caixas.
+    """
+
+    def __init__(self, doc: Dict[str, Any]):
+        if doc.get("format") != "gbdt-v1":
+            raise ValueError(f"unsupported model format: {doc.get('format')!r}")
+        if list(doc.get("features") or []) != FEATURE_NAMES:
+            raise ValueError("model features do not match FEATURE_NAMES (retrain the model)")
+        self.doc = doc
+        self.base_score = float(doc.get("base_score", 0.0))
+        self.learning_rate = float(doc.get("learning_rate", 0.1))
+        self.threshold = float(doc.get("threshold", 0.5))
+        self.trees = [_tree_arrays(t) for t in doc.get("trees") or []]
+
+    @classmethod
+    def load(cls, path: Path) -> "GBDTModel":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def save(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.doc), encoding="utf-8")
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        margin = np.full(len(X), self.base_score)
+        for t in self.trees:
+            margin += self.learning_rate * _tree_predict(t, X)
+        return 1.0 / (1.0 + np.exp(-margin))
+
+
+def _build_tree(
+    X: np.ndarray,
+    binned: np.ndarray,
+    edges: List[np.ndarray],
+    grad: np.ndarray,
+    hess: np.ndarray,
+    max_depth: int,
+    min_leaf: int,
+    reg_lambda: float,
+) -> Dict[str, list]:
+    tree: Dict[str, list] = {"feature": [], "threshold": [], "left": [], "right": [], "value": []}
+
+    def new_node() -> int:
+        for k in tree:
+            tree[k].append(-1 if k in ("feature", "left", "right") else 0.0)
+        return len(tree["value"]) - 1
+
+    def grow(node: int, idx: np.ndarray, depth: int) -> None:
+        g, hs = grad[idx].sum(), hess[idx].sum()
+        tree["value"][node] = float(-g / (hs + reg_lambda))
+        if depth >= max_depth or len(idx) < 2 * min_leaf:
+            return
+        parent = g * g / (hs + reg_lambda)
+        best = (0.0, -1, -1)
+        for f in range(X.shape[1]):
+            nb = len(edges[f]) + 1
+            gb = np.bincount(binned[idx, f], weights=grad[idx], minlength=nb)
+            hb = np.bincount(binned[idx, f], weights=hess[idx], minlength=nb)
+            cb = np.bincount(binned[idx, f], minlength=nb)
+            gl, hl, cl = np.cumsum(gb)[:-1], np.cumsum(hb)[:-1], np.cumsum(cb)[:-1]
+            gr, hr, cr = g - gl, hs - hl, len(idx) - cl
+            gain = gl * gl / (hl + reg_lambda) + gr * gr / (hr + reg_lambda) - parent
+            gain[(cl < min_leaf) | (cr < min_leaf)] = 0.0
+            k = int(np.argmax(gain))
+            if gain[k] > best[0]:
+                best = (float(gain[k]), f, k)
+        if best[1] < 0:
+            return
+        _, f, k = best
+        thr = float(edges[f][k])
+        mask = X[idx, f] <= thr
+        left, right = new_node(), new_node()
+        tree["feature"][node], tree["threshold"][node] = f, thr
+        tree["left"][node], tree["right"][node] = left, right
+        grow(left, idx[mask], depth + 1)
+        grow(right, idx[~mask], depth + 1)
+
+    grow(new_node(), np.arange(len(X)), 0)
+    return tree
+
+
+def train_gbdt(
+    X: np.ndarray,
+    y: np.ndarray,
+    *,
+    n_trees: int = 80,
+    max_depth: int = 3,
+    learning_rate: float = 0.15,
+    min_leaf: int = 5,
+    reg_lambda: float = 1.0,
+    n_bins: int = 32,
+    threshold: float = 0.5,
+) -> GBDTModel:
+    """Treino numpy puro (histogramas por quantis); suficiente para poucos milhares de amostras."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = [np.unique(np.quantile(X[:, f], np.linspace(0, 1, n_bins + 1)[1:-1])) for f in range(X.shape[1])]
+    binned = np.stack([np.searchsorted(edges[f], X[:, f], side="left") for f in range(X.shape[1])], axis=1)
+
+    p0 = float(np.clip(y.mean(), 1e-3, 1 - 1e-3))
+    base = float(np.log(p0 / (1 - p0)))
+    margin = np.full(len(X), base)
+    trees = []
+    for _ in range(n_trees):
+        p = 1.0 / (1.0 + np.exp(-margin))
+        tree = _build_tree(X, binned, edges, p - y, np.maximum(p * (1 - p), 1e-6), max_depth, min_leaf, reg_lambda)
+        trees.append(tree)
+        margin += learning_rate * _tree_predict(_tree_arrays(tree), X)
+    return GBDTModel(
+        {
+            "format": "gbdt-v1",
+            "features": FEATURE_NAMES,
+            "base_score": base,
+            "learning_rate": learning_rate,
+            "threshold": threshold,
+            "trees": trees,
+        }
+    )
+
+
+# Modelo carregado uma vez por processo (recarrega se o arquivo mudar)
+_MODEL_LOCK = threading.Lock()
+_MODEL_CACHE: Dict[str, Tuple[float, Optional[GBDTModel]]] = {}
+
+
+def load_model(path: str | Path) -> Optional[GBDTModel]:
+    p = Path(path).resolve()
+    try:
+        mtime = p.stat().st_mtime
+    except FileNotFoundError:
+        mtime = -1.0
+    with _MODEL_LOCK:
+        cached = _MODEL_CACHE.get(str(p))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        model: Optional[GBDTModel] = None
+        if mtime < 0:
+            logger.warning(f"Region classifier model not found: {p} (regions are kept unscored)")
+        else:
+            try:
+                model = GBDTModel.load(p)
+            except Exception as e:
+                logger.warning(f"Could not load region classifier model {p}: {e}")
+        _MODEL_CACHE[str(p)] = (mtime, model)
+        return model
+
+
+def score_boxes(gray: np.ndarray, boxes: Sequence[Sequence[int]], model: GBDTModel) -> np.ndarray:
+    """Probabilidade de cada caixa conter texto (0..1)."""
+    if not len(boxes):
+        return np.zeros(0)
+    return model.predict_proba(region_features(gray, boxes))
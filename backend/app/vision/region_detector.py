@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class DetectorPreset:
+    """
+    Parâmetros de um detector heurístico (binarização -> morfologia -> componentes -> filtros).
+
+    Os filtros valem sobre o bbox bruto do componente, exceto min_padded_side
+    (aplicado depois do pad + clamp).
+    """
+
+    name: str
+    block_size: int
+    c: int
+    method: str = "mean"  # "mean" | "gaussian" (adaptiveThreshold)
+    blur: int = 0  # kernel do GaussianBlur antes da binarização (0/1 = sem blur)
+    morph: str = "dilate"  # "close" | "dilate" | "none"
+    kernel: int = 0  # 0 => dinâmico: max(5, largura/120), ímpar
+    iterations: int = 1
+    min_area: int = 0
+    max_area_ratio: Optional[float] = None  # área máxima como fração da página
+    min_aspect: float = 0.0  # largura/altura
+    max_aspect: float = math.inf
+    min_side: int = 0  # largura e altura mínimas do bbox bruto
+    max_page_cover: Optional[float] = None  # descarta se cobrir > isso da página nos dois eixos
+    pad: int = 0
+    min_padded_side: int = 0
+    clip: str = "clamp"  # "clamp" => [0,w]x[0,h] | "pixel" => x1<w, x2>x1 (mín. 1px)
+    # Extração dos componentes: "cc" => connectedComponentsWithStats (buracos
+    # preenchidos antes; custo ~ nº de pixels, estável com milhares de componentes).
+    # "contours" => findContours: só compatibilidade (mesmas caixas e ordem,
+    # verificado em tests/test_region_detector.py); pode sair mais barato em
+    # máscaras limpas com poucos blocos numa máquina de um núcleo.
+    components: str = "cc"
+
+
+# Reproduzem os detectores que existiam separados
+PRESETS: Dict[str, DetectorPreset] = {
+    # app.ocr.detect_regions (region_agent / ferramentas de OCR)
+    "ocr_v1": DetectorPreset(
+        name="ocr_v1",
+        block_size=45,
+        c=10,
+        morph="close",
+        kernel=0,
+        iterations=2,
+        min_area=2000,
+        max_area_ratio=0.40,
+        min_aspect=0.15,
+        max_aspect=6.0,
+        pad=8,
+        min_padded_side=20,
+    ),
+    # app.vision.detect_regions (baseline v1)
+    "vision_v1": DetectorPreset(
+        name="vision_v1",
+        block_size=35,
+        c=11,
+        method="gaussian",
+        blur=3,
+        morph="dilate",
+        kernel=3,
+        min_area=1500,
+        max_area_ratio=0.60,
+        clip="pixel",
+    ),
+    # core.tools.ocr_mangaocr (detecção do baseline MangaOCR)
+    "mangaocr_baseline": DetectorPreset(
+        name="mangaocr_baseline",
+        block_size=31,
+        c=10,
+        morph="dilate",
+        kernel=9,
+        min_area=800,
+        min_side=20,
+        max_page_cover=0.95,
+        pad=4,
+    ),
+}
+
+
+def get_preset(preset: "str | DetectorPreset", **overrides) -> DetectorPreset:
+    p = PRESETS[preset] if isinstance(preset, str) else preset
+    return replace(p, **overrides) if overrides else p
+
+
+def _odd(v: float, lo: int) -> int:
+    k = max(lo, int(round(v)))
+    return k if k % 2 == 1 else k + 1
+
+
+def binarize(gray: np.ndarray, preset: DetectorPreset, scale: float = 1.0) -> np.ndarray:
+    """
+    Binarização + morfologia (texto/traços -> blocos brancos).
+    Parâmetros definidos em resolução cheia e escalados por `scale`.
+    """
+    h, w = gray.shape[:2]
+    small = scale < 1.0
+
+    if preset.blur and preset.blur > 1:
+        k = preset.blur if preset.blur % 2 == 1 else preset.blur + 1
+        if small:
+            k = _odd(k * scale, 1)
+        if k > 1:
+            gray = cv2.GaussianBlur(gray, (k, k), 0)
+
+    method = cv2.ADAPTIVE_THRESH_GAUSSIAN_C if preset.method == "gaussian" else cv2.ADAPTIVE_THRESH_MEAN_C
+    block = preset.block_size if not small else _odd(preset.block_size * scale, 3)
+    mask = cv2.adaptiveThreshold(gray, 255, method, cv2.THRESH_BINARY_INV, block, preset.c)
+
+    if preset.morph == "none":
+        return mask
+
+    if preset.kernel:
+        k_size = preset.kernel if not small else max(1, int(round(preset.kernel * scale)))
+    else:
+        # ~1% da largura, ímpar
+        k_size = max(5, int(w / 120)) if not small else max(_odd(5 * scale, 3), int(w / 120))
+        if k_size % 2 == 0:
+            k_size += 1
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k_size, k_size))
+    if preset.morph == "close":
+        return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=preset.iterations)
+    return cv2.dilate(mask, kernel, iterations=preset.iterations)
+
+
+def outer_components(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Componentes externos da máscara: (labels, stats) de connectedComponentsWithStats.
+
+    Equivale a findContours(RETR_EXTERNAL) + boundingRect: os buracos (fundo
+    4-conexo que não alcança a borda) são preenchidos antes, então o que está
+    dentro de um balão/contorno fecha com ele num componente só (8-conexo).
+    """
+    h, w = mask.shape[:2]
+    padded = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    outside = padded.copy()
+    cv2.floodFill(outside, np.zeros((h + 4, w + 4), np.uint8), (0, 0), 255, flags=4)
+    padded[outside == 0] = 255
+    _, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        padded[1:-1, 1:-1], 8, cv2.CV_32S, cv2.CCL_GRANA
+    )
+    return labels, stats
+
+
+def _contour_order(labels: np.ndarray, stats: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # Permutação de idx (labels) na ordem do findContours, que devolve os
+    # contornos externos na ordem inversa da varredura raster do 1º pixel de
+    # cada um; manter a mesma ordem deixa a saída (e os desempates dos
+    # passos seguintes) idêntica à dos detectores antigos.
+    if len(idx) < 2:
+        return np.arange(len(idx))
+    w = labels.shape[1]
+    first = np.empty(len(idx), dtype=np.int64)
+    for k, i in enumerate(idx):
+        top, left = int(stats[i, cv2.CC_STAT_TOP]), int(stats[i, cv2.CC_STAT_LEFT])
+        row = labels[top, left:left + int(stats[i, cv2.CC_STAT_WIDTH])]
+        first[k] = top * w + left + int(np.argmax(row == i))
+    return np.argsort(-first, kind="stable")
+
+
+def component_boxes(mask: np.ndarray, method: str = "cc") -> Tuple[np.ndarray, Callable[[np.ndarray], np.ndarray]]:
+    """
+    Bboxes dos componentes externos: (N x 4 [x,y,w,h] int64, order).
+
+    order(idx) devolve a permutação que põe um subconjunto (índices em ordem
+    crescente) na ordem do findContours; assim só as caixas que sobrevivem aos
+    filtros pagam o custo de ordenar.
+    """
+    if method == "cc":
+        labels, stats = outer_components(mask)
+        xywh = stats[1:, :4].astype(np.int64)
+        return xywh, lambda idx: _contour_order(labels, stats, idx + 1)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.zeros((0, 4), dtype=np.int64), lambda idx: np.arange(len(idx))
+    # boundingRect de todos os contornos de uma vez (min/max por segmento)
+    pts = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    starts = np.zeros(len(contours), dtype=np.int64)
+    np.cumsum(np.fromiter((len(c) for c in contours), np.int64, len(contours))[:-1], out=starts[1:])
+    lo = np.minimum.reduceat(pts, starts, axis=0)
+    hi = np.maximum.reduceat(pts, starts, axis=0)
+    return np.column_stack([lo, hi - lo + 1]), lambda idx: np.arange(len(idx))
+
+
+def refine_box(
+    gray: np.ndarray,
+    box: Tuple[int, int, int, int],
+    margin: int,
+    preset: DetectorPreset,
+) -> Tuple[int, int, int, int]:
+    """
+    Ajusta as bordas de uma caixa vinda da escala reduzida em resolução cheia,
+    processando só uma ROI local (caixa + margem): a nova caixa é o bbox da
+    tinta (threshold adaptativo) dentro da ROI. O fechamento morfológico não
+    altera o contorno externo de forma relevante, então não é refeito aqui.
+    """
+    h, w = gray.shape[:2]
+    x, y, x2, y2 = box
+    rx1, ry1 = max(0, x - margin), max(0, y - margin)
+    rx2, ry2 = min(w, x2 + margin), min(h, y2 + margin)
+    roi = gray[ry1:ry2, rx1:rx2]
+    if roi.shape[0] < 3 or roi.shape[1] < 3:
+        return box
+
+    method = cv2.ADAPTIVE_THRESH_GAUSSIAN_C if preset.method == "gaussian" else cv2.ADAPTIVE_THRESH_MEAN_C
+    ink = cv2.adaptiveThreshold(roi, 255, method, cv2.THRESH_BINARY_INV, preset.block_size, preset.c)
+    bx, by, bw, bh = cv2.boundingRect(ink)
+    if bw == 0 or bh == 0:
+        return box
+    return int(bx + rx1), int(by + ry1), int(bx + bw + rx1), int(by + bh + ry1)
+
+
+def _rule_mask(x, y, bw, bh, p: DetectorPreset, w: int, h: int) -> np.ndarray:
+    area = bw * bh
+    keep = (bw > 0) & (bh > 0) & (area >= p.min_area)
+    if p.max_area_ratio is not None:
+        keep &= area <= int((w * h) * p.max_area_ratio)
+    if p.min_aspect > 0.0 or p.max_aspect != math.inf:
+        ratio = bw / np.maximum(bh, 1).astype(np.float64)
+        keep &= (ratio >= p.min_aspect) & (ratio <= p.max_aspect)
+    if p.min_side:
+        keep &= (bw >= p.min_side) & (bh >= p.min_side)
+    if p.max_page_cover is not None:
+        keep &= ~((bw > w * p.max_page_cover) & (bh > h * p.max_page_cover))
+    return keep
+
+
+def detect_boxes(
+    gray: np.ndarray,
+    preset: "str | DetectorPreset" = "ocr_v1",
+    *,
+    scale: float = 1.0,
+    refine: bool = True,
+    **overrides,
+) -> np.ndarray:
+    """
+    Detecta caixas candidatas de texto/balões numa imagem em tons de cinza.
+
+    - binariza + morfologia conforme o preset
+    - componentes externos (connectedComponentsWithStats; findContours só com
+      preset.components="contours") com os bboxes em arrays, sem laço por contorno
+    - filtros de área, proporção, lado mínimo e cobertura da página vetorizados em numpy
+    - pad + clamp e descarte de caixas degeneradas
+
+    Modo pirâmide (0 < scale < 1): detecta numa cópia reduzida, mapeia as caixas
+    de volta e (refine=True) ajusta as bordas em resolução cheia em ROIs locais.
+
+    `overrides` substitui campos do preset (ex.: min_area=..., pad=...).
+    Retorna array N x 4 (int64) [x1,y1,x2,y2], na ordem do findContours.
+    """
+    p = get_preset(preset, **overrides)
+    h, w = gray.shape[:2]
+
+    pyramid = 0.0 < scale < 1.0
+    if pyramid:
+        sw, sh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        src = cv2.resize(gray, (sw, sh), interpolation=cv2.INTER_AREA)
+    else:
+        src = gray
+
+    xywh, order = component_boxes(binarize(src, p, scale if pyramid else 1.0), p.components)
+    idx = np.arange(len(xywh))
+    x, y, bw, bh = xywh.T
+
+    if pyramid:
+        # descarta cedo o que nunca passaria no filtro de área (poupa o refino)
+        early = bw * bh >= p.min_area * scale * scale * 0.25
+        idx, x, y, bw, bh = idx[early], x[early], y[early], bw[early], bh[early]
+        # volta para coordenadas da imagem original
+        x1 = (x / scale).astype(np.int64)
+        y1 = (y / scale).astype(np.int64)
+        x2 = np.minimum(w, np.ceil((x + bw) / scale).astype(np.int64))
+        y2 = np.minimum(h, np.ceil((y + bh) / scale).astype(np.int64))
+        if refine and len(idx):
+            margin = int(np.ceil(2.0 / scale))
+            refined = [refine_box(gray, b, margin, p) for b in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist())]
+            x1, y1, x2, y2 = np.asarray(refined, dtype=np.int64).reshape(-1, 4).T
+        x, y, bw, bh = x1, y1, x2 - x1, y2 - y1
+
+    keep = _rule_mask(x, y, bw, bh, p, w, h)
+    idx, x, y, bw, bh = idx[keep], x[keep], y[keep], bw[keep], bh[keep]
+
+    if p.clip == "pixel":
+        x1 = np.clip(x - p.pad, 0, w - 1)
+        y1 = np.clip(y - p.pad, 0, h - 1)
+        x2 = np.clip(x + bw + p.pad, 0, w)
+        y2 = np.clip(y + bh + p.pad, 0, h)
+        x2 = np.where(x2 <= x1, np.minimum(w, x1 + 1), x2)
+        y2 = np.where(y2 <= y1, np.minimum(h, y1 + 1), y2)
+    else:
+        x1 = np.clip(x - p.pad, 0, w)
+        y1 = np.clip(y - p.pad, 0, h)
+        x2 = np.clip(x + bw + p.pad, 0, w)
+        y2 = np.clip(y + bh + p.pad, 0, h)
+
+    # descarta caixas degeneradas
+    keep = ((x2 - x1) >= p.min_padded_side) & ((y2 - y1) >= p.min_padded_side)
+    boxes = np.stack([x1, y1, x2, y2], axis=1)[keep]
+    return boxes[order(idx[keep])]
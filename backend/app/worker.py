@@ -0,0 +1,98 @@
+"""
+Worker da fila durável (app.core.work_queue).
+
+Uso (a partir de backend/):
+    python -m app.worker                  # WORKER_CONCURRENCY threads, roda até SIGINT/SIGTERM
+    python -m app.worker --concurrency 4
+    python -m app.worker --once           # esvazia as tarefas prontas e sai
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.core import work_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, concurrency: int, kinds: Optional[List[str]] = None, poll_s: float = 1.0, once: bool = False):
+        self.concurrency = max(1, concurrency)
+        self.kinds = kinds or None
+        self.poll_s = poll_s
+        self.once = once
+        self.stop = threading.Event()
+        self.base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _loop(self, n: int) -> None:
+        worker_id = f"{self.base_id}:{n}"
+        while not self.stop.is_set():
+            try:
+                task = work_queue.claim(worker_id, self.kinds, concurrency=self.concurrency)
+            except Exception as e:
+                logger.error(f"[{worker_id}] claim failed: {e}")
+                task = None
+            if task is None:
+                if self.once:
+                    return
+                self.stop.wait(self.poll_s)
+                continue
+            work_queue.execute(task, worker_id)
+
+    def run(self) -> None:
+        purged = work_queue.purge_finished(settings.work_queue_keep_finished_s)
+        logger.info(
+            f"Worker {self.base_id} started: concurrency={self.concurrency} kinds={self.kinds or 'all'}"
+            f" queue={work_queue.queue_path()} (purged {purged} old tasks)"
+        )
+        threads = [threading.Thread(target=self._loop, args=(n,), name=f"worker-{n}") for n in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        # join com timeout para o sinal chegar na thread principal; no caminho
+        # marca presença (a API avisa se a fila não tem worker)
+        seen = 0.0
+        while any(t.is_alive() for t in threads):
+            if time.monotonic() - seen >= settings.worker_stale_s / 3:
+                try:
+                    work_queue.worker_seen(self.base_id, self.concurrency)
+                except Exception as e:
+                    logger.warning(f"Worker {self.base_id}: presence update failed: {e}")
+                seen = time.monotonic()
+            for t in threads:
+                t.join(timeout=0.5)
+        work_queue.worker_gone(self.base_id)
+        logger.info(f"Worker {self.base_id} stopped")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.worker")
+    ap.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    ap.add_argument("--kinds", nargs="*", choices=sorted(work_queue.HANDLERS), help="só estes tipos de tarefa")
+    ap.add_argument("--poll", type=float, default=settings.worker_poll_s, help="espera (s) com a fila vazia")
+    ap.add_argument("--once", action="store_true", help="processa as tarefas prontas e sai")
+    args = ap.parse_args(argv)
+
+    setup_logging()
+    worker = Worker(args.concurrency, args.kinds, args.poll, args.once)
+
+    def _stop(signum, frame):
+        # Termina as tarefas em andamento; não pega novas
+        logger.info(f"Signal {signum}: stopping after current tasks")
+        worker.stop.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
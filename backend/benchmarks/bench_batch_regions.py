@@ -0,0 +1,103 @@
+"""
+Benchmark da detecção de regiões em lote (app.core.batch_regions) x página a
+página (region_agent, como o run_page_pipeline faz hoje).
+
+Gera um job sintético num APP_DATA_DIR temporário e mede páginas/s para cada
+número de workers (cache de regiões desligado para medir a detecção). Confere
+também que os documentos gravados pelo lote são idênticos aos sequenciais.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_batch_regions.py --pages 48 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+
+def synthetic_page(path: str, seed: int, w: int, h: int) -> None:
+    rnd = random.Random(seed)
+    img = np.full((h, w, 3), 255, np.uint8)
+    for _ in range(rnd.randrange(3, 7)):  # retícula / hachura
+        x, y = rnd.randrange(0, w - 400), rnd.randrange(0, h - 400)
+        for yy in range(y, y + rnd.randrange(200, 400), 9):
+            for xx in range(x, x + rnd.randrange(200, 400), 9):
+                cv2.circle(img, (xx, yy), 2, (60, 60, 60), -1)
+    for _ in range(rnd.randrange(5, 10)):  # balões com texto
+        ax, ay = rnd.randrange(120, 220), rnd.randrange(100, 180)
+        cx, cy = rnd.randrange(ax + 10, w - ax - 10), rnd.randrange(ay + 10, h - ay - 10)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, (255, 255, 255), -1)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, (0, 0, 0), 3)
+        for ln in range(rnd.randrange(2, 4)):
+            word = "".join(rnd.choice("ABCDEFGHIJKLMNOPRSTUVW") for _ in range(rnd.randrange(4, 8)))
+            cv2.putText(img, word, (cx - int(ax * 0.55), cy - ay // 3 + ln * 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=48)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--width", type=int, default=1800)
+    ap.add_argument("--height", type=int, default=2600)
+    args = ap.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    os.environ["APP_DATA_DIR"] = data_dir
+    os.environ.setdefault(
+        "PIPELINE_PATH",
+        str(Path(__file__).resolve().parents[2] / "pipelines" / "default_page_pipeline.json"),
+    )
+
+    from app.core.agents.region_agent import region_agent
+    from app.core.batch_regions import detect_job_regions
+    from app.core.config import settings
+    from app.core.pipeline_engine import _regions_path
+    from app.core.storage import read_json
+
+    settings.app_data_dir = data_dir
+    settings.regions_cache_enabled = False
+
+    job = "bench_batch"
+    pages_dir = Path(data_dir) / "jobs" / job / "pages"
+    pages_dir.mkdir(parents=True)
+    for p in range(1, args.pages + 1):
+        synthetic_page(str(pages_dir / f"{p:03d}.jpg"), p, args.width, args.height)
+
+    t0 = time.perf_counter()
+    seq = {
+        p: region_agent(image_path=pages_dir / f"{p:03d}.jpg", page_number=p, image_filename=f"{p:03d}.jpg")
+        for p in range(1, args.pages + 1)
+    }
+    t_seq = time.perf_counter() - t0
+    base = args.pages / t_seq
+
+    print(f"pages: {args.pages} ({args.width}x{args.height}), cpus: {os.cpu_count()}")
+    print(f"{'mode':<14}{'pages/s':>9}{'speedup':>9}{'efficiency':>12}{'identical':>11}")
+    print(f"{'sequential':<14}{base:9.2f}{1.0:9.2f}{1.0:12.2f}{'-':>11}")
+    for w in args.workers:
+        shutil.rmtree(Path(data_dir) / "jobs" / job / "regions", ignore_errors=True)
+        shutil.rmtree(Path(data_dir) / "jobs" / job / "pipeline", ignore_errors=True)
+        t0 = time.perf_counter()
+        summary = detect_job_regions(job, workers=w)
+        dt = time.perf_counter() - t0
+        same = all(read_json(_regions_path(job, p)) == seq[p] for p in seq)
+        rate = args.pages / dt
+        print(f"{'batch x' + str(summary['workers']):<14}{rate:9.2f}{rate / base:9.2f}"
+              f"{rate / base / max(1, summary['workers']):12.2f}{str(same):>11}")
+
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark do modo pirâmide do detect_regions (app.ocr.detect_regions).
+
+Compara resolução cheia x escala reduzida (com e sem refino) numa página
+sintética de alta resolução (ou numa imagem passada em --image) e reporta
+tempo e concordância das caixas (recall/precisão com IoU >= 0.5 e IoU médio).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_detect_pyramid.py --scales 0.5 0.35 0.25
+    python benchmarks/bench_detect_pyramid.py --image ../data/jobs/<job>/pages/001.jpg
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.ocr.detect_regions import detect_regions
+
+
+def synthetic_page(path: str, w: int = 2800, h: int = 4000, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    img = np.full((h, w, 3), 255, np.uint8)
+    # balões com texto numa grade 4x4 (posição com jitter)
+    for k in range(16):
+        cx = 350 + (k % 4) * (w - 700) // 3 + rnd.randrange(-60, 60)
+        cy = 450 + (k // 4) * (h - 900) // 3 + rnd.randrange(-60, 60)
+        ax, ay = rnd.randrange(140, 240), rnd.randrange(160, 260)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, (0, 0, 0), 5)
+        for ln in range(3):
+            cv2.putText(img, "TEXTO", (cx - ax // 2, cy - ay // 3 + ln * 70),
+                        cv2.FONT_HERSHEY_SIMPLEX, 2.0, (0, 0, 0), 6)
+    # retícula (screentone) numa faixa: muitos contornos pequenos
+    for y in range(h - 420, h - 40, 14):
+        for x in range(40, w - 40, 14):
+            cv2.circle(img, (x, y), 3, (0, 0, 0), -1)
+    cv2.imwrite(path, img)
+
+
+def iou(a, b) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if not inter:
+        return 0.0
+    ua = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / float(ua)
+
+
+def agreement(ref, got):
+    best = [max((iou(r, g) for g in got), default=0.0) for r in ref]
+    recall = sum(1 for v in best if v >= 0.5) / max(1, len(ref))
+    best_g = [max((iou(g, r) for r in ref), default=0.0) for g in got]
+    precision = sum(1 for v in best_g if v >= 0.5) / max(1, len(got))
+    return recall, precision, (sum(best) / len(best) if best else 1.0)
+
+
+def timed(fn, repeats):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return out, (time.perf_counter() - t0) / repeats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--image")
+    ap.add_argument("--scales", type=float, nargs="+", default=[0.5, 0.35, 0.25])
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    path = args.image
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic_4000px.jpg")
+        synthetic_page(path)
+
+    _, t_read = timed(lambda: cv2.imread(path, cv2.IMREAD_COLOR), args.repeats)
+    print(f"image decode (included in every row): {t_read * 1000:.1f} ms")
+
+    full, t_full = timed(lambda: detect_regions(path), args.repeats)
+    print(f"{'mode':<22}{'ms':>9}{'speedup':>9}{'boxes':>7}{'recall':>8}{'prec':>7}{'mIoU':>7}")
+    print(f"{'full':<22}{t_full * 1000:9.1f}{1.0:9.2f}{len(full):7d}{1.0:8.2f}{1.0:7.2f}{1.0:7.2f}")
+    for s in args.scales:
+        for refine in (False, True):
+            got, t = timed(lambda: detect_regions(path, scale=s, refine=refine), args.repeats)
+            r, p, m = agreement(full, got)
+            name = f"scale={s:g}{' +refine' if refine else ''}"
+            print(f"{name:<22}{t * 1000:9.1f}{t_full / t:9.2f}{len(got):7d}{r:8.2f}{p:7.2f}{m:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
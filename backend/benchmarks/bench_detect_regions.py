@@ -0,0 +1,98 @@
+"""
+Benchmark do merge de regiões (app.ocr.detect_regions._merge_overlapping).
+
+Gera uma página sintética com muitos contornos (retícula/screentone + balões),
+compara o merge com índice espacial contra a varredura original (referência)
+e verifica que a saída é idêntica.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_detect_regions.py --boxes 3000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.geometry import to_list
+from app.ocr.detect_regions import _merge_overlapping
+
+Box = List[int]
+
+
+def _close(a: Box, b: Box, dist_threshold: int) -> bool:
+    x_gap = max(0, a[0] - b[2], b[0] - a[2])
+    y_gap = max(0, a[1] - b[3], b[1] - a[3])
+    return x_gap <= dist_threshold and y_gap <= dist_threshold
+
+
+def merge_reference(regions: List[Box], dist_threshold: int = 25) -> List[Box]:
+    # Implementação original (varredura até ponto fixo), mantida só para comparação
+    if not regions:
+        return regions
+    regions = sorted(regions, key=lambda r: ((r[2] - r[0]) * (r[3] - r[1])), reverse=True)
+    merged: List[Box] = []
+    while regions:
+        current = regions.pop(0)
+        changed = True
+        while changed:
+            changed = False
+            keep: List[Box] = []
+            for r in regions:
+                if _close(current, r, dist_threshold):
+                    current = [min(current[0], r[0]), min(current[1], r[1]), max(current[2], r[2]), max(current[3], r[3])]
+                    changed = True
+                else:
+                    keep.append(r)
+            regions = keep
+        merged.append(current)
+    return merged
+
+
+def synthetic_regions(n: int, w: int = 4000, h: int = 6000, seed: int = 0) -> List[Box]:
+    rnd = random.Random(seed)
+    out: List[Box] = []
+    # pontos de retícula espalhados (maioria isolada)
+    for _ in range(n):
+        x, y = rnd.randrange(0, w - 30), rnd.randrange(0, h - 30)
+        s = rnd.randrange(20, 30)
+        out.append([x, y, x + s, y + s])
+    # alguns aglomerados de texto (devem fundir)
+    for _ in range(max(1, n // 100)):
+        cx, cy = rnd.randrange(200, w - 400), rnd.randrange(200, h - 400)
+        for k in range(12):
+            x, y = cx + (k % 3) * 40, cy + (k // 3) * 45
+            out.append([x, y, x + 35, y + 40])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--boxes", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    regions = synthetic_regions(args.boxes, seed=args.seed)
+
+    t0 = time.perf_counter()
+    fast = to_list(_merge_overlapping(regions))
+    t_fast = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ref = merge_reference(list(regions))
+    t_ref = time.perf_counter() - t0
+
+    print(f"input regions:   {len(regions)}")
+    print(f"merged regions:  {len(fast)}")
+    print(f"reference sweep: {t_ref * 1000:9.1f} ms")
+    print(f"grid index:      {t_fast * 1000:9.1f} ms  ({t_ref / max(t_fast, 1e-9):.1f}x)")
+    print(f"identical:       {fast == ref}")
+    if fast != ref:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
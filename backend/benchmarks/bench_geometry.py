@@ -0,0 +1,86 @@
+"""
+Benchmark das operações vetorizadas de app.core.geometry contra os laços
+por par que existiam espalhados pelos módulos (IoU, distância entre bordas,
+clamp), conferindo que os resultados batem.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_geometry.py --boxes 300
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.core import geometry
+
+
+def iou_loop(a, b):
+    out = np.zeros((len(a), len(b)))
+    for i, p in enumerate(a):
+        for j, q in enumerate(b):
+            iw = max(0, min(p[2], q[2]) - max(p[0], q[0]))
+            ih = max(0, min(p[3], q[3]) - max(p[1], q[1]))
+            inter = iw * ih
+            area = (p[2] - p[0]) * (p[3] - p[1]) + (q[2] - q[0]) * (q[3] - q[1])
+            out[i, j] = inter / float(area - inter + 1e-9)
+    return out
+
+
+def near_loop(a, b, d):
+    return np.array([[max(0, p[0] - q[2], q[0] - p[2]) <= d and max(0, p[1] - q[3], q[1] - p[3]) <= d
+                      for q in b] for p in a])
+
+
+def clamp_loop(boxes, w, h):
+    out = []
+    for x1, y1, x2, y2 in boxes:
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(w, int(x2)), min(h, int(y2))
+        if x2 > x1 and y2 > y1:
+            out.append([x1, y1, x2, y2])
+    return out
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    r = fn(*args)
+    return r, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--boxes", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    w, h = 1800, 2600
+    boxes = []
+    for _ in range(args.boxes):
+        x, y = rnd.randrange(-50, w), rnd.randrange(-50, h)
+        boxes.append([x, y, x + rnd.randrange(10, 300), y + rnd.randrange(10, 200)])
+    arr = geometry.as_boxes(boxes)
+
+    print(f"boxes: {args.boxes}")
+    print(f"{'op':<10}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}{'equal':>7}")
+    a, t_a = timed(iou_loop, boxes, boxes)
+    b, t_b = timed(geometry.iou, arr, arr)
+    print(f"{'iou':<10}{t_a:10.2f}{t_b:10.2f}{t_a / max(t_b, 1e-9):9.1f}{str(np.allclose(a, b)):>7}")
+    a, t_a = timed(near_loop, boxes, boxes, 25)
+    b, t_b = timed(geometry.near, arr, arr, 25)
+    print(f"{'near':<10}{t_a:10.2f}{t_b:10.2f}{t_a / max(t_b, 1e-9):9.1f}{str(bool(np.array_equal(a, b))):>7}")
+    a, t_a = timed(clamp_loop, boxes, w, h)
+    t0 = time.perf_counter()
+    c = geometry.clamp(arr, w, h)
+    c = geometry.to_list(c[geometry.valid(c)])
+    t_b = (time.perf_counter() - t0) * 1000
+    print(f"{'clamp':<10}{t_a:10.2f}{t_b:10.2f}{t_a / max(t_b, 1e-9):9.1f}{str(a == c):>7}")
+
+
+if __name__ == "__main__":
+    main()
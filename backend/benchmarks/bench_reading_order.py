@@ -0,0 +1,152 @@
+"""
+Benchmark / checagem da ordem de leitura (app.vision.reading_order).
+
+1) Linhas: compara group_lines/reading_order (sem painéis) com a ordenação v1
+   (média recalculada em laços aninhados) em páginas aleatórias com muitos
+   blocos; a saída tem que ser idêntica (sai com erro se não for; a checagem
+   também está em tests/test_reading_order.py).
+2) Painéis: página sintética com grade de quadros (calhas brancas) e balões;
+   confere os quadros do XY-cut, que a ordem é painel -> linha -> RTL e mede
+   segment_panels e o acerto do cache (page_panels).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_reading_order.py --sizes 50 500 2000 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.vision.reading_order import page_panels, reading_order, segment_panels
+
+
+def legacy_order(boxes, line_tol):
+    """Ordenação v1 (detect_regions / grouping_agent antes do módulo compartilhado)."""
+    idx = sorted(range(len(boxes)), key=lambda i: boxes[i][1])
+    lines = []
+    for i in idx:
+        placed = False
+        for line in lines:
+            y_avg = sum(boxes[j][1] for j in line) / len(line)
+            if abs(boxes[i][1] - y_avg) <= line_tol:
+                line.append(i)
+                placed = True
+                break
+        if not placed:
+            lines.append([i])
+    out = []
+    for line in lines:
+        line.sort(key=lambda i: boxes[i][0], reverse=True)
+        out.extend(line)
+    return out
+
+
+def random_boxes(rnd, n, w=1800, h=2600):
+    boxes = []
+    for _ in range(n):
+        x, y = rnd.randrange(0, w - 60), rnd.randrange(0, h - 40)
+        boxes.append([x, y, x + rnd.randrange(20, 60), y + rnd.randrange(15, 40)])
+    return boxes
+
+
+def bench_lines(sizes, seed, line_tol):
+    print(f"{'blocks':>8}{'v1 ms':>10}{'new ms':>10}{'speedup':>9}{'identical':>11}")
+    ok = True
+    for n in sizes:
+        rnd = random.Random(seed + n)
+        pages = [random_boxes(rnd, n) for _ in range(5)]
+        # coordenadas repetidas de propósito (empates em y e x)
+        pages.append([[b[0] // 50 * 50, b[1] // 40 * 40, b[2], b[3]] for b in random_boxes(rnd, n)])
+        t_old = t_new = 0.0
+        same = True
+        for boxes in pages:
+            t0 = time.perf_counter()
+            a = legacy_order(boxes, line_tol)
+            t1 = time.perf_counter()
+            b = reading_order(boxes, line_tol=line_tol)
+            t2 = time.perf_counter()
+            t_old += t1 - t0
+            t_new += t2 - t1
+            same &= a == b
+        k = len(pages)
+        ok &= same
+        print(f"{n:8d}{t_old / k * 1000:10.2f}{t_new / k * 1000:10.2f}{t_old / max(t_new, 1e-9):9.1f}{str(same):>11}")
+    return ok
+
+
+def panel_page(path, rnd, w=1800, h=2600, rows=3, cols=2, gutter=30, margin=60):
+    img = np.full((h, w), 255, np.uint8)
+    ph = (h - 2 * margin - (rows - 1) * gutter) // rows
+    pw = (w - 2 * margin - (cols - 1) * gutter) // cols
+    expected = []  # ordem esperada (linhas de cima p/ baixo, colunas RTL)
+    for r in range(rows):
+        for c in reversed(range(cols)):
+            x1, y1 = margin + c * (pw + gutter), margin + r * (ph + gutter)
+            cv2.rectangle(img, (x1, y1), (x1 + pw, y1 + ph), 0, 4)
+            for _ in range(300):  # arte / retícula dentro do quadro
+                cv2.circle(img, (rnd.randrange(x1 + 10, x1 + pw - 10), rnd.randrange(y1 + 10, y1 + ph - 10)), 2, 80, -1)
+            blocks = []
+            for k in range(4):
+                # balões em y escalonado; o de baixo do quadro da direita fica
+                # mais alto que o de cima do quadro da esquerda (só a ordem por
+                # painel acerta)
+                bx = x1 + 40 + (k % 2) * (pw // 2)
+                by = y1 + 40 + k * (ph // 5)
+                blocks.append([bx, by, bx + pw // 3, by + 60])
+            expected.append(blocks)
+    cv2.imwrite(path, img)
+    return expected
+
+
+def bench_panels(seed, line_tol):
+    rnd = random.Random(seed)
+    path = os.path.join(tempfile.mkdtemp(), "page.png")
+    expected = panel_page(path, rnd)
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+    t0 = time.perf_counter()
+    panels = segment_panels(gray)
+    t_seg = time.perf_counter() - t0
+
+    blocks = [b for panel in expected for b in panel]
+    shuffled = blocks[:]
+    rnd.shuffle(shuffled)
+    want = [reading_order(p, line_tol=line_tol) for p in expected]
+    want_flat = [expected[k][i] for k in range(len(expected)) for i in want[k]]
+    got = [shuffled[i] for i in reading_order(shuffled, panels=panels, line_tol=line_tol)]
+    no_panels = [shuffled[i] for i in reading_order(shuffled, line_tol=line_tol)]
+
+    page_panels(Path(path))  # popula o cache
+    t0 = time.perf_counter()
+    for _ in range(100):
+        page_panels(Path(path))
+    t_hit = (time.perf_counter() - t0) / 100
+
+    print(f"\npanels found: {len(panels)} (expected {len(expected)})")
+    print(f"segment_panels: {t_seg * 1000:.1f} ms, cached page_panels: {t_hit * 1e6:.0f} us")
+    print(f"panel-major order correct: {got == want_flat} (lines only: {no_panels == want_flat})")
+    return len(panels) == len(expected) and got == want_flat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000, 5000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--line-tol", type=int, default=70)
+    args = ap.parse_args()
+    ok = bench_lines(args.sizes, args.seed, args.line_tol)
+    ok &= bench_panels(args.seed, args.line_tol)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
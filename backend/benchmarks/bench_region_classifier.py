@@ -0,0 +1,201 @@
+"""
+Treino + benchmark do classificador texto/não-texto das propostas de região
+(app.vision.region_classifier).
+
+Amostras rotuladas:
+- --jobs-dir: páginas já revisadas no checkpoint de regiões (data/jobs/*); as
+  regiões salvas (editadas pelo usuário) são o gabarito.
+- sem --jobs-dir: páginas sintéticas (balões com texto + bordas de painel,
+  retícula, linhas de ação e hachuras como distratores).
+
+Uma proposta do detector é positiva quando >= 50% da sua área cai dentro de
+uma região do gabarito. Divide por página (treino/teste), treina o GBDT e
+reporta precisão/recall das propostas mantidas por threshold, chamadas de OCR
+evitadas e tempo (features + inferência) por página.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_region_classifier.py --pages 60
+    python benchmarks/bench_region_classifier.py --jobs-dir ../data/jobs --out ../models/region_classifier.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.ocr.detect_regions import detect_regions
+from app.vision.region_classifier import region_features, train_gbdt
+
+Box = List[int]
+
+
+def synthetic_page(path: str, seed: int, w: int = 1100, h: int = 1600) -> List[Box]:
+    rnd = random.Random(seed)
+    img = np.full((h, w, 3), 255, np.uint8)
+    gt: List[Box] = []
+
+    # distratores
+    for _ in range(rnd.randrange(1, 4)):  # retícula
+        x, y = rnd.randrange(0, w - 300), rnd.randrange(0, h - 300)
+        step = rnd.randrange(6, 12)
+        for yy in range(y, y + rnd.randrange(120, 300), step):
+            for xx in range(x, x + rnd.randrange(120, 300), step):
+                cv2.circle(img, (xx, yy), rnd.randrange(1, 3), (0, 0, 0), -1)
+    for _ in range(rnd.randrange(1, 3)):  # linhas de ação
+        cx, cy = rnd.randrange(0, w), rnd.randrange(0, h)
+        for _ in range(rnd.randrange(10, 30)):
+            a = rnd.uniform(0, 2 * np.pi)
+            r1, r2 = rnd.randrange(60, 120), rnd.randrange(160, 320)
+            p1 = (int(cx + r1 * np.cos(a)), int(cy + r1 * np.sin(a)))
+            p2 = (int(cx + r2 * np.cos(a)), int(cy + r2 * np.sin(a)))
+            cv2.line(img, p1, p2, (0, 0, 0), rnd.randrange(1, 3))
+    for _ in range(rnd.randrange(1, 4)):  # hachura / arte
+        x, y = rnd.randrange(0, w - 200), rnd.randrange(0, h - 200)
+        pts = np.array([[x + rnd.randrange(0, 200), y + rnd.randrange(0, 200)] for _ in range(8)], np.int32)
+        cv2.polylines(img, [pts], False, (0, 0, 0), rnd.randrange(2, 6))
+        if rnd.random() < 0.5:
+            cv2.fillPoly(img, [pts[:4]], (40, 40, 40))
+    for _ in range(rnd.randrange(0, 3)):  # fragmentos de borda de painel
+        x, y = rnd.randrange(0, w - 400), rnd.randrange(0, h - 400)
+        cv2.rectangle(img, (x, y), (x + rnd.randrange(150, 400), y + rnd.randrange(150, 400)), (0, 0, 0), 4)
+
+    # balões com texto (gabarito)
+    for _ in range(rnd.randrange(3, 7)):
+        ax, ay = rnd.randrange(90, 170), rnd.randrange(70, 150)
+        cx, cy = rnd.randrange(ax + 10, w - ax - 10), rnd.randrange(ay + 10, h - ay - 10)
+        if any(b[0] - ax < cx < b[2] + ax and b[1] - ay < cy < b[3] + ay for b in gt):
+            continue
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, (255, 255, 255), -1)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, (0, 0, 0), 3)
+        fs = rnd.uniform(0.6, 1.0)
+        for ln in range(rnd.randrange(1, 4)):
+            word = "".join(rnd.choice("ABCDEFGHIJKLMNOPRSTUVW!?") for _ in range(rnd.randrange(4, 9)))
+            cv2.putText(img, word, (cx - int(ax * 0.6), cy - ay // 3 + ln * int(36 * fs)),
+                        cv2.FONT_HERSHEY_SIMPLEX, fs, (0, 0, 0), 2)
+        gt.append([cx - ax - 2, cy - ay - 2, cx + ax + 2, cy + ay + 2])
+
+    cv2.imwrite(path, img)
+    return gt
+
+
+def reviewed_pages(jobs_dir: Path) -> List[Tuple[str, List[Box]]]:
+    out = []
+    for state_path in sorted(jobs_dir.glob("*/pipeline/state_page_*.json")):
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        steps = state.get("steps") or {}
+        # revisada = algum checkpoint humano concluído
+        if not any(v.get("status") == "done" and ("checkpoint" in k or "human" in k) for k, v in steps.items()):
+            continue
+        job = state_path.parent.parent
+        page = int(state.get("page_number") or state_path.stem.rsplit("_", 1)[-1])
+        regions_path = job / "regions" / f"regions_page_{page:03d}.json"
+        images = sorted((job / "pages").glob(f"{page:03d}.*"))
+        if not regions_path.exists() or not images:
+            continue
+        doc = json.loads(regions_path.read_text(encoding="utf-8"))
+        regions = doc.get("regions") or next(
+            (p.get("regions") or [] for p in doc.get("pages") or [] if str(p.get("page_number")) == str(page)), []
+        )
+        out.append((str(images[0]), [list(map(int, r["bbox"])) for r in regions if r.get("bbox")]))
+    return out
+
+
+def label(proposals: List[Box], gt: List[Box]) -> np.ndarray:
+    y = np.zeros(len(proposals))
+    for i, p in enumerate(proposals):
+        area = max(1, (p[2] - p[0]) * (p[3] - p[1]))
+        for g in gt:
+            inter = max(0, min(p[2], g[2]) - max(p[0], g[0])) * max(0, min(p[3], g[3]) - max(p[1], g[1]))
+            if inter / area >= 0.5:
+                y[i] = 1
+                break
+    return y
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs-dir")
+    ap.add_argument("--pages", type=int, default=60, help="páginas sintéticas (sem --jobs-dir)")
+    ap.add_argument("--test-frac", type=float, default=0.3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    ap.add_argument("--out", help="salva o modelo treinado (JSON) neste caminho")
+    args = ap.parse_args()
+
+    if args.jobs_dir:
+        pages = reviewed_pages(Path(args.jobs_dir))
+        if not pages:
+            sys.exit(f"no reviewed pages under {args.jobs_dir}")
+    else:
+        tmp = tempfile.mkdtemp()
+        pages = []
+        for s in range(args.pages):
+            path = os.path.join(tmp, f"{s:03d}.png")
+            pages.append((path, synthetic_page(path, seed=args.seed * 100000 + s)))
+
+    params = dict(
+        min_area=int(settings.regions_min_area),
+        max_area_ratio=float(settings.regions_max_area_ratio),
+        pad=int(settings.regions_pad),
+    )
+    samples = []  # (page_idx, X, y, detect_s, feature_s)
+    for k, (path, gt) in enumerate(pages):
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        t0 = time.perf_counter()
+        boxes = detect_regions(path, **params)
+        t1 = time.perf_counter()
+        X = region_features(gray, boxes)
+        t2 = time.perf_counter()
+        samples.append((k, X, label(boxes, gt), t1 - t0, t2 - t1))
+
+    rnd = random.Random(args.seed)
+    order = list(range(len(samples)))
+    rnd.shuffle(order)
+    n_test = max(1, int(len(order) * args.test_frac))
+    test_ids, train_ids = set(order[:n_test]), set(order[n_test:])
+    Xtr = np.concatenate([s[1] for s in samples if s[0] in train_ids])
+    ytr = np.concatenate([s[2] for s in samples if s[0] in train_ids])
+    Xte = np.concatenate([s[1] for s in samples if s[0] in test_ids])
+    yte = np.concatenate([s[2] for s in samples if s[0] in test_ids])
+
+    t0 = time.perf_counter()
+    model = train_gbdt(Xtr, ytr)
+    t_train = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    p = model.predict_proba(Xte)
+    t_pred = time.perf_counter() - t0
+
+    print(f"pages: {len(samples)} (train {len(train_ids)}, test {len(test_ids)})")
+    print(f"proposals: train {len(ytr)} ({int(ytr.sum())} text), test {len(yte)} ({int(yte.sum())} text)")
+    print(f"train time: {t_train:.2f} s")
+    print(f"per page: detect {np.mean([s[3] for s in samples]) * 1000:.1f} ms (incl. decode), "
+          f"features {np.mean([s[4] for s in samples]) * 1000:.1f} ms, "
+          f"inference {t_pred / max(1, len(test_ids)) * 1000:.2f} ms")
+    base_prec = yte.mean() if len(yte) else 0.0
+    print(f"\n{'threshold':>10}{'precision':>11}{'recall':>8}{'kept':>7}{'dropped':>9}")
+    print(f"{'none':>10}{base_prec:11.3f}{1.0:8.3f}{len(yte):7d}{0:9d}")
+    for thr in args.thresholds:
+        keep = p >= thr
+        tp = float(np.sum(keep & (yte == 1)))
+        prec = tp / max(1, int(keep.sum()))
+        rec = tp / max(1, int(yte.sum()))
+        print(f"{thr:10.2f}{prec:11.3f}{rec:8.3f}{int(keep.sum()):7d}{int((~keep).sum()):9d}")
+
+    if args.out:
+        model.save(Path(args.out))
+        print(f"\nmodel saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
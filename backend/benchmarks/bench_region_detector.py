@@ -0,0 +1,226 @@
+"""
+Benchmark + verificação de equivalência do detector unificado (app.vision.region_detector).
+
+Para cada preset compara com a implementação antiga (findContours + laço em
+Python por contorno, mantida aqui só como referência) em páginas sintéticas
+(balões + retícula, com ruído forte e com ruído leve de scan) ou nas imagens
+passadas em --image, e verifica que as caixas (e a ordem) são idênticas.
+Nas páginas sintéticas todo preset tem de achar caixas em alguma página
+(com o ruído forte o ocr_v1 em resolução cheia não acha nenhuma; as páginas
+"scan" são as que exercitam a equivalência dele).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_region_detector.py
+    python benchmarks/bench_region_detector.py --image ../data/jobs/<job>/pages/001.jpg
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.vision.region_detector import detect_boxes
+
+
+# ---------------------------------------------------------------------------
+# Referências (detectores antigos, antes da unificação)
+# ---------------------------------------------------------------------------
+
+def _odd(v: float, lo: int) -> int:
+    k = max(lo, int(round(v)))
+    return k if k % 2 == 1 else k + 1
+
+
+def _ref_block_mask(gray: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    h, w = gray.shape[:2]
+    block = 45 if scale >= 1.0 else _odd(45 * scale, 3)
+    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, block, 10)
+    k_size = max(5, int(w / 120)) if scale >= 1.0 else max(_odd(5 * scale, 3), int(w / 120))
+    if k_size % 2 == 0:
+        k_size += 1
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k_size, k_size))
+    return cv2.morphologyEx(thr, cv2.MORPH_CLOSE, kernel, iterations=2)
+
+
+def _ref_refine_box(gray, box, margin):
+    h, w = gray.shape[:2]
+    x, y, x2, y2 = box
+    rx1, ry1 = max(0, x - margin), max(0, y - margin)
+    rx2, ry2 = min(w, x2 + margin), min(h, y2 + margin)
+    roi = gray[ry1:ry2, rx1:rx2]
+    if roi.shape[0] < 3 or roi.shape[1] < 3:
+        return box
+    ink = cv2.adaptiveThreshold(roi, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 45, 10)
+    bx, by, bw, bh = cv2.boundingRect(ink)
+    if bw == 0 or bh == 0:
+        return box
+    return int(bx + rx1), int(by + ry1), int(bx + bw + rx1), int(by + bh + ry1)
+
+
+def ref_ocr_v1(gray, min_area=2000, max_area_ratio=0.40, pad=8, scale=1.0, refine=True) -> List[Tuple[int, ...]]:
+    h, w = gray.shape[:2]
+    max_area = int((w * h) * max_area_ratio)
+    pyramid = 0.0 < scale < 1.0
+    if pyramid:
+        sw, sh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        mor = _ref_block_mask(cv2.resize(gray, (sw, sh), interpolation=cv2.INTER_AREA), scale)
+    else:
+        mor = _ref_block_mask(gray)
+    contours, _ = cv2.findContours(mor, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    out = []
+    for c in contours:
+        x, y, cw, ch = cv2.boundingRect(c)
+        if pyramid:
+            if cw * ch < min_area * scale * scale * 0.25:
+                continue
+            bx1, by1 = int(x / scale), int(y / scale)
+            bx2, by2 = min(w, int(np.ceil((x + cw) / scale))), min(h, int(np.ceil((y + ch) / scale)))
+            if refine:
+                bx1, by1, bx2, by2 = _ref_refine_box(gray, (bx1, by1, bx2, by2), margin=int(np.ceil(2.0 / scale)))
+            x, y, cw, ch = bx1, by1, bx2 - bx1, by2 - by1
+            if cw <= 0 or ch <= 0:
+                continue
+        area = cw * ch
+        if area < min_area or area > max_area:
+            continue
+        ratio = cw / float(ch)
+        if ratio > 6.0 or ratio < 0.15:
+            continue
+        x1, y1 = max(0, min(w, x - pad)), max(0, min(h, y - pad))
+        x2, y2 = max(0, min(w, x + cw + pad)), max(0, min(h, y + ch + pad))
+        if (x2 - x1) < 20 or (y2 - y1) < 20:
+            continue
+        out.append((x1, y1, x2, y2))
+    return out
+
+
+def ref_vision_v1(gray, min_area=1500, max_area_ratio=0.60, dilation=3, blur=3) -> List[Tuple[int, ...]]:
+    h, w = gray.shape[:2]
+    if blur and blur > 1:
+        k = blur if blur % 2 == 1 else blur + 1
+        gray = cv2.GaussianBlur(gray, (k, k), 0)
+    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 35, 11)
+    if dilation and dilation > 0:
+        thr = cv2.dilate(thr, cv2.getStructuringElement(cv2.MORPH_RECT, (dilation, dilation)), iterations=1)
+    contours, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    max_area = int(w * h * max_area_ratio)
+    out = []
+    for c in contours:
+        x, y, ww, hh = cv2.boundingRect(c)
+        if ww * hh < min_area or ww * hh > max_area:
+            continue
+        x1, y1 = max(0, min(x, w - 1)), max(0, min(y, h - 1))
+        x2, y2 = max(0, min(x + ww, w)), max(0, min(y + hh, h))
+        if x2 <= x1:
+            x2 = min(w, x1 + 1)
+        if y2 <= y1:
+            y2 = min(h, y1 + 1)
+        out.append((x1, y1, x2, y2))
+    return out
+
+
+def ref_mangaocr_baseline(gray) -> List[Tuple[int, ...]]:
+    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+    dil = cv2.dilate(thr, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)), iterations=1)
+    contours, _ = cv2.findContours(dil, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    h, w = gray.shape[:2]
+    out = []
+    for c in contours:
+        x, y, ww, hh = cv2.boundingRect(c)
+        if ww * hh < 800 or ww < 20 or hh < 20:
+            continue
+        if ww > w * 0.95 and hh > h * 0.95:
+            continue
+        out.append((max(0, x - 4), max(0, y - 4), min(w, x + ww + 4), min(h, y + hh + 4)))
+    return out
+
+
+# ---------------------------------------------------------------------------
+
+def synthetic_gray(w: int = 1600, h: int = 2300, seed: int = 0, noise: int = 25) -> np.ndarray:
+    rnd = random.Random(seed)
+    img = np.full((h, w), 255, np.uint8)
+    for _ in range(14):
+        cx, cy = rnd.randrange(150, w - 150), rnd.randrange(150, h - 500)
+        ax, ay = rnd.randrange(70, 140), rnd.randrange(80, 160)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, 0, 3)
+        for ln in range(3):
+            cv2.putText(img, "TEXTO", (cx - ax // 2, cy - ay // 3 + ln * 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 3)
+    for _ in range(12):  # traços finos / linhas de ação
+        x, y = rnd.randrange(0, w), rnd.randrange(0, h - 500)
+        cv2.line(img, (x, y), (x + rnd.randrange(-200, 200), y + rnd.randrange(-30, 30)), 0, 2)
+    for y in range(h - 400, h - 20, 12):  # retícula
+        for x in range(20, w - 20, 12):
+            cv2.circle(img, (x, y), 2, 0, -1)
+    noise = np.random.default_rng(seed).integers(0, max(1, noise), size=(h, w), dtype=np.uint8)
+    return cv2.subtract(img, noise)
+
+
+def timed(fn, repeats):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return out, (time.perf_counter() - t0) / repeats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--image", nargs="*")
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--noise", type=int, default=25, help="ruído da página sintética (0-255)")
+    ap.add_argument("--scan-noise", type=int, default=8, help="ruído das páginas sintéticas 'scan'")
+    args = ap.parse_args()
+
+    pages = []
+    for path in args.image or []:
+        g = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if g is None:
+            sys.exit(f"cannot read {path}")
+        pages.append((os.path.basename(path), g))
+    if not pages:
+        pages = [(f"synthetic#{s}", synthetic_gray(seed=s, noise=args.noise)) for s in range(3)]
+        pages += [(f"scan#{s}", synthetic_gray(seed=s, noise=args.scan_noise)) for s in range(3)]
+
+    cases = [
+        ("ocr_v1", {}, lambda g: ref_ocr_v1(g)),
+        ("ocr_v1", {"scale": 0.5}, lambda g: ref_ocr_v1(g, scale=0.5)),
+        ("vision_v1", {}, ref_vision_v1),
+        ("mangaocr_baseline", {}, ref_mangaocr_baseline),
+    ]
+
+    ok = True
+    found = {}  # preset => maior número de caixas numa página
+    print(f"{'page':<14}{'preset':<26}{'boxes':>6}{'legacy ms':>11}"
+          f"{'contours ms':>13}{'cc ms':>8}  identical")
+    for name, gray in pages:
+        for preset, kw, ref_fn in cases:
+            ref, t_ref = timed(lambda: ref_fn(gray), args.repeats)
+            row = []
+            for comp in ("contours", "cc"):
+                got, t = timed(lambda: detect_boxes(gray, preset, components=comp, **kw), args.repeats)
+                same = [tuple(b) for b in got.tolist()] == [tuple(b) for b in ref]
+                ok &= same
+                row.append((t, same))
+            label = preset + "".join(f" {k}={v}" for k, v in kw.items())
+            found[label] = max(found.get(label, 0), len(ref))
+            print(f"{name:<14}{label:<26}{len(ref):6d}{t_ref * 1000:11.1f}"
+                  f"{row[0][0] * 1000:13.1f}{row[1][0] * 1000:8.1f}  {row[0][1] and row[1][1]}")
+    empty = [label for label, n in found.items() if n == 0]
+    if empty and not args.image:
+        # Comparar dois resultados vazios não prova nada
+        print(f"no boxes on any synthetic page for: {', '.join(empty)}")
+        ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
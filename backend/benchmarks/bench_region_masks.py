@@ -0,0 +1,159 @@
+"""
+Benchmark das máscaras poligonais (mask_polygon) x retângulos (bbox) na
+limpeza/inpaint.
+
+Gera páginas sintéticas (balões com texto cercados de arte com hachura e
+retícula), detecta as regiões como o region_agent e compara as duas
+máscaras:
+- área da máscara (redução)
+- cobertura do texto (fração dos pixels de texto das regiões detectadas que
+  continuam dentro da máscara; o retângulo é 1.0 por definição)
+- dano à arte (pixels de tinta que não são texto dentro da máscara)
+- tempo de inpaint com cv2.inpaint (custo ~ área da máscara); --lama usa o
+  SimpleLama se estiver instalado (custo ~ tamanho da imagem)
+
+Uso (a partir de backend/):
+    python benchmarks/bench_region_masks.py --pages 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.ocr.detect_regions import detect_regions
+from app.vision.masks import build_region_mask, region_mask_polygon
+
+
+def synthetic_page(path: str, seed: int, w: int = 1100, h: int = 1600) -> np.ndarray:
+    """Salva a página e retorna a máscara (bool) dos pixels de texto."""
+    rnd = random.Random(seed)
+    img = np.full((h, w), 255, np.uint8)
+    text = np.zeros((h, w), np.uint8)
+
+    def put_text(x, y, lines, fs):
+        for ln in range(lines):
+            word = "".join(rnd.choice("ABCDEFGHIJKLMNOPRSTUVW") for _ in range(rnd.randrange(4, 8)))
+            org = (x, y + ln * int(36 * fs))
+            cv2.putText(img, word, org, cv2.FONT_HERSHEY_SIMPLEX, fs, 0, 2)
+            cv2.putText(text, word, org, cv2.FONT_HERSHEY_SIMPLEX, fs, 255, 2)
+
+    placed = []
+    for _ in range(rnd.randrange(4, 7)):  # balões
+        ax, ay = rnd.randrange(100, 170), rnd.randrange(80, 140)
+        cx, cy = rnd.randrange(ax + 10, w - ax - 10), rnd.randrange(ay + 10, h - ay - 10)
+        if any(abs(cx - px) < ax + pax + 20 and abs(cy - py) < ay + pay + 20 for px, py, pax, pay in placed):
+            continue
+        placed.append((cx, cy, ax, ay))
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, 255, -1)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, 0, 3)
+        put_text(cx - int(ax * 0.55), cy - ay // 3, rnd.randrange(2, 4), rnd.uniform(0.6, 0.9))
+
+    # arte de fundo (hachura diagonal / retícula) fora dos balões, mas encostada neles
+    for _ in range(rnd.randrange(4, 8)):
+        x, y = rnd.randrange(0, w - 200), rnd.randrange(0, h - 200)
+        bw, bh = rnd.randrange(150, 350), rnd.randrange(150, 350)
+        if any(x < px + pax + 30 and px - pax - 30 < x + bw and y < py + pay + 30 and py - pay - 30 < y + bh
+               for px, py, pax, pay in placed):
+            continue
+        if rnd.random() < 0.5:
+            for k in range(-bh, bw, rnd.randrange(8, 14)):
+                cv2.line(img, (x + max(0, k), y + max(0, -k)), (x + min(bw, k + bh), y + min(bh, bw - k)), 90, 1)
+        else:
+            for yy in range(y, y + bh, 9):
+                for xx in range(x, x + bw, 9):
+                    cv2.circle(img, (xx, yy), 2, 60, -1)
+
+    cv2.imwrite(path, img)
+    return text > 0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--lama", action="store_true", help="mede também o SimpleLama (se instalado)")
+    args = ap.parse_args()
+
+    lama = None
+    if args.lama:
+        try:
+            from app.core.agents.redraw_agent import get_lama
+            lama = get_lama()
+        except Exception as e:
+            print(f"SimpleLama unavailable ({e}); skipping --lama")
+
+    tmp = tempfile.mkdtemp()
+    params = dict(
+        min_area=int(settings.regions_min_area),
+        max_area_ratio=float(settings.regions_max_area_ratio),
+        pad=int(settings.regions_pad),
+    )
+    tot = {k: 0.0 for k in ("rect_px", "poly_px", "text_px", "rect_text", "poly_text",
+                            "rect_damage", "poly_damage", "t_rect", "t_poly", "t_poly_build",
+                            "lama_rect", "lama_poly", "regions", "with_poly")}
+    for s in range(args.pages):
+        path = os.path.join(tmp, f"{s:03d}.png")
+        text = synthetic_page(path, seed=args.seed * 1000 + s)
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        h, w = gray.shape
+        ink = (gray < 128) & ~text
+
+        boxes = detect_regions(path, **params)
+        t0 = time.perf_counter()
+        rect_regions, poly_regions = [], []
+        for i, b in enumerate(boxes):
+            rect_regions.append({"region_id": f"r{i + 1}", "bbox": b})
+            r = {"region_id": f"r{i + 1}", "bbox": b}
+            shape = region_mask_polygon(gray, b)
+            if shape:
+                r["mask_kind"], r["mask_polygon"] = shape
+                tot["with_poly"] += 1
+            poly_regions.append(r)
+        tot["t_poly_build"] += time.perf_counter() - t0
+        tot["regions"] += len(boxes)
+
+        for name, regions in (("rect", rect_regions), ("poly", poly_regions)):
+            mask_img, stats = build_region_mask((w, h), regions)
+            mask = np.asarray(mask_img) > 0
+            tot[f"{name}_px"] += stats["mask_px"]
+            if name == "rect":
+                text_in_regions = mask & text
+                tot["text_px"] += np.count_nonzero(text_in_regions)
+            tot[f"{name}_text"] += np.count_nonzero(mask & text_in_regions)
+            tot[f"{name}_damage"] += np.count_nonzero(mask & ink)
+            m8 = mask.astype(np.uint8) * 255
+            t0 = time.perf_counter()
+            cv2.inpaint(bgr, m8, 3, cv2.INPAINT_TELEA)
+            tot[f"t_{name}"] += time.perf_counter() - t0
+            if lama is not None:
+                t0 = time.perf_counter()
+                lama(Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)), mask_img)
+                tot[f"lama_{name}"] += time.perf_counter() - t0
+
+    n = max(1, args.pages)
+    print(f"pages: {args.pages}, regions: {int(tot['regions'])}, with mask_polygon: {int(tot['with_poly'])}")
+    print(f"polygon extraction: {tot['t_poly_build'] / n * 1000:.1f} ms/page")
+    print(f"{'mask':<8}{'px/page':>10}{'text cov':>10}{'art damage px':>15}{'cv2.inpaint ms':>16}"
+          + (f"{'lama ms':>10}" if lama is not None else ""))
+    for name in ("rect", "poly"):
+        row = (f"{name:<8}{tot[f'{name}_px'] / n:10.0f}{tot[f'{name}_text'] / max(1, tot['text_px']):10.3f}"
+               f"{tot[f'{name}_damage'] / n:15.0f}{tot[f't_{name}'] / n * 1000:16.1f}")
+        if lama is not None:
+            row += f"{tot[f'lama_{name}'] / n * 1000:10.1f}"
+        print(row)
+    print(f"mask area reduction: {1 - tot['poly_px'] / max(1, tot['rect_px']):.1%}, "
+          f"inpaint speedup: {tot['t_rect'] / max(tot['t_poly'], 1e-9):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
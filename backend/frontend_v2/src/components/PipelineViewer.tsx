@@ -99,6 +99,20 @@ export const PipelineViewer: React.FC<PipelineViewerProps> = ({ jobId, pageNumbe
 
     useEffect(() => {
         refreshData();
+        // Aquece as próximas páginas enquanto o revisor trabalha nesta (best effort)
+        fetch(`${API_BASE}/pipeline/${jobId}/page/${pageNumber}/prefetch`, { method: 'POST' }).catch(() => {});
+    }, [jobId, pageNumber]);
+
+    // Progresso por SSE: recarrega quando um step termina/falha ou para num checkpoint
+    useEffect(() => {
+        const es = new EventSource(`${API_BASE}/pipeline/${jobId}/events?page_number=${pageNumber}`);
+        let timer: ReturnType<typeof setTimeout> | undefined;
+        const onProgress = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => refreshData(), 300);
+        };
+        ['step_finished', 'step_failed', 'checkpoint_waiting', 'run_completed'].forEach(t => es.addEventListener(t, onProgress));
+        return () => { clearTimeout(timer); es.close(); };
     }, [jobId, pageNumber]);
 
     // --- ACTIONS ---
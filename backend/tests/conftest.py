@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Testes rodam a partir de backend/ (pytest); o pacote `app` fica na raiz
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+from PIL import Image
+
+from app.ocr.mangaocr_service import MAX_BATCH_FAILURES, MangaOcrService
+
+
+class FakeOcr:
+    """Faz o papel do MangaOcr carregado: __call__ por crop."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, crop):
+        self.calls += 1
+        return f" crop{crop.width} "
+
+
+def _service(batch_errors):
+    """Serviço com o modelo falso; _generate_batch levanta os erros da lista, na ordem (None => sucesso)."""
+    svc = MangaOcrService(batch_size=2)
+    svc._ocr = FakeOcr()
+    errors = list(batch_errors)
+
+    def generate_batch(ocr, chunk):
+        err = errors.pop(0) if errors else None
+        if err is not None:
+            raise err
+        return [f"batch{c.width}" for c in chunk]
+
+    svc._generate_batch = generate_batch
+    return svc
+
+
+def _crops(n):
+    return [Image.new("L", (10 + i, 10)) for i in range(n)]
+
+
+def test_transient_failure_falls_back_for_that_chunk_only():
+    svc = _service([RuntimeError("CUDA out of memory"), None])
+    assert svc.recognize(_crops(4)) == ["crop10", "crop11", "batch12", "batch13"]
+    assert svc._batched
+    assert svc._batch_failures == 0
+
+
+def test_repeated_failures_disable_batching():
+    svc = _service([RuntimeError("oom")] * MAX_BATCH_FAILURES)
+    svc.recognize(_crops(2 * MAX_BATCH_FAILURES))
+    assert not svc._batched
+    assert svc._ocr.calls == 2 * MAX_BATCH_FAILURES
+
+
+def test_api_shape_error_disables_batching_at_once():
+    svc = _service([AttributeError("'MangaOcr' object has no attribute '_preprocess'")])
+    assert svc.recognize(_crops(4)) == ["crop10", "crop11", "crop12", "crop13"]
+    assert not svc._batched
@@ -0,0 +1,111 @@
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from app.vision.reading_order import group_lines, page_panels, reading_order, segment_panels
+
+
+def legacy_lines(boxes, line_tol):
+    """Agrupamento em linhas da v1 (média recalculada em laços aninhados)."""
+    idx = sorted(range(len(boxes)), key=lambda i: boxes[i][1])
+    lines = []
+    for i in idx:
+        for line in lines:
+            y_avg = sum(boxes[j][1] for j in line) / len(line)
+            if abs(boxes[i][1] - y_avg) <= line_tol:
+                line.append(i)
+                break
+        else:
+            lines.append([i])
+    return lines
+
+
+def legacy_order(boxes, line_tol):
+    """Ordenação v1 (detect_regions / grouping_agent antes do módulo compartilhado)."""
+    out = []
+    for line in legacy_lines(boxes, line_tol):
+        line.sort(key=lambda i: boxes[i][0], reverse=True)
+        out.extend(line)
+    return out
+
+
+def random_boxes(rnd, n, w=1800, h=2600):
+    boxes = []
+    for _ in range(n):
+        x, y = rnd.randrange(0, w - 60), rnd.randrange(0, h - 40)
+        boxes.append([x, y, x + rnd.randrange(20, 60), y + rnd.randrange(15, 40)])
+    return boxes
+
+
+def tied_boxes(rnd, n):
+    # coordenadas repetidas de propósito (empates em y e x)
+    return [[b[0] // 50 * 50, b[1] // 40 * 40, b[2], b[3]] for b in random_boxes(rnd, n)]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 50, 500, 2000])
+@pytest.mark.parametrize("line_tol", [0, 40, 70, 300])
+def test_reading_order_matches_v1(n, line_tol):
+    rnd = random.Random(n * 1000 + line_tol)
+    for boxes in [random_boxes(rnd, n) for _ in range(3)] + [tied_boxes(rnd, n)]:
+        assert reading_order(boxes, line_tol=line_tol) == legacy_order(boxes, line_tol)
+
+
+@pytest.mark.parametrize("n", [50, 2000])
+def test_group_lines_matches_v1(n):
+    rnd = random.Random(n)
+    for boxes in (random_boxes(rnd, n), tied_boxes(rnd, n)):
+        assert group_lines([b[1] for b in boxes], 70) == legacy_lines(boxes, 70)
+
+
+def test_ltr_reverses_only_within_lines():
+    boxes = [[100, 10, 150, 40], [300, 12, 350, 40], [200, 200, 250, 230]]
+    assert reading_order(boxes) == [1, 0, 2]
+    assert reading_order(boxes, rtl=False) == [0, 1, 2]
+
+
+def panel_page(rnd, w=900, h=1300, rows=3, cols=2, gutter=20, margin=30):
+    img = np.full((h, w), 255, np.uint8)
+    ph = (h - 2 * margin - (rows - 1) * gutter) // rows
+    pw = (w - 2 * margin - (cols - 1) * gutter) // cols
+    expected = []  # blocos por quadro, na ordem de leitura (linhas de cima p/ baixo, colunas RTL)
+    for r in range(rows):
+        for c in reversed(range(cols)):
+            x1, y1 = margin + c * (pw + gutter), margin + r * (ph + gutter)
+            cv2.rectangle(img, (x1, y1), (x1 + pw, y1 + ph), 0, 3)
+            for _ in range(150):  # arte / retícula dentro do quadro
+                cv2.circle(img, (rnd.randrange(x1 + 8, x1 + pw - 8), rnd.randrange(y1 + 8, y1 + ph - 8)), 2, 80, -1)
+            # balões em y escalonado: o de baixo do quadro da direita fica mais
+            # alto que o de cima do quadro da esquerda (só a ordem por painel acerta)
+            blocks = []
+            for k in range(4):
+                bx = x1 + 20 + (k % 2) * (pw // 2)
+                by = y1 + 20 + k * (ph // 5)
+                blocks.append([bx, by, bx + pw // 3, by + 30])
+            expected.append(blocks)
+    return img, expected
+
+
+def test_panel_major_order():
+    rnd = random.Random(0)
+    gray, expected = panel_page(rnd)
+    panels = segment_panels(gray)
+    assert len(panels) == len(expected)
+
+    line_tol = 35
+    want = [blk for panel in expected for blk in (panel[i] for i in reading_order(panel, line_tol=line_tol))]
+    shuffled = [b for panel in expected for b in panel]
+    rnd.shuffle(shuffled)
+    got = [shuffled[i] for i in reading_order(shuffled, panels=panels, line_tol=line_tol)]
+    assert got == want
+    assert [shuffled[i] for i in reading_order(shuffled, line_tol=line_tol)] != want
+
+
+def test_page_panels_is_cached(tmp_path):
+    gray, _ = panel_page(random.Random(1))
+    path = tmp_path / "page.png"
+    cv2.imwrite(str(path), gray)
+    first = page_panels(path)
+    assert first == segment_panels(gray)
+    assert page_panels(path) is first
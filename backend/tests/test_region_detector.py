@@ -0,0 +1,107 @@
+import random
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+import pytest
+
+from app.vision.region_detector import PRESETS, component_boxes, detect_boxes, outer_components
+
+
+def synthetic_gray(w: int = 900, h: int = 1300, seed: int = 0, noise: int = 8) -> np.ndarray:
+    """Página sintética: balões com texto, traços finos e retícula, com ruído de scan."""
+    rnd = random.Random(seed)
+    img = np.full((h, w), 255, np.uint8)
+    for _ in range(8):
+        cx, cy = rnd.randrange(110, w - 110), rnd.randrange(110, h - 330)
+        ax, ay = rnd.randrange(60, 100), rnd.randrange(70, 110)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, 0, 3)
+        for ln in range(3):
+            cv2.putText(img, "TEXTO", (cx - ax // 2, cy - ay // 3 + ln * 34), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    for _ in range(8):
+        x, y = rnd.randrange(0, w), rnd.randrange(0, h - 300)
+        cv2.line(img, (x, y), (x + rnd.randrange(-150, 150), y + rnd.randrange(-20, 20)), 0, 2)
+    for y in range(h - 260, h - 20, 12):
+        for x in range(20, w - 20, 12):
+            cv2.circle(img, (x, y), 2, 0, -1)
+    return cv2.subtract(img, np.random.default_rng(seed).integers(0, max(1, noise), size=(h, w), dtype=np.uint8))
+
+
+def ref_mangaocr_baseline(gray: np.ndarray) -> List[Tuple[int, ...]]:
+    # Detector antigo do baseline MangaOCR (findContours + laço por contorno)
+    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+    dil = cv2.dilate(thr, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)), iterations=1)
+    contours, _ = cv2.findContours(dil, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    h, w = gray.shape[:2]
+    out = []
+    for c in contours:
+        x, y, ww, hh = cv2.boundingRect(c)
+        if ww * hh < 800 or ww < 20 or hh < 20:
+            continue
+        if ww > w * 0.95 and hh > h * 0.95:
+            continue
+        out.append((max(0, x - 4), max(0, y - 4), min(w, x + ww + 4), min(h, y + hh + 4)))
+    return out
+
+
+def _boxes(arr: np.ndarray) -> List[Tuple[int, ...]]:
+    return [tuple(b) for b in arr.tolist()]
+
+
+@pytest.fixture(scope="module")
+def pages():
+    return [synthetic_gray(seed=s) for s in range(3)]
+
+
+def test_cc_is_the_default_engine_path():
+    assert all(p.components == "cc" for p in PRESETS.values())
+
+
+def test_outer_components_fill_holes():
+    # Anel com um bloco dentro + um bloco solto: o de dentro fecha com o anel
+    mask = np.zeros((120, 200), np.uint8)
+    cv2.circle(mask, (60, 60), 40, 255, 3)
+    mask[50:70, 50:70] = 255
+    mask[20:40, 150:180] = 255
+    _, stats = outer_components(mask)
+    boxes = sorted(map(tuple, stats[1:, :4].tolist()))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    assert len(boxes) == 2
+    assert boxes == sorted(cv2.boundingRect(c) for c in contours)
+    assert boxes[1] == (150, 20, 30, 20)
+
+
+def test_component_boxes_match_find_contours_on_random_masks():
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        mask = ((rng.random((90, 130)) > 0.55) * 255).astype(np.uint8)
+        mask = cv2.dilate(mask, np.ones((2, 2), np.uint8)) if rng.random() < 0.5 else mask
+        cc, cc_order = component_boxes(mask, "cc")
+        ct, _ = component_boxes(mask, "contours")
+        idx = np.arange(len(cc))
+        assert _boxes(cc[cc_order(idx)]) == _boxes(ct)
+
+
+@pytest.mark.parametrize(
+    "preset, kw",
+    [("ocr_v1", {}), ("ocr_v1", {"scale": 0.5}), ("vision_v1", {}), ("mangaocr_baseline", {})],
+)
+def test_cc_matches_contours_boxes_and_order(pages, preset, kw):
+    found = 0
+    for gray in pages:
+        cc = detect_boxes(gray, preset, **kw)
+        contours = detect_boxes(gray, preset, components="contours", **kw)
+        assert _boxes(cc) == _boxes(contours)
+        found += len(cc)
+    assert found > 0  # dois resultados vazios não provam nada
+
+
+def test_matches_legacy_detector(pages):
+    for gray in pages:
+        assert _boxes(detect_boxes(gray, "mangaocr_baseline")) == ref_mangaocr_baseline(gray)
+
+
+def test_empty_mask_has_no_boxes():
+    gray = np.full((200, 300), 255, np.uint8)
+    for preset in PRESETS:
+        assert detect_boxes(gray, preset).shape == (0, 4)
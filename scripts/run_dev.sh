@@ -8,4 +8,8 @@ if [ -f .env ]; then
   source .env
   set +a
 fi
+# worker da fila (pipeline fora do processo da API)
+python -m app.worker &
+WORKER_PID=$!
+trap 'kill "$WORKER_PID" 2>/dev/null || true' EXIT
 uvicorn app.main:app --reload --host 0.0.0.0 --port 8000